@@ -0,0 +1,72 @@
+"""
+Comando para procesar (o reanudar) jobs de exportación de datos
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.exports import EXPORT_CHUNK_SIZE, run_export_job
+from core.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Procesa los jobs de exportación pendientes y opcionalmente reanuda los interrumpidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job-id',
+            type=int,
+            help='ID del job a procesar (por defecto todos los pendientes)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Incluir jobs fallidos o que quedaron en proceso sin avance (p. ej. tras un reinicio o deploy)'
+        )
+        parser.add_argument(
+            '--stale-seconds',
+            type=int,
+            default=getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 900),
+            help="Segundos sin avance tras los que un job 'running' se considera interrumpido"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Filas leídas por consulta'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['pending']
+        stale_before = None
+        candidates = ExportJob.objects.filter(status='pending')
+        if options['resume']:
+            statuses.append('failed')
+            # Un job 'running' con avance reciente sigue en un worker: no se toma
+            stale_before = timezone.now() - timedelta(seconds=options['stale_seconds'])
+            candidates = ExportJob.objects.filter(
+                Q(status__in=statuses) | Q(status='running', updated_at__lt=stale_before)
+            )
+
+        jobs = candidates.order_by('created_at')
+        if options['job_id']:
+            jobs = jobs.filter(pk=options['job_id'])
+
+        job_ids = list(jobs.values_list('pk', flat=True))
+        processed = 0
+        for job_id in job_ids:
+            # La toma del job es atómica: se omite si otro runner la ganó
+            if not run_export_job(job_id, chunk_size=options['chunk_size'], statuses=statuses, stale_before=stale_before):
+                continue
+            processed += 1
+            job = ExportJob.objects.get(pk=job_id)
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f'✅ Exportación {job_id} ({job.dataset}): {job.size} bytes'))
+            else:
+                self.stdout.write(self.style.ERROR(f'❌ Exportación {job_id} fallida: {job.error_message}'))
+
+        if not processed:
+            self.stdout.write('No hay jobs de exportación por procesar.')
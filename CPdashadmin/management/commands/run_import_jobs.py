@@ -0,0 +1,81 @@
+"""
+Comando para procesar (o reanudar) jobs de importación de usuarios
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import ImportJob
+from CPdashadmin.views.users.import_jobs import IMPORT_JOB_CHUNK_SIZE, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'Procesa los jobs de importación (y simulación) de usuarios pendientes y opcionalmente reanuda los interrumpidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job-id',
+            type=int,
+            help='ID del job a procesar (por defecto todos los pendientes)'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Incluir jobs fallidos o que quedaron en proceso sin avance (p. ej. tras un reinicio)'
+        )
+        parser.add_argument(
+            '--stale-seconds',
+            type=int,
+            default=getattr(settings, 'IMPORT_JOB_STALE_SECONDS', 900),
+            help="Segundos sin avance tras los que un job 'running' se considera interrumpido"
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_JOB_CHUNK_SIZE,
+            help='Número de filas por bloque'
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['pending']
+        stale_before = None
+        candidates = ImportJob.objects.filter(status='pending')
+        if options['resume']:
+            statuses.append('failed')
+            # Un job 'running' con avance reciente sigue en un worker: no se toma
+            stale_before = timezone.now() - timedelta(seconds=options['stale_seconds'])
+            candidates = ImportJob.objects.filter(
+                Q(status__in=statuses) | Q(status='running', updated_at__lt=stale_before)
+            )
+
+        jobs = candidates.order_by('created_at')
+        if options['job_id']:
+            jobs = jobs.filter(pk=options['job_id'])
+
+        job_ids = list(jobs.values_list('pk', flat=True))
+        processed = 0
+        for job_id in job_ids:
+            # La toma del job es atómica: se omite si otro runner la ganó
+            if not run_import_job(job_id, chunk_size=options['chunk_size'], statuses=statuses, stale_before=stale_before):
+                continue
+            processed += 1
+            self.stdout.write(f'Procesada importación {job_id}')
+            job = ImportJob.objects.get(pk=job_id)
+            if job.status == 'completed' and job.dry_run:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Simulación {job_id}: {job.diff_summary['total_rows']} filas simuladas"
+                ))
+            elif job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(
+                    f'✅ Importación {job_id}: {job.success_count} usuarios, {job.error_count} errores'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'❌ Importación {job_id} fallida en la fila {job.processed_rows + 1}: {job.error_message}'
+                ))
+
+        if not processed:
+            self.stdout.write('No hay jobs de importación por procesar.')
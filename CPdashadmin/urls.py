@@ -15,6 +15,11 @@ urlpatterns = [
     path('users/<int:user_id>/', views.user_detail, name='user_detail'),
     path('users/import/', views.user_import, name='user_import'),
     path('users/export/', views.user_export, name='user_export'),
+    path('users/import/dry-run/', views.import_dry_run, name='import_dry_run'),
+    path('users/import/jobs/<int:job_id>/', views.import_job_detail, name='import_job_detail'),
+    path('users/import/jobs/<int:job_id>/status/', views.import_job_status, name='import_job_status'),
+    path('users/import/jobs/<int:job_id>/report/', views.import_job_report, name='import_job_report'),
+    path('users/import/jobs/<int:job_id>/resume/', views.import_job_resume, name='import_job_resume'),
     
     # Roles
     path('roles/', views.role_management, name='role_management'),
@@ -61,4 +66,9 @@ urlpatterns = [
     
     # Reportes
     path('reports/', views.reports, name='reports'),
+    
+    # Exportaciones
+    path('exports/jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('exports/jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('exports/<str:dataset>/', views.data_export, name='data_export'),
 ]
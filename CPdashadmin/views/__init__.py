@@ -2,7 +2,9 @@
 from .dashboard import dashboard
 from .users import (
     user_management, user_detail, user_create, user_edit, 
-    user_delete, user_import, user_export
+    user_delete, user_import, user_export,
+    import_job_detail, import_job_status, import_job_report, import_job_resume,
+    import_dry_run
 )
 from .roles import (
     role_management, role_create, role_detail, role_edit, role_delete
@@ -22,11 +24,14 @@ from .services import (
     get_subcategories,
     save_network_settings, save_kiosk_settings, save_general_settings, detect_local_ip
 )
+from .exports import data_export, export_job_status, export_job_download
 
 __all__ = [
     'dashboard',
     'user_management', 'user_detail', 'user_create', 'user_edit', 
     'user_delete', 'user_import', 'user_export',
+    'import_job_detail', 'import_job_status', 'import_job_report', 'import_job_resume',
+    'import_dry_run',
     'role_management', 'role_create', 'role_detail', 'role_edit', 'role_delete',
     'permission_management', 'permission_create', 'permission_edit', 'permission_delete',
     'ticket_management', 'create_ticket', 'get_subcategories',
@@ -38,5 +43,6 @@ __all__ = [
     'system_settings', 'reports',
     'save_network_settings', 'save_kiosk_settings', 'save_general_settings', 'detect_local_ip',
     'view_ticket_subcategory', 'edit_ticket_subcategory', 'delete_ticket_subcategory',
-    'subcategories_management'
+    'subcategories_management',
+    'data_export', 'export_job_status', 'export_job_download'
 ]
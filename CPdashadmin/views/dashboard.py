@@ -1,9 +1,11 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from core.db_router import read_replica
 from core.models import User, Kiosk, Ticket, AuthLoginAudit
 
 
 @login_required
+@read_replica
 def dashboard(request):
     """Dashboard principal del admin"""
     # Estadísticas generales - solo de la empresa actual
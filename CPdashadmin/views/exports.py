@@ -0,0 +1,94 @@
+"""
+Vistas de exportación de datos (usuarios, tickets, turnos y auditoría de login)
+"""
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from core.exports import EXPORT_DATASETS, create_export_job, get_export_filename, start_export_job, stream_export
+from core.models import ExportJob
+from core.roles import resolve_user_roles
+
+
+def is_admin(user, roles=None):
+    """
+    Verificar si el usuario es administrador
+    roles: roles ya resueltos (request.roles); si no se indican se consultan
+    """
+    try:
+        if roles is None:
+            roles = resolve_user_roles(user)
+        return user.is_authenticated and roles.primary == 'admin'
+    except:
+        return False
+
+
+def _is_enabled(request, param):
+    return request.GET.get(param, '').lower() in ('1', 'true', 'yes')
+
+
+def serialize_export_job(job):
+    """Estado del job para el endpoint de consulta"""
+    data = {
+        'id': job.pk,
+        'dataset': job.dataset,
+        'compress': job.compress,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'size': job.size,
+        'error_message': job.error_message,
+        'is_finished': job.is_finished,
+        'status_url': reverse('CPdashadmin:export_job_status', args=[job.pk]),
+    }
+    if job.status == 'completed':
+        data['download_url'] = reverse('CPdashadmin:export_job_download', args=[job.pk])
+    return data
+
+
+@login_required
+def data_export(request, dataset):
+    """
+    Exportar un dataset a CSV en streaming (solo administradores)
+
+    ?compress=1   comprime la descarga con gzip
+    ?background=1 genera el archivo en segundo plano y retorna el job
+    """
+    if not is_admin(request.user, request.roles):
+        raise PermissionDenied('Solo los administradores pueden exportar datos')
+    if dataset not in EXPORT_DATASETS:
+        raise Http404('Exportación no encontrada')
+
+    compress = _is_enabled(request, 'compress')
+    if _is_enabled(request, 'background'):
+        job = create_export_job(dataset, request.user.company, request.user, compress=compress)
+        start_export_job(job)
+        return JsonResponse(serialize_export_job(job), status=202)
+
+    return stream_export(dataset, request.user.company, compress=compress)
+
+
+@login_required
+def export_job_status(request, job_id):
+    """Consultar el estado de una exportación en segundo plano"""
+    if not is_admin(request.user, request.roles):
+        raise PermissionDenied('Solo los administradores pueden exportar datos')
+    job = get_object_or_404(ExportJob, pk=job_id, company=request.user.company)
+    return JsonResponse(serialize_export_job(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    """Descargar el archivo de una exportación terminada (el archivo no tiene URL pública)"""
+    if not is_admin(request.user, request.roles):
+        raise PermissionDenied('Solo los administradores pueden exportar datos')
+    job = get_object_or_404(ExportJob, pk=job_id, company=request.user.company, status='completed')
+    if not job.file:
+        raise Http404('Exportación no encontrada')
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=get_export_filename(job.dataset, job.compress),
+        content_type='application/gzip' if job.compress else 'text/csv',
+    )
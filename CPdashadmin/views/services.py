@@ -10,6 +10,7 @@ import socket
 import requests
 from django.views.decorators.csrf import csrf_exempt
 
+from core.db_router import read_replica, use_replica
 from core.models import User, Kiosk, Ticket, Company, Role, TicketCategory, TicketSubcategory, TicketTemplate, TicketTemplateField
 from core.serializers import TicketSerializer
 
@@ -58,12 +59,13 @@ def ticket_management(request):
     paginator = Paginator(tickets, 20)  # 20 tickets por página
     tickets_page = paginator.get_page(page)
     
-    # Estadísticas
-    total_tickets = Ticket.objects.filter(company=company).count()
-    open_tickets = Ticket.objects.filter(company=company, status='open').count()
-    in_progress_tickets = Ticket.objects.filter(company=company, status='in_progress').count()
-    closed_tickets = Ticket.objects.filter(company=company, status='closed').count()
-    resolved_tickets = Ticket.objects.filter(company=company, status='resolved').count()
+    # Estadísticas (réplica de lectura)
+    with use_replica():
+        total_tickets = Ticket.objects.filter(company=company).count()
+        open_tickets = Ticket.objects.filter(company=company, status='open').count()
+        in_progress_tickets = Ticket.objects.filter(company=company, status='in_progress').count()
+        closed_tickets = Ticket.objects.filter(company=company, status='closed').count()
+        resolved_tickets = Ticket.objects.filter(company=company, status='resolved').count()
     
     # Categorías para filtro
     categories = TicketCategory.objects.filter(company=company, is_active=True)
@@ -984,6 +986,7 @@ def save_system_settings(company, settings):
 
 
 @login_required
+@read_replica
 def reports(request):
     """Reportes y estadísticas"""
     # Estadísticas para reportes - solo de la empresa actual
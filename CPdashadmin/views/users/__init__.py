@@ -1,6 +1,7 @@
 # Vistas de gestión de usuarios
 from .user_management import user_management, user_detail, user_create, user_edit, user_delete
 from .user_import import user_import, user_export
+from .import_jobs import import_job_detail, import_job_status, import_job_report, import_job_resume, import_dry_run
 from .utils import apply_dynamic_rules
 
 # Importar funciones de los módulos factorizados para acceso directo si es necesario
@@ -36,6 +37,11 @@ __all__ = [
     'user_delete',
     'user_import',
     'user_export',
+    'import_job_detail',
+    'import_job_status',
+    'import_job_report',
+    'import_job_resume',
+    'import_dry_run',
     'apply_dynamic_rules',
     
     # Funciones de importación factorizadas
@@ -2,38 +2,86 @@
 Procesamiento de datos de usuarios para importación
 """
 from django.contrib import messages
+from django.db import transaction
+from django.utils import timezone
 from core.models import User, Role, UserRole
+from core.passwords import hash_passwords
+from core.roles import bump_roles_version
+from core.search import index_users
 from .utils import apply_dynamic_rules
+from .rule_compiler import RuleFrame, compile_rules, apply_rules_to_frame
 import pandas as pd
 import io
 
+# Filas por consulta/escritura en la importación masiva
+IMPORT_BATCH_SIZE = 1000
+
+# Campos que se actualizan en usuarios existentes
+USER_UPDATE_FIELDS = [
+    'first_name', 'last_name', 'email', 'title', 'department', 'location',
+    'employee_number', 'sap_id', 'is_active', 'can_access', 'must_change_password',
+    'updated_at',
+]
+
+# Valores de texto que se interpretan como booleanos
+TRUE_VALUES = ['true', 'verdadero', '1', 'yes', 'si']
+FALSE_VALUES = ['false', 'falso', '0', 'no']
+
 
 def generate_preview_data(df, column_mapping, import_config):
     """Generar datos de preview"""
-    preview_data = []
-    for index, row in df.head(10).iterrows():
-        user_data = extract_user_data_from_row(row, column_mapping, import_config)
-        
-        # Aplicar reglas de interpretación
-        applied_rules, rule_conflicts = apply_interpretation_rules(user_data, import_config, column_mapping)
-        
+    # Aplicar reglas de interpretación
+    frame = extract_user_frame(df.head(10), column_mapping, import_config)
+    rules = compile_rules(import_config, column_mapping)
+    all_applied_rules, all_rule_conflicts = apply_rules_to_frame(frame, rules)
+    preview_data = frame.to_records()
+    
+    for user_data, applied_rules, rule_conflicts in zip(preview_data, all_applied_rules, all_rule_conflicts):
         # Agregar información de reglas aplicadas
         user_data['_applied_rules'] = applied_rules
         user_data['_rule_conflicts'] = rule_conflicts
         
         # Agregar configuraciones por defecto
         add_default_configurations(user_data, import_config)
-        
-        preview_data.append(user_data)
     
     return preview_data
 
 
+def extract_user_frame(df, column_mapping, import_config):
+    """
+    Extraer los datos de usuario de todas las filas a la vez, columna por
+    columna, con los mismos valores que extract_user_data_from_row
+    """
+    if 'first_name' in column_mapping and 'name' in column_mapping:
+        # El nombre completo reemplaza los datos de la fila: se extrae fila a fila
+        return RuleFrame.from_records(
+            [extract_user_data_from_row(row, column_mapping, import_config) for _, row in df.iterrows()],
+            index=df.index
+        )
+    
+    frame = RuleFrame(df.index)
+    for field_name, csv_column in column_mapping.items():
+        if csv_column in df.columns:
+            column = df[csv_column]
+            values = column.where(column.notna(), '').astype(str).str.strip()
+        else:
+            values = pd.Series('', index=df.index, dtype=object)
+        
+        if field_name == 'is_active':
+            lowered = values.str.lower()
+            values = pd.Series(import_config['default_is_active'], index=df.index, dtype=object)
+            values.loc[lowered.isin(TRUE_VALUES)] = True
+            values.loc[lowered.isin(FALSE_VALUES)] = False
+        frame.set_column(field_name, values)
+    return frame
+
+
 def extract_user_data_from_row(row, column_mapping, import_config):
     """Extraer datos de usuario desde la fila CSV"""
     user_data = {}
     for field_name, csv_column in column_mapping.items():
-        value = str(row.get(csv_column, '')).strip()
+        value = row.get(csv_column, '')
+        value = '' if pd.isna(value) else str(value).strip()
         
         # Procesamiento especial para campos específicos
         if field_name == 'is_active':
@@ -48,9 +96,9 @@ def extract_user_data_from_row(row, column_mapping, import_config):
 
 def convert_boolean_value(value, default_value):
     """Convertir valor a booleano"""
-    if value.lower() in ['true', 'verdadero', '1', 'yes', 'si']:
+    if value.lower() in TRUE_VALUES:
         return True
-    elif value.lower() in ['false', 'falso', '0', 'no']:
+    elif value.lower() in FALSE_VALUES:
         return False
     else:
         return default_value
@@ -157,39 +205,67 @@ def add_default_configurations(user_data, import_config):
 
 
 def process_import_data(df, column_mapping, import_config, request):
-    """Procesar los datos de importación"""
+    """Procesar los datos de importación para la empresa del usuario actual"""
+    return import_users(df, column_mapping, import_config, request.user.company)
+
+
+def import_users(df, column_mapping, import_config, company, seen_rows=None, hash_pool=None):
+    """
+    Importar usuarios de un DataFrame en una empresa
+
+    Las filas se clasifican con classify_import_rows (la misma clasificación
+    que la simulación), las altas y actualizaciones se escriben con
+    bulk_create/bulk_update y los roles se asignan por diferencia de conjuntos.
+    seen_rows ({username: fila}) permite detectar repetidos entre bloques y
+    hash_pool (de hashing_pool) reutiliza los procesos de hashing entre bloques.
+    Retorna (success_count, error_count, errors, conflicts).
+    """
     success_count = 0
     error_count = 0
     errors = []
     conflicts = []
     
-    for index, row in df.iterrows():
+    rows, invalid_rows = prepare_import_rows(df, column_mapping, import_config)
+    for index, message in invalid_rows:
+        errors.append(f'Fila {index + 1}: {message}')
+        error_count += 1
+    
+    roles_by_name = fetch_roles_by_name(company)
+    classified = classify_import_rows(
+        rows, import_config, company, roles_by_name, {} if seen_rows is None else seen_rows
+    )
+    
+    new_users = []
+    updated_users = []
+    role_assignments = {}
+    row_indexes = {}
+    
+    for index, user_data, current, entry in classified:
         try:
-            # Extraer datos según mapeo
-            user_data = extract_user_data_from_row(row, column_mapping, import_config)
-            
-            # Aplicar reglas de interpretación
-            applied_rules, rule_conflicts = apply_interpretation_rules(user_data, import_config, column_mapping)
-            
-            # Validar datos requeridos
-            if not user_data.get('username') or not user_data.get('email'):
-                errors.append(f'Fila {index + 1}: Username y email son obligatorios')
+            if entry['type'] == 'conflict':
+                conflicts.extend(f'Fila {index + 1}: {message}' for message in entry['messages'])
                 error_count += 1
                 continue
             
-            # Verificar si usuario existe
-            existing_user = User.objects.filter(username=user_data['username']).first()
-            if existing_user and not import_config['update_existing']:
-                conflicts.append(f'Fila {index + 1}: Usuario {user_data["username"]} ya existe')
-                error_count += 1
+            # Avisos (rol no encontrado): la fila se importa igualmente
+            errors.extend(f'Fila {index + 1}: {message}' for message in entry['messages'])
+            if entry['type'] == 'unchanged':
+                success_count += 1
                 continue
             
-            # Crear o actualizar usuario
-            user = create_or_update_user(user_data, existing_user, import_config, request)
+            username = user_data['username']
+            if entry['type'] == 'create':
+                user = build_new_user(user_data, import_config, company)
+                new_users.append(user)
+            else:
+                # Solo se escriben USER_UPDATE_FIELDS: no hace falta cargar el usuario completo
+                user = User(pk=current['pk'], username=username, company=company)
+                update_user_fields(user, user_data, import_config)
+                updated_users.append(user)
+            row_indexes[username] = [index]
             
-            # Asignar rol si se especifica
-            if user_data.get('role'):
-                assign_user_role(user, user_data['role'], request, errors, index)
+            if 'role_change' in entry:
+                role_assignments[username] = (user, roles_by_name[entry['role_change'][1]])
             
             success_count += 1
             
@@ -197,58 +273,294 @@ def process_import_data(df, column_mapping, import_config, request):
             errors.append(f'Fila {index + 1}: {str(e)}')
             error_count += 1
     
+    # Hashear la contraseña por defecto de los usuarios nuevos (sal por usuario)
+    passwords = hash_passwords([import_config['default_password']] * len(new_users), pool=hash_pool)
+    for user, encoded in zip(new_users, passwords):
+        user.password = encoded
+    
+    # Escribir en la base de datos por lotes
+    failed_users = set(bulk_create_users(new_users, errors, row_indexes))
+    failed_users.update(bulk_update_users(updated_users, errors, row_indexes))
+    for username in failed_users:
+        failed_rows = len(row_indexes[username])
+        success_count -= failed_rows
+        error_count += failed_rows
+        role_assignments.pop(username, None)
+    
+    changed_role_users = assign_user_roles({user.pk: role.pk for user, role in role_assignments.values()})
+    
+    # Las operaciones masivas no disparan señales: actualizar índice de búsqueda y caché de roles
+    saved_ids = [
+        user.pk for user in new_users + updated_users
+        if user.pk and user.username not in failed_users
+    ]
+    for start in range(0, len(saved_ids), IMPORT_BATCH_SIZE):
+        index_users(User.objects.filter(pk__in=saved_ids[start:start + IMPORT_BATCH_SIZE]), IMPORT_BATCH_SIZE)
+    # Tras el commit: antes, un request concurrente podría cachear los roles viejos con la versión nueva
+    def bump_changed_roles():
+        for user_id in changed_role_users:
+            bump_roles_version(user_id)
+    transaction.on_commit(bump_changed_roles)
+    
     return success_count, error_count, errors, conflicts
 
 
-def create_or_update_user(user_data, existing_user, import_config, request):
-    """Crear o actualizar usuario"""
-    if existing_user and import_config['update_existing']:
-        user = existing_user
-        update_user_fields(user, user_data, import_config)
-        user.save()
-    else:
-        user = User.objects.create_user(
-            username=user_data['username'],
-            email=user_data['email'],
-            first_name=user_data.get('first_name', ''),
-            last_name=user_data.get('last_name', ''),
-            password=import_config['default_password'],
-            company=request.user.company,
-            title=user_data.get('title', ''),
-            department=user_data.get('department', ''),
-            location=user_data.get('location', ''),
-            employee_number=user_data.get('employee_number', ''),
-            sap_id=user_data.get('sap_id', ''),
-            is_active=user_data.get('is_active', import_config['default_is_active']),
-            can_access=user_data.get('can_access', import_config['default_can_access']),
-            must_change_password=import_config['default_must_change_password']
+def prepare_import_rows(df, column_mapping, import_config):
+    """
+    Extraer los datos de las filas según el mapeo, aplicar las reglas de
+    interpretación y validar los campos obligatorios, todo por columnas
+    (los registros se extraen al final)
+    Retorna (rows, invalid_rows): [(índice, user_data)] y [(índice, mensaje)]
+    """
+    frame = extract_user_frame(df, column_mapping, import_config)
+    _, all_rule_conflicts = apply_rules_to_frame(frame, compile_rules(import_config, column_mapping))
+    valid = (frame.truthy('username') & frame.truthy('email')).tolist()
+    
+    rows = []
+    invalid_rows = []
+    for index, user_data, rule_conflicts, is_valid in zip(df.index, frame.to_records(), all_rule_conflicts, valid):
+        if not is_valid:
+            invalid_rows.append((index, 'Username y email son obligatorios'))
+            continue
+        user_data['_rule_conflicts'] = rule_conflicts
+        # Normalizar una sola vez: búsquedas, repetidos y escrituras usan el mismo username
+        user_data['username'] = User.normalize_username(user_data['username'])
+        rows.append((index, user_data))
+    return rows, invalid_rows
+
+
+def fetch_existing_users(usernames, company, fields):
+    """
+    Usuarios existentes de la empresa por username, en lotes: pk, valores
+    actuales de fields y nombres de rol (con values(), sin instanciar modelos)
+    Retorna (existing, foreign_usernames): los usernames que pertenecen a
+    otra empresa se reportan aparte y no se actualizan
+    """
+    usernames = list(dict.fromkeys(usernames))
+    existing = {}
+    foreign_usernames = set()
+    for start in range(0, len(usernames), IMPORT_BATCH_SIZE):
+        batch = usernames[start:start + IMPORT_BATCH_SIZE]
+        users = {
+            row['pk']: row
+            for row in User.objects.filter(company=company, username__in=batch).values('pk', 'username', *fields)
+        }
+        for row in users.values():
+            row['roles'] = []
+            existing[row['username']] = row
+        role_rows = (
+            UserRole.objects.filter(user_id__in=list(users))
+            .order_by('id')
+            .values_list('user_id', 'role__name')
         )
+        for user_id, role_name in role_rows:
+            users[user_id]['roles'].append(role_name)
+        
+        missing = [username for username in batch if username not in existing]
+        if missing:
+            foreign_usernames.update(User.objects.filter(username__in=missing).values_list('username', flat=True))
+    return existing, foreign_usernames
+
+
+def _normalize(value):
+    return '' if value is None else value
+
+
+def classify_import_rows(rows, import_config, company, roles_by_name, seen_rows):
+    """
+    Clasificar las filas válidas tal como las aplicará la importación:
+    create, update, unchanged o conflict (repetida en el archivo, de otra
+    empresa, o existente sin update_existing)
+    La usan import_users y la simulación, de modo que ambas coinciden.
+    seen_rows ({username: fila}) acumula los usernames de bloques anteriores.
+    Retorna [(índice, user_data, valores actuales o None, entrada)]; la
+    entrada tiene row, type, username, messages y, si aplica, changes y
+    role_change ([roles actuales, rol nuevo]).
+    """
+    field_names = list(get_user_field_values({}, import_config))
+    existing, foreign_usernames = fetch_existing_users(
+        [user_data['username'] for _, user_data in rows if user_data['username'] not in seen_rows],
+        company, field_names
+    )
     
+    classified = []
+    for index, user_data in rows:
+        username = user_data['username']
+        current = existing.get(username)
+        entry = {'row': index + 1, 'type': 'create', 'username': username, 'messages': []}
+        classified.append((index, user_data, current, entry))
+        
+        if username in seen_rows:
+            entry['type'] = 'conflict'
+            entry['messages'].append(f'Usuario {username} repetido en el archivo (fila {seen_rows[username]})')
+            continue
+        seen_rows[username] = index + 1
+        
+        if username in foreign_usernames:
+            entry['type'] = 'conflict'
+            entry['messages'].append(f'Usuario {username} pertenece a otra empresa')
+            continue
+        
+        if current is not None:
+            if not import_config['update_existing']:
+                entry['type'] = 'conflict'
+                entry['messages'].append(f'Usuario {username} ya existe')
+                continue
+            
+            changes = {
+                field: [_normalize(current[field]), value]
+                for field, value in get_user_field_values(user_data, import_config).items()
+                if _normalize(current[field]) != value
+            }
+            entry['type'] = 'update' if changes else 'unchanged'
+            entry['changes'] = changes
+        
+        role_name = user_data.get('role')
+        if role_name:
+            if role_name not in roles_by_name:
+                entry['messages'].append(f'Rol "{role_name}" no encontrado')
+            else:
+                current_roles = current['roles'] if current is not None else []
+                if current_roles != [role_name]:
+                    entry['role_change'] = [current_roles, role_name]
+                    if entry['type'] == 'unchanged':
+                        entry['type'] = 'update'
+    
+    return classified
+
+
+def fetch_roles_by_name(company):
+    """Obtener los roles de la empresa por nombre (el primero si hay repetidos)"""
+    roles_by_name = {}
+    for role in Role.objects.filter(company=company).order_by('pk'):
+        roles_by_name.setdefault(role.name, role)
+    return roles_by_name
+
+
+def build_new_user(user_data, import_config, company):
+    """Construir un usuario nuevo sin guardarlo (la contraseña se asigna en lote)"""
+    user = User(
+        username=User.normalize_username(user_data['username']),
+        email=User.objects.normalize_email(user_data['email']),
+        first_name=user_data.get('first_name', ''),
+        last_name=user_data.get('last_name', ''),
+        company=company,
+        title=user_data.get('title', ''),
+        department=user_data.get('department', ''),
+        location=user_data.get('location', ''),
+        employee_number=user_data.get('employee_number', ''),
+        sap_id=user_data.get('sap_id', ''),
+        is_active=user_data.get('is_active', import_config['default_is_active']),
+        can_access=user_data.get('can_access', import_config['default_can_access']),
+        must_change_password=import_config['default_must_change_password']
+    )
     return user
 
 
+def _report_failed_user(user, error, errors, row_indexes):
+    for index in row_indexes.get(user.username, []):
+        errors.append(f'Fila {index + 1}: {str(error)}')
+
+
+def bulk_create_users(users, errors, row_indexes):
+    """
+    Crear usuarios por lotes; si un lote falla se reintenta fila a fila
+    Retorna los usernames que no se pudieron crear
+    """
+    failed = []
+    for start in range(0, len(users), IMPORT_BATCH_SIZE):
+        batch = users[start:start + IMPORT_BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+        except Exception:
+            for user in batch:
+                try:
+                    with transaction.atomic():
+                        User.objects.bulk_create([user])
+                except Exception as e:
+                    user.pk = None
+                    failed.append(user.username)
+                    _report_failed_user(user, e, errors, row_indexes)
+        
+        # Algunos backends no retornan las claves primarias en bulk_create
+        missing = {user.username: user for user in batch if user.pk is None and user.username not in failed}
+        if missing:
+            for username, pk in User.objects.filter(username__in=list(missing)).values_list('username', 'pk'):
+                missing[username].pk = pk
+    return failed
+
+
+def bulk_update_users(users, errors, row_indexes):
+    """
+    Actualizar usuarios por lotes; si un lote falla se reintenta fila a fila
+    Retorna los usernames que no se pudieron actualizar
+    """
+    failed = []
+    now = timezone.now()
+    for user in users:
+        user.updated_at = now
+    
+    for start in range(0, len(users), IMPORT_BATCH_SIZE):
+        batch = users[start:start + IMPORT_BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_update(batch, USER_UPDATE_FIELDS)
+        except Exception:
+            for user in batch:
+                try:
+                    with transaction.atomic():
+                        user.save(update_fields=USER_UPDATE_FIELDS)
+                except Exception as e:
+                    failed.append(user.username)
+                    _report_failed_user(user, e, errors, row_indexes)
+    return failed
+
+
+def assign_user_roles(assignments):
+    """
+    Dejar a cada usuario únicamente con el rol indicado ({user_id: role_id})
+    Solo se eliminan y crean las asignaciones que cambian
+    Retorna los ids de los usuarios cuyas asignaciones cambiaron
+    """
+    changed = set()
+    user_ids = list(assignments)
+    for start in range(0, len(user_ids), IMPORT_BATCH_SIZE):
+        batch = user_ids[start:start + IMPORT_BATCH_SIZE]
+        current = {
+            (user_id, role_id): pk
+            for pk, user_id, role_id in UserRole.objects.filter(user_id__in=batch).values_list('pk', 'user_id', 'role_id')
+        }
+        desired = {(user_id, assignments[user_id]) for user_id in batch}
+        
+        stale = {pair: pk for pair, pk in current.items() if pair not in desired}
+        if stale:
+            UserRole.objects.filter(pk__in=list(stale.values())).delete()
+        
+        added = desired - current.keys()
+        UserRole.objects.bulk_create([UserRole(user_id=user_id, role_id=role_id) for user_id, role_id in added])
+        changed.update(user_id for user_id, _ in stale.keys() | added)
+    return changed
+
+
+def get_user_field_values(user_data, import_config):
+    """Valores que la importación asigna a un usuario existente"""
+    return {
+        'first_name': user_data.get('first_name', ''),
+        'last_name': user_data.get('last_name', ''),
+        'email': user_data.get('email', ''),
+        'title': user_data.get('title', ''),
+        'department': user_data.get('department', ''),
+        'location': user_data.get('location', ''),
+        'employee_number': user_data.get('employee_number', ''),
+        'sap_id': user_data.get('sap_id', ''),
+        'is_active': user_data.get('is_active', import_config['default_is_active']),
+        'can_access': user_data.get('can_access', import_config['default_can_access']),
+        'must_change_password': import_config['default_must_change_password'],
+    }
+
+
 def update_user_fields(user, user_data, import_config):
     """Actualizar campos del usuario"""
-    user.first_name = user_data.get('first_name', '')
-    user.last_name = user_data.get('last_name', '')
-    user.email = user_data.get('email', '')
-    user.title = user_data.get('title', '')
-    user.department = user_data.get('department', '')
-    user.location = user_data.get('location', '')
-    user.employee_number = user_data.get('employee_number', '')
-    user.sap_id = user_data.get('sap_id', '')
-    user.is_active = user_data.get('is_active', import_config['default_is_active'])
-    user.can_access = user_data.get('can_access', import_config['default_can_access'])
-    user.must_change_password = import_config['default_must_change_password']
-
-
-def assign_user_role(user, role_name, request, errors, index):
-    """Asignar rol al usuario"""
-    role = Role.objects.filter(company=request.user.company, name=role_name).first()
-    if role:
-        # Eliminar roles existentes
-        user.userrole_set.all().delete()
-        UserRole.objects.create(user=user, role=role)
-    else:
-        # Si el rol no existe, crear un warning
-        errors.append(f'Fila {index + 1}: Rol "{role_name}" no encontrado')
+    for field, value in get_user_field_values(user_data, import_config).items():
+        setattr(user, field, value)
@@ -0,0 +1,104 @@
+"""
+Detección de la codificación de los archivos cargados
+
+Se evalúa una muestra acotada del archivo (inicio, medio y final) en vez del
+contenido completo:
+
+1. BOM de UTF-8/UTF-16.
+2. Decodificación UTF-8 estricta de las muestras (el caso habitual).
+3. Detector estadístico (cchardet si está instalado, si no chardet) sobre
+   las muestras, aceptado solo con confianza suficiente y si las decodifica.
+4. Windows-1252 y finalmente Latin-1, habituales en exportaciones de RR.HH.
+"""
+import codecs
+
+try:
+    import cchardet as chardet
+except ImportError:
+    import chardet
+
+# Bytes de cada muestra (inicio, medio y final del archivo)
+SAMPLE_SIZE = 64 * 1024
+
+# Confianza mínima para aceptar la codificación del detector estadístico
+MIN_CONFIDENCE = 0.7
+
+# Codificaciones de respaldo, en orden (Latin-1 decodifica cualquier byte)
+FALLBACK_ENCODINGS = ['cp1252', 'latin-1']
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def read_samples(file, sample_size=SAMPLE_SIZE):
+    """
+    Leer muestras acotadas del inicio, medio y final de un archivo
+    Retorna la lista de muestras y si la última termina en el fin del archivo
+    """
+    size = getattr(file, 'size', None)
+    file.seek(0)
+    samples = [file.read(sample_size)]
+    reaches_end = size is not None and size <= sample_size
+    if size is not None and size > sample_size:
+        for offset in (size // 2, size - sample_size):
+            file.seek(offset)
+            samples.append(file.read(sample_size))
+        reaches_end = True
+    file.seek(0)
+    return samples, reaches_end
+
+
+def _skip_continuation_bytes(sample):
+    """Descartar los bytes de continuación UTF-8 al inicio de una muestra intermedia"""
+    skip = 0
+    while skip < min(3, len(sample)) and 0x80 <= sample[skip] < 0xC0:
+        skip += 1
+    return sample[skip:]
+
+
+def _decodes(samples, encoding, reaches_end=False):
+    """Verificar que las muestras decodifican sin errores en la codificación indicada"""
+    last = len(samples) - 1
+    for index, sample in enumerate(samples):
+        if index > 0 and codecs.lookup(encoding).name == 'utf-8':
+            sample = _skip_continuation_bytes(sample)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(sample, final=reaches_end and index == last)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def detect_sample_encoding(samples, reaches_end=False):
+    """Codificación de un archivo a partir de sus muestras"""
+    head = samples[0]
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    if _decodes(samples, 'utf-8', reaches_end):
+        return 'utf-8'
+
+    detected = chardet.detect(b''.join(samples))
+    encoding = detected.get('encoding')
+    if encoding and (detected.get('confidence') or 0) >= MIN_CONFIDENCE:
+        try:
+            if _decodes(samples, encoding, reaches_end):
+                return codecs.lookup(encoding).name
+        except LookupError:
+            pass
+
+    for encoding in FALLBACK_ENCODINGS:
+        if _decodes(samples, encoding, reaches_end):
+            return encoding
+    return FALLBACK_ENCODINGS[-1]
+
+
+def detect_file_encoding(file, sample_size=SAMPLE_SIZE):
+    """Detectar la codificación de un archivo cargado leyendo solo muestras acotadas"""
+    samples, reaches_end = read_samples(file, sample_size)
+    return detect_sample_encoding(samples, reaches_end)
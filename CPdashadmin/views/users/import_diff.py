@@ -0,0 +1,149 @@
+"""
+Simulación (dry-run) de una importación de usuarios
+
+Calcula, sin escribir en la base de datos, el resultado de importar el
+archivo completo: altas, actualizaciones con sus cambios por campo, cambios
+de rol, conflictos y filas inválidas. La simulación es un ImportJob con
+dry_run=True: se toma y se sigue con la misma maquinaria que la importación
+(import_jobs), fuera del request. El archivo se recorre por bloques y cada
+bloque se clasifica con classify_import_rows (la misma función que usa la
+importación) cruzándolo con los usuarios y roles existentes mediante
+consultas por lotes. El detalle se guarda como JSON lines en el reporte del
+job (para paginarlo) y el resumen en el job.
+"""
+import json
+import logging
+import math
+
+from django.core.files.base import File
+from django.utils import timezone
+
+from core.exports import IteratorFile
+from core.models import ImportJob
+from .data_processor import classify_import_rows, prepare_import_rows, fetch_roles_by_name
+
+logger = logging.getLogger(__name__)
+
+DIFF_TYPES = ['create', 'update', 'unchanged', 'conflict', 'invalid']
+
+DIFF_PAGE_SIZE = 50
+MAX_DIFF_PAGE_SIZE = 500
+
+
+def diff_chunk(df, column_mapping, import_config, company, roles_by_name, seen_rows):
+    """
+    Entradas de la simulación para un bloque del archivo, con la misma
+    clasificación que aplica import_users (classify_import_rows)
+    seen_rows ({username: fila}) acumula los usernames de bloques anteriores
+    """
+    rows, invalid_rows = prepare_import_rows(df, column_mapping, import_config)
+    entries = [
+        {'row': index + 1, 'type': 'invalid', 'username': '', 'messages': [message]}
+        for index, message in invalid_rows
+    ]
+
+    for _, user_data, _, entry in classify_import_rows(rows, import_config, company, roles_by_name, seen_rows):
+        entry['messages'][:0] = [
+            f'Regla {conflict["rule"]}: {conflict["field"]} cambió de '
+            f'"{conflict["old_value"]}" a "{conflict["new_value"]}"'
+            for conflict in user_data.get('_rule_conflicts', [])
+        ]
+        entries.append(entry)
+
+    entries.sort(key=lambda entry: entry['row'])
+    return entries
+
+
+def compute_import_diff(job, chunks):
+    """
+    Simular la importación completa de un job de simulación
+    chunks: bloques (DataFrames) del CSV del job. Guarda el detalle (JSON
+    lines) como reporte del job, actualiza su avance por bloque y retorna
+    el resumen
+    """
+    summary = {
+        'total_rows': 0,
+        'counts': {diff_type: 0 for diff_type in DIFF_TYPES},
+        'role_changes': 0,
+        'field_changes': {},
+    }
+    roles_by_name = fetch_roles_by_name(job.company)
+    seen_rows = {}
+
+    def iter_lines():
+        for chunk in chunks:
+            entries = diff_chunk(chunk, job.column_mapping, job.import_config, job.company, roles_by_name, seen_rows)
+            for entry in entries:
+                summary['total_rows'] += 1
+                summary['counts'][entry['type']] += 1
+                if 'role_change' in entry:
+                    summary['role_changes'] += 1
+                for field in entry.get('changes', {}):
+                    summary['field_changes'][field] = summary['field_changes'].get(field, 0) + 1
+                yield (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+            # Avance para el polling (y para detectar un runner detenido)
+            job.processed_rows = int(chunk.index[-1]) + 1
+            ImportJob.objects.filter(pk=job.pk).update(processed_rows=job.processed_rows, updated_at=timezone.now())
+
+    # Una simulación no se reanuda por bloques: el detalle se escribe de nuevo completo
+    job.processed_rows = 0
+    if job.report_file:
+        job.report_file.delete(save=False)
+    job.report_file.save(f'simulacion_{job.pk}.jsonl', File(IteratorFile(iter_lines())), save=False)
+    job.diff_summary = summary
+    job.success_count = summary['counts']['create'] + summary['counts']['update'] + summary['counts']['unchanged']
+    job.error_count = summary['counts']['conflict'] + summary['counts']['invalid']
+    job.conflict_count = summary['counts']['conflict']
+    return summary
+
+
+def read_diff_page(job, diff_type=None, page=1, page_size=DIFF_PAGE_SIZE):
+    """
+    Página del detalle de una simulación terminada, opcionalmente filtrada por tipo
+    Se lee el archivo línea a línea, sin cargarlo completo en memoria
+    """
+    if not job.dry_run or job.status != 'completed' or not job.report_file:
+        return None
+
+    summary = job.diff_summary
+    total = summary['counts'].get(diff_type, 0) if diff_type else summary['total_rows']
+    num_pages = max(1, math.ceil(total / page_size))
+    page = min(max(1, page), num_pages)
+    start = (page - 1) * page_size
+
+    entries = []
+    position = 0
+    with job.report_file.open('rb') as diff_file:
+        for line in diff_file:
+            if diff_type and f'"type": "{diff_type}"'.encode('utf-8') not in line:
+                continue
+            if position >= start:
+                entries.append(json.loads(line))
+                if len(entries) == page_size:
+                    break
+            position += 1
+
+    return {
+        'type': diff_type or '',
+        'page': page,
+        'page_size': page_size,
+        'num_pages': num_pages,
+        'total': total,
+        'entries': entries,
+    }
+
+
+def parse_diff_page_params(params):
+    """
+    Tipo, página y tamaño de página del detalle (?type=, ?page=, ?page_size=)
+    Lanza ValueError si no son válidos
+    """
+    diff_type = params.get('type') or None
+    if diff_type and diff_type not in DIFF_TYPES:
+        raise ValueError(f'Tipo no válido: {diff_type}')
+    try:
+        page = int(params.get('page', 1))
+        page_size = min(int(params.get('page_size', DIFF_PAGE_SIZE)), MAX_DIFF_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('Parámetros de paginación no válidos.')
+    return diff_type, page, max(1, page_size)
@@ -4,8 +4,13 @@ Manejadores específicos para la importación de usuarios desde CSV
 from django.shortcuts import render, redirect
 from django.contrib import messages
 import pandas as pd
+import codecs
 import io
-import chardet
+from .encoding_detection import detect_file_encoding
+from .upload_store import (
+    SESSION_UPLOAD_KEY, SNIFF_SIZE, save_upload_stream, save_upload_meta, get_upload_meta, upload_exists,
+    load_upload_preview, count_upload_rows, delete_upload
+)
 
 
 def handle_csv_upload(request):
@@ -20,31 +25,14 @@ def handle_csv_upload(request):
         return redirect('CPdashadmin:user_import')
     
     try:
-        # Leer el contenido del archivo
-        file_content = csv_file.read()
+        # Detectar codificación (muestras acotadas) y delimitador (primeros KB)
+        encoding = detect_file_encoding(csv_file)
+        detected_delimiter = detect_delimiter(read_sample_text(csv_file, encoding))
         
-        # Detectar codificación
-        detected = chardet.detect(file_content)
-        encoding = detected['encoding'] if detected['confidence'] > 0.7 else 'utf-8'
-        
-        # Intentar decodificar con la codificación detectada
-        try:
-            decoded_content = file_content.decode(encoding)
-        except UnicodeDecodeError:
-            # Fallback a UTF-8
-            decoded_content = file_content.decode('utf-8', errors='ignore')
-        
-        # Detectar delimitador
-        detected_delimiter = detect_delimiter(decoded_content)
-        
-        # Leer CSV con parámetros detectados
-        df = pd.read_csv(
-            io.StringIO(decoded_content), 
-            delimiter=detected_delimiter,
-            nrows=10,
-            encoding=encoding,
-            header=0
-        )
+        # Guardar el archivo (UTF-8) por bloques contando sus filas y leer solo las de la vista previa
+        upload_id, encoding, total_rows = save_upload_stream(csv_file, encoding)
+        df = load_upload_preview(upload_id, detected_delimiter)
+        save_upload_meta(upload_id, encoding=encoding, delimiter=detected_delimiter, total_rows=total_rows)
         
         # Verificar problemas en el CSV
         duplicate_columns = df.columns[df.columns.duplicated()].tolist()
@@ -57,7 +45,7 @@ def handle_csv_upload(request):
             messages.warning(request, f'Columnas problemáticas detectadas: {", ".join(problematic_columns)}')
         
         # Guardar en sesión para el siguiente paso
-        save_csv_session_data(request, decoded_content, df, detected_delimiter, encoding, duplicate_columns, problematic_columns)
+        save_csv_session_data(request, upload_id, df, total_rows, detected_delimiter, encoding, duplicate_columns, problematic_columns)
         
         return df, detected_delimiter, encoding, duplicate_columns, problematic_columns
         
@@ -66,14 +54,27 @@ def handle_csv_upload(request):
         return None, None, None, None, None
 
 
-def detect_delimiter(content):
-    """Detectar el delimitador del CSV"""
+def read_sample_text(csv_file, encoding):
+    """Primeros KB del archivo decodificados, hasta la última línea completa"""
+    csv_file.seek(0)
+    sample = csv_file.read(SNIFF_SIZE)
+    csv_file.seek(0)
+    
+    complete = csv_file.size <= len(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=complete)
+    if not complete and '\n' in text:
+        text = text[:text.rindex('\n') + 1]
+    return text
+
+
+def detect_delimiter(sample):
+    """Detectar el delimitador del CSV a partir de sus primeras líneas"""
     delimiters = [',', ';', '\t', '|']
     detected_delimiter = ','
     
     for delimiter in delimiters:
         try:
-            df_test = pd.read_csv(io.StringIO(content), delimiter=delimiter, nrows=1)
+            df_test = pd.read_csv(io.StringIO(sample), delimiter=delimiter, nrows=1)
             if len(df_test.columns) > 1:
                 detected_delimiter = delimiter
                 break
@@ -95,11 +96,12 @@ def detect_problematic_columns(df):
     return problematic_columns
 
 
-def save_csv_session_data(request, decoded_content, df, delimiter, encoding, duplicate_columns, problematic_columns):
-    """Guardar datos del CSV en la sesión"""
-    request.session['csv_data'] = decoded_content
+def save_csv_session_data(request, upload_id, df, total_rows, delimiter, encoding, duplicate_columns, problematic_columns):
+    """Guardar en sesión el identificador de la carga y sus metadatos (no el contenido)"""
+    delete_upload(request.session.get(SESSION_UPLOAD_KEY))
+    request.session[SESSION_UPLOAD_KEY] = upload_id
     request.session['csv_columns'] = df.columns.tolist()
-    request.session['csv_preview'] = df.head().to_dict('records')
+    request.session['csv_total_rows'] = total_rows
     request.session['csv_delimiter'] = delimiter
     request.session['csv_encoding'] = encoding
     request.session['csv_has_headers'] = True
@@ -109,8 +111,7 @@ def save_csv_session_data(request, decoded_content, df, delimiter, encoding, dup
 
 def handle_column_mapping(request):
     """Manejar el mapeo de columnas"""
-    csv_data = request.session.get('csv_data')
-    if not csv_data:
+    if not upload_exists(request.session.get(SESSION_UPLOAD_KEY)):
         messages.error(request, 'No hay datos CSV cargados.')
         return redirect('CPdashadmin:user_import')
     
@@ -147,34 +148,38 @@ def validate_required_fields(column_mapping):
 
 
 def handle_import_confirmation(request):
-    """Manejar la confirmación de importación"""
-    csv_data = request.session.get('csv_data')
+    """Manejar la confirmación de importación (retorna el número de filas de la carga)"""
+    upload_id = request.session.get(SESSION_UPLOAD_KEY)
     column_mapping = request.session.get('column_mapping')
     import_config = request.session.get('import_config')
     
-    if not all([csv_data, column_mapping, import_config]):
+    if not all([upload_exists(upload_id), column_mapping, import_config]):
         messages.error(request, 'Datos de importación incompletos.')
         return redirect('CPdashadmin:user_import')
     
     try:
-        df = pd.read_csv(
-            io.StringIO(csv_data),
-            delimiter=import_config['delimiter'],
-            encoding=import_config['encoding'],
-            header=0
-        )
-        
-        return df
+        return get_upload_row_count(request, upload_id, import_config['delimiter'])
         
     except Exception as e:
         messages.error(request, f'Error durante la importación: {str(e)}')
         return None
 
 
-def cleanup_import_session(request):
-    """Limpiar datos de sesión de importación"""
+def get_upload_row_count(request, upload_id, delimiter):
+    """Filas de la carga desde la sesión o sus datos guardados; se cuentan solo si faltan"""
+    total_rows = request.session.get('csv_total_rows')
+    if total_rows is None:
+        total_rows = get_upload_meta(upload_id).get('total_rows')
+    if total_rows is None:
+        total_rows = count_upload_rows(upload_id)
+    return total_rows
+
+
+def cleanup_import_session(request, keep_upload=False):
+    """Limpiar datos de sesión de importación (y los archivos de la carga)"""
+    delete_upload(request.session.get(SESSION_UPLOAD_KEY), keep_source=keep_upload)
     session_keys = [
-        'csv_data', 'csv_columns', 'csv_preview', 'column_mapping', 
+        SESSION_UPLOAD_KEY, 'csv_columns', 'csv_total_rows', 'column_mapping', 
         'import_config', 'csv_delimiter', 'csv_encoding', 'csv_has_headers', 
         'duplicate_columns', 'problematic_columns'
     ]
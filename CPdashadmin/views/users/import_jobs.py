@@ -0,0 +1,316 @@
+"""
+Importación de usuarios en segundo plano (jobs con progreso y reporte)
+
+El CSV cargado (ya guardado en el almacenamiento de media) se procesa por
+bloques de IMPORT_JOB_CHUNK_SIZE filas. Cada bloque se confirma en su propia
+transacción junto con el avance del job, de modo que un job fallido o
+interrumpido se reanuda desde la última fila confirmada.
+
+Un runner (hilo de la vista o comando run_import_jobs) toma el job con un
+UPDATE condicional a 'running' antes de procesarlo (core.jobs): solo uno
+puede ganarlo.
+Los errores y conflictos de cada bloque se escriben en una parte del reporte
+(en el almacenamiento de media); el job guarda sus conteos y una muestra
+de IMPORT_JOB_SAMPLE_SIZE, y el reporte completo se arma con las partes.
+
+Las simulaciones (dry_run) usan los mismos jobs: se toman y consultan igual,
+pero solo escriben el detalle (import_diff), que se pagina desde el
+endpoint de estado.
+"""
+import csv
+import io
+import logging
+import threading
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from core.exports import IteratorFile
+from core.jobs import claim_job
+from core.models import ImportJob
+from core.passwords import hashing_pool
+from .data_processor import import_users, prepare_import_rows
+from .import_diff import compute_import_diff, parse_diff_page_params, read_diff_page
+from .import_handlers import get_upload_row_count
+from .upload_store import SESSION_UPLOAD_KEY, get_upload_path, read_csv_chunks, upload_exists
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque (y por transacción) de un job de importación
+IMPORT_JOB_CHUNK_SIZE = 5000
+
+# Errores y conflictos que se guardan en el job como muestra (el detalle completo va al reporte)
+IMPORT_JOB_SAMPLE_SIZE = 100
+
+# Partes del reporte, una por bloque confirmado
+REPORT_PARTS_DIR = 'imports/reports/parts'
+
+# Campos del job que se actualizan al confirmar cada bloque
+PROGRESS_FIELDS = ['processed_rows', 'success_count', 'error_count', 'conflict_count', 'updated_at']
+
+
+def create_import_job(request, upload_id, total_rows, column_mapping, import_config, dry_run=False):
+    """Crear un job de importación (o de simulación) a partir del CSV cargado"""
+    job = ImportJob(
+        company=request.user.company,
+        created_by=request.user,
+        column_mapping=column_mapping,
+        import_config=import_config,
+        total_rows=total_rows,
+        dry_run=dry_run,
+    )
+    job.source_file.name = get_upload_path(upload_id)
+    job.save()
+    return job
+
+
+def start_import_job(job):
+    """Ejecutar el job en un hilo en segundo plano una vez confirmada la transacción"""
+    def start():
+        threading.Thread(
+            target=run_import_job,
+            args=(job.pk,),
+            name=f'import-job-{job.pk}',
+            daemon=True,
+        ).start()
+    transaction.on_commit(start)
+
+
+def read_job_chunks(job, chunk_size=IMPORT_JOB_CHUNK_SIZE):
+    """Leer el CSV del job por bloques (índice global de fila en cada bloque)"""
+    with job.source_file.open('rb') as source:
+        yield from read_csv_chunks(source, job.import_config.get('delimiter', ','), chunk_size)
+
+
+def claim_import_job(job_id, statuses=('pending',), stale_before=None):
+    """Tomar un job de importación para procesarlo (ver core.jobs.claim_job)"""
+    return claim_job(ImportJob, job_id, statuses, stale_before)
+
+
+def run_import_job(job_id, chunk_size=IMPORT_JOB_CHUNK_SIZE, statuses=('pending',), stale_before=None):
+    """
+    Procesar un job de importación desde la última fila confirmada
+    Retorna False si el job no se pudo tomar (otro runner lo procesa o ya terminó)
+    """
+    if not claim_import_job(job_id, statuses, stale_before):
+        logger.info(f"El job de importación {job_id} no está disponible para procesarse")
+        return False
+
+    try:
+        job = ImportJob.objects.select_related('company').get(pk=job_id)
+
+        if job.dry_run:
+            # Simulación: no escribe usuarios, el reporte es el detalle
+            compute_import_diff(job, read_job_chunks(job, chunk_size))
+            update_fields = ['report_file', 'diff_summary'] + PROGRESS_FIELDS
+        else:
+            # Usernames ya vistos en el archivo (los repetidos son conflictos, como en la simulación)
+            seen_rows = {}
+            # Un pool de hashing para todo el job: los procesos arrancan una sola vez
+            with hashing_pool() as hash_pool:
+                process_job_chunks(job, chunk_size, seen_rows, hash_pool)
+            job.report_file.save(f'importacion_{job.pk}.csv', File(IteratorFile(iter_report(job))), save=False)
+            update_fields = ['report_file', 'updated_at']
+
+        job.status = 'completed'
+        job.total_rows = max(job.total_rows, job.processed_rows)
+        job.finished_at = timezone.now()
+        job.save(update_fields=update_fields + ['status', 'total_rows', 'finished_at'])
+        if not job.dry_run:
+            delete_report_parts(job)
+
+    except Exception as e:
+        logger.exception(f"Error en el job de importación {job_id}")
+        ImportJob.objects.filter(pk=job_id).update(
+            status='failed', error_message=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+    return True
+
+
+def process_job_chunks(job, chunk_size, seen_rows, hash_pool):
+    """Importar los bloques pendientes del job, confirmando cada uno con su avance"""
+    for chunk in read_job_chunks(job, chunk_size):
+        # Reanudar: omitir filas ya confirmadas, recordando sus usernames
+        done = chunk[chunk.index < job.processed_rows]
+        if not done.empty:
+            rows, _ = prepare_import_rows(done, job.column_mapping, job.import_config)
+            for index, user_data in rows:
+                seen_rows.setdefault(user_data['username'], index + 1)
+        chunk = chunk[chunk.index >= job.processed_rows]
+        if chunk.empty:
+            continue
+
+        with transaction.atomic():
+            success_count, error_count, errors, conflicts = import_users(
+                chunk, job.column_mapping, job.import_config, job.company, seen_rows, hash_pool
+            )
+            save_report_part(job, int(chunk.index[0]), errors, conflicts)
+            update_fields = list(PROGRESS_FIELDS)
+            for field, items in (('errors', errors), ('conflicts', conflicts)):
+                sample = getattr(job, field)
+                room = IMPORT_JOB_SAMPLE_SIZE - len(sample)
+                if items and room > 0:
+                    sample.extend(items[:room])
+                    update_fields.append(field)
+            job.processed_rows = int(chunk.index[-1]) + 1
+            job.success_count += success_count
+            job.error_count += error_count
+            job.conflict_count += len(conflicts)
+            job.save(update_fields=update_fields)
+
+
+def get_report_parts_dir(job):
+    return f'{REPORT_PARTS_DIR}/{job.pk}'
+
+
+def save_report_part(job, first_row, errors, conflicts):
+    """
+    Guardar los errores y conflictos de un bloque como parte del reporte
+    El nombre depende de la primera fila: al reprocesar un bloque no
+    confirmado su parte se reemplaza
+    """
+    path = f'{get_report_parts_dir(job)}/{first_row:010d}.csv'
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    if not errors and not conflicts:
+        return
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for error in errors:
+        writer.writerow(['Error', error])
+    for conflict in conflicts:
+        writer.writerow(['Conflicto', conflict])
+    default_storage.save(path, ContentFile(output.getvalue().encode('utf-8')))
+
+
+def list_report_parts(job):
+    """Rutas de las partes del reporte, en orden de fila"""
+    directory = get_report_parts_dir(job)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [f'{directory}/{name}' for name in sorted(files)]
+
+
+def delete_report_parts(job):
+    for path in list_report_parts(job):
+        default_storage.delete(path)
+
+
+def iter_report(job):
+    """Reporte CSV (bloques de bytes) con los errores y conflictos del job, leído de sus partes"""
+    output = io.StringIO()
+    csv.writer(output).writerow(['Tipo', 'Detalle'])
+    yield output.getvalue().encode('utf-8')
+    for path in list_report_parts(job):
+        with default_storage.open(path, 'rb') as part:
+            yield part.read()
+
+
+def serialize_job(job):
+    """Estado del job para el endpoint de consulta"""
+    return {
+        'id': job.pk,
+        'dry_run': job.dry_run,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'progress': job.progress,
+        'success_count': job.success_count,
+        'error_count': job.error_count,
+        'conflict_count': job.conflict_count,
+        'error_message': job.error_message,
+        'is_finished': job.is_finished,
+        'has_report': bool(job.report_file),
+    }
+
+
+@login_required
+def import_job_detail(request, job_id):
+    """Página de progreso de una importación"""
+    job = get_object_or_404(ImportJob, pk=job_id, company=request.user.company)
+    return render(request, 'CPdashadmin/users/import_job.html', {'job': job})
+
+
+@login_required
+def import_job_status(request, job_id):
+    """
+    Consultar el progreso de una importación (polling)
+    Una simulación terminada incluye su resumen y una página del detalle
+    (?type=, ?page=, ?page_size=)
+    """
+    job = get_object_or_404(ImportJob, pk=job_id, company=request.user.company)
+    data = serialize_job(job)
+    if job.dry_run and job.status == 'completed':
+        try:
+            diff_type, page, page_size = parse_diff_page_params(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        data['summary'] = job.diff_summary
+        data['details'] = read_diff_page(job, diff_type, page, page_size)
+    return JsonResponse(data)
+
+
+@login_required
+def import_job_report(request, job_id):
+    """Descargar el reporte de errores y conflictos de una importación"""
+    job = get_object_or_404(ImportJob, pk=job_id, company=request.user.company)
+    if job.report_file:
+        with job.report_file.open('rb') as report:
+            content = report.read()
+    else:
+        content = b''.join(iter_report(job))
+    if job.dry_run:
+        response = HttpResponse(content, content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="simulacion_{job.pk}.jsonl"'
+    else:
+        response = HttpResponse(content, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="importacion_{job.pk}.csv"'
+    return response
+
+
+@login_required
+@require_POST
+def import_job_resume(request, job_id):
+    """Reanudar una importación fallida desde la última fila confirmada"""
+    job = get_object_or_404(ImportJob, pk=job_id, company=request.user.company)
+    # Condicional: el comando run_import_jobs --resume puede haberlo tomado
+    if not ImportJob.objects.filter(pk=job.pk, status='failed').update(status='pending', updated_at=timezone.now()):
+        messages.warning(request, 'Solo se pueden reanudar importaciones fallidas.')
+    else:
+        start_import_job(job)
+        messages.success(request, f'Importación reanudada desde la fila {job.processed_rows + 1}.')
+    return redirect('CPdashadmin:import_job_detail', job_id=job.pk)
+
+
+@login_required
+@require_POST
+def import_dry_run(request):
+    """
+    Iniciar la simulación de la carga de la sesión como job en segundo plano
+    Retorna el estado del job; el resumen y el detalle se consultan en su endpoint de estado
+    """
+    upload_id = request.session.get(SESSION_UPLOAD_KEY)
+    column_mapping = request.session.get('column_mapping')
+    import_config = request.session.get('import_config')
+    if not all([upload_exists(upload_id), column_mapping, import_config]):
+        return JsonResponse({'error': 'Datos de importación incompletos.'}, status=400)
+
+    total_rows = get_upload_row_count(request, upload_id, import_config['delimiter'])
+    job = create_import_job(request, upload_id, total_rows, column_mapping, import_config, dry_run=True)
+    start_import_job(job)
+    data = serialize_job(job)
+    data['status_url'] = reverse('CPdashadmin:import_job_status', args=[job.pk])
+    return JsonResponse(data, status=202)
@@ -0,0 +1,214 @@
+"""
+Compilación de reglas de interpretación a máscaras vectorizadas de pandas
+
+Las reglas sugeridas seleccionadas y las reglas personalizadas se resuelven
+una sola vez (en el mismo orden que apply_interpretation_rules) y se evalúan
+sobre las columnas de un RuleFrame: cada columna se normaliza una vez
+(str().strip().lower()) y cada condición es una máscara de pandas
+(.str.contains, .str.startswith, .str.endswith, .eq). Los valores de acción
+se asignan con .loc y los registros (dicts) se extraen al final. Cada regla
+ve los cambios de las reglas anteriores, igual que en la evaluación fila a
+fila, y el reporte de reglas aplicadas y conflictos por registro es el mismo.
+"""
+import numpy as np
+import pandas as pd
+
+
+class CompiledRule:
+    """Regla lista para evaluarse sobre una columna normalizada"""
+
+    def __init__(self, name, field, operator, value, action_field, action_value, missing_as_empty):
+        self.name = name
+        self.field = field
+        self.operator = operator
+        # Un valor vacío o no textual no debe interrumpir la importación completa
+        self.value = str(value or '').lower()
+        self.action_field = action_field
+        self.action_value = action_value
+        # Las reglas sugeridas evalúan un campo ausente como '' y las personalizadas lo omiten
+        self.missing_as_empty = missing_as_empty
+
+
+def compile_rules(import_config, column_mapping):
+    """
+    Resolver las reglas a aplicar, en orden: sugeridas seleccionadas y
+    personalizadas por prioridad
+    """
+    rules = []
+
+    if import_config['selected_rules']:
+        suggested_rules = import_config.get('suggested_rules', [])
+        for rule_name in import_config['selected_rules']:
+            for suggested_rule in suggested_rules:
+                if suggested_rule['name'] == rule_name:
+                    if suggested_rule['field'] in column_mapping:
+                        rules.append(CompiledRule(
+                            rule_name,
+                            suggested_rule['field'],
+                            suggested_rule['operator'],
+                            suggested_rule['value'],
+                            suggested_rule['action_field'],
+                            suggested_rule['action_value'],
+                            missing_as_empty=True,
+                        ))
+                    break
+
+    custom_rules = sorted(import_config.get('custom_rules', []), key=lambda x: x.get('priority', 1))
+    for rule in custom_rules:
+        if rule.get('field') not in column_mapping:
+            continue
+        rules.append(CompiledRule(
+            rule.get('name'),
+            rule.get('field'),
+            rule.get('operator'),
+            rule.get('value'),
+            rule.get('action_field'),
+            rule.get('action_value'),
+            missing_as_empty=False,
+        ))
+
+    return rules
+
+
+def evaluate_condition(field_value, operator, value):
+    """Evaluar una condición sobre un valor ya normalizado"""
+    if operator == 'contains':
+        return value in field_value
+    elif operator == 'equals':
+        return field_value == value
+    elif operator == 'starts_with':
+        return field_value.startswith(value)
+    elif operator == 'ends_with':
+        return field_value.endswith(value)
+    elif operator == 'not_equals':
+        return field_value != value
+    elif operator == 'not_contains':
+        return value not in field_value
+    return False
+
+
+class RuleFrame:
+    """
+    Registros de una importación como columnas (Series con el índice de
+    filas del CSV) y, por campo, la máscara de filas que tienen el campo
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.values = {}
+        self.present = {}
+        self.lowered = {}
+
+    @classmethod
+    def from_records(cls, records, index=None):
+        frame = cls(pd.RangeIndex(len(records)) if index is None else index)
+        fields = dict.fromkeys(field for record in records for field in record)
+        for field in fields:
+            values = pd.Series([record.get(field, '') for record in records], index=frame.index, dtype=object)
+            present = pd.Series([field in record for record in records], index=frame.index, dtype=bool)
+            frame.set_column(field, values, present)
+        return frame
+
+    def set_column(self, field, values, present=None):
+        self.values[field] = values.astype(object)
+        self.present[field] = pd.Series(True, index=self.index) if present is None else present
+        self.lowered.pop(field, None)
+
+    def column(self, field):
+        """Valores y máscara de presencia de un campo (vacío y ausente si no existe)"""
+        if field not in self.values:
+            self.set_column(field, pd.Series('', index=self.index, dtype=object), pd.Series(False, index=self.index))
+        return self.values[field], self.present[field]
+
+    def truthy(self, field):
+        """Filas en las que el campo existe y tiene un valor verdadero"""
+        values, present = self.column(field)
+        return present & values.astype(bool)
+
+    def mask(self, field, operator, value):
+        """Máscara de la condición sobre str(valor).strip().lower() de cada fila"""
+        if field not in self.lowered:
+            values, _ = self.column(field)
+            self.lowered[field] = values.astype(str).str.strip().str.lower()
+        lowered = self.lowered[field]
+        if operator in ('contains', 'not_contains'):
+            mask = lowered.str.contains(value, regex=False)
+        elif operator in ('equals', 'not_equals'):
+            mask = lowered.eq(value)
+        elif operator == 'starts_with':
+            mask = lowered.str.startswith(value)
+        elif operator == 'ends_with':
+            mask = lowered.str.endswith(value)
+        else:
+            return pd.Series(False, index=self.index)
+        return ~mask if operator.startswith('not_') else mask
+
+    def assign(self, field, mask, value):
+        values, present = self.column(field)
+        values.loc[mask] = value
+        present.loc[mask] = True
+        if field in self.lowered:
+            self.lowered[field].loc[mask] = str(value).strip().lower()
+
+    def to_records(self):
+        """Un dict por fila con los campos presentes, en el orden de las columnas"""
+        fields = list(self.values)
+        columns = [self.values[field].tolist() for field in fields]
+        records = [dict(zip(fields, row)) for row in zip(*columns)] if fields else [{} for _ in self.index]
+        for field, present in self.present.items():
+            for position in np.flatnonzero(~present.to_numpy()):
+                del records[position][field]
+        return records
+
+
+def apply_rules_to_frame(frame, rules):
+    """
+    Aplicar reglas compiladas a un RuleFrame, modificándolo
+
+    Retorna (applied_rules, rule_conflicts), con una lista por fila.
+    """
+    applied_rules = [[] for _ in range(len(frame.index))]
+    rule_conflicts = [[] for _ in range(len(frame.index))]
+    for rule in rules:
+        mask = frame.mask(rule.field, rule.operator, rule.value)
+        _, present = frame.column(rule.field)
+        if rule.missing_as_empty:
+            mask = mask.where(present, evaluate_condition('', rule.operator, rule.value))
+        else:
+            mask = mask & present
+        if not mask.any():
+            continue
+
+        # Conflictos: el campo de acción ya tenía valor
+        action_values, action_present = frame.column(rule.action_field)
+        positions = np.flatnonzero(mask.to_numpy())
+        conflicted = np.flatnonzero((mask & action_present).to_numpy())
+        for position, old_value in zip(conflicted.tolist(), action_values.iloc[conflicted].tolist()):
+            rule_conflicts[position].append({
+                'rule': rule.name,
+                'field': rule.action_field,
+                'old_value': old_value,
+                'new_value': rule.action_value
+            })
+        for position in positions.tolist():
+            applied_rules[position].append(rule.name)
+
+        # Las reglas siguientes ven el valor asignado
+        frame.assign(rule.action_field, mask, rule.action_value)
+
+    return applied_rules, rule_conflicts
+
+
+def apply_compiled_rules(records, rules):
+    """
+    Aplicar reglas compiladas a una lista de registros (dicts), modificándolos
+
+    Retorna (applied_rules, rule_conflicts), con una lista por registro.
+    """
+    if not records or not rules:
+        return [[] for _ in records], [[] for _ in records]
+    frame = RuleFrame.from_records(records)
+    applied_rules, rule_conflicts = apply_rules_to_frame(frame, rules)
+    for record, updated in zip(records, frame.to_records()):
+        record.update(updated)
+    return applied_rules, rule_conflicts
@@ -0,0 +1,182 @@
+"""
+Almacenamiento de los CSV cargados en el asistente de importación
+
+El archivo cargado se transcodifica a UTF-8 por bloques y se guarda en el
+almacenamiento de media; la sesión solo guarda el identificador de la carga.
+Los pasos siguientes leen el archivo por bloques (chunksize de pandas) o solo
+sus primeras filas, de modo que la memoria no depende del tamaño del CSV.
+"""
+import codecs
+import json
+import uuid
+
+import pandas as pd
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+
+from core.exports import IteratorFile
+from .encoding_detection import FALLBACK_ENCODINGS
+
+UPLOAD_DIR = 'imports/uploads'
+
+SESSION_UPLOAD_KEY = 'csv_upload_id'
+
+# Bytes iniciales del archivo usados para detectar codificación y delimitador
+SNIFF_SIZE = 64 * 1024
+
+# Filas por bloque al recorrer una carga completa
+UPLOAD_CHUNK_SIZE = 5000
+
+# Filas que se muestran en la vista previa del asistente
+PREVIEW_ROWS = 10
+
+
+def get_upload_path(upload_id):
+    """Ruta del CSV (UTF-8) de una carga"""
+    return f'{UPLOAD_DIR}/{upload_id}.csv'
+
+
+def get_meta_path(upload_id):
+    """Ruta de los datos detectados de una carga"""
+    return f'{UPLOAD_DIR}/{upload_id}.json'
+
+
+class CsvRowCounter:
+    """
+    Contar las filas de datos de un CSV a medida que se recorre su texto
+    Se cuentan los saltos de línea fuera de comillas (un campo entre
+    comillas puede contener saltos de línea), sin la fila de encabezado.
+    """
+
+    def __init__(self):
+        self.line_breaks = 0
+        self.in_quotes = False
+        # Hay contenido después del último salto de línea (última fila sin \n)
+        self.pending = False
+
+    def feed(self, text):
+        if not text:
+            return
+        for position, segment in enumerate(text.split('"')):
+            if position:
+                self.in_quotes = not self.in_quotes
+            if not self.in_quotes:
+                self.line_breaks += segment.count('\n')
+        self.pending = self.in_quotes or not text.endswith('\n')
+
+    @property
+    def rows(self):
+        return max(0, self.line_breaks + self.pending - 1)
+
+
+def _transcode(chunks, encoding, errors='strict', counter=None):
+    """
+    Decodificar bloques de bytes en la codificación indicada y recodificarlos en UTF-8
+    Si se indica counter (CsvRowCounter), cuenta las filas del texto decodificado
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            if counter is not None:
+                counter.feed(text)
+            yield text.encode('utf-8')
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        if counter is not None:
+            counter.feed(tail)
+        yield tail.encode('utf-8')
+
+
+def save_upload_stream(uploaded_file, encoding):
+    """
+    Guardar un archivo cargado transcodificándolo a UTF-8 por bloques
+    Si el archivo no es válido en la codificación detectada (solo se
+    verificaron muestras) se reintenta con las codificaciones de respaldo.
+    Las filas de datos se cuentan en la misma pasada, sin parsear el CSV.
+    Retorna el id de la carga, la codificación usada y el número de filas.
+    """
+    upload_id = uuid.uuid4().hex
+    path = get_upload_path(upload_id)
+    candidates = [encoding] + [fallback for fallback in FALLBACK_ENCODINGS if fallback != encoding]
+    for candidate in candidates:
+        try:
+            uploaded_file.seek(0)
+            counter = CsvRowCounter()
+            default_storage.save(path, File(IteratorFile(_transcode(uploaded_file.chunks(), candidate, counter=counter))))
+            return upload_id, candidate, counter.rows
+        except UnicodeDecodeError:
+            if default_storage.exists(path):
+                default_storage.delete(path)
+    raise UnicodeDecodeError(encoding, b'', 0, 0, 'el archivo no es válido en ninguna codificación soportada')
+
+
+def save_upload_meta(upload_id, **meta):
+    """Guardar junto a la carga los datos detectados (codificación, delimitador, filas)"""
+    path = get_meta_path(upload_id)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(json.dumps(meta).encode('utf-8')))
+
+
+def update_upload_meta(upload_id, **meta):
+    """Agregar datos a los guardados de una carga"""
+    save_upload_meta(upload_id, **{**get_upload_meta(upload_id), **meta})
+
+
+def get_upload_meta(upload_id):
+    """Datos detectados de una carga ({} si no se guardaron)"""
+    path = get_meta_path(upload_id)
+    if not upload_id or not default_storage.exists(path):
+        return {}
+    with default_storage.open(path, 'rb') as meta:
+        return json.loads(meta.read())
+
+
+def upload_exists(upload_id):
+    return bool(upload_id) and default_storage.exists(get_upload_path(upload_id))
+
+
+def read_csv_chunks(source, delimiter, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Leer un CSV UTF-8 por bloques de filas (todas las columnas como texto)"""
+    return pd.read_csv(
+        source,
+        delimiter=delimiter,
+        encoding='utf-8',
+        header=0,
+        dtype=str,
+        chunksize=chunk_size,
+    )
+
+
+def iter_upload_chunks(upload_id, delimiter, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Iterar los bloques (DataFrames) de una carga"""
+    with default_storage.open(get_upload_path(upload_id), 'rb') as source:
+        yield from read_csv_chunks(source, delimiter, chunk_size)
+
+
+def load_upload_preview(upload_id, delimiter, nrows=PREVIEW_ROWS):
+    """Primeras filas de una carga (sin leer el resto del archivo)"""
+    with default_storage.open(get_upload_path(upload_id), 'rb') as source:
+        return pd.read_csv(source, delimiter=delimiter, encoding='utf-8', header=0, dtype=str, nrows=nrows)
+
+
+def count_upload_rows(upload_id):
+    """Número de filas de datos de una carga guardada, recorriéndola por bloques sin parsearla"""
+    counter = CsvRowCounter()
+    with default_storage.open(get_upload_path(upload_id), 'rb') as source:
+        for _ in _transcode(source.chunks(), 'utf-8', counter=counter):
+            pass
+    return counter.rows
+
+
+def delete_upload(upload_id, keep_source=False):
+    """Eliminar los archivos de una carga (el CSV se conserva si lo usa un job)"""
+    if not upload_id:
+        return
+    paths = [get_meta_path(upload_id)]
+    if not keep_source:
+        paths.append(get_upload_path(upload_id))
+    for path in paths:
+        if default_storage.exists(path):
+            default_storage.delete(path)
@@ -4,23 +4,24 @@ Vistas de importación y exportación de usuarios - Archivo principal refactoriz
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse
+from django.core.exceptions import PermissionDenied
 from core.models import Role
+from core.exports import stream_export
+from ..exports import is_admin
 from .import_handlers import (
     handle_csv_upload,
     handle_column_mapping,
     handle_import_confirmation,
+    get_upload_row_count,
     cleanup_import_session
 )
 from .import_config import (
     process_import_config,
     prepare_step2_context
 )
-from .data_processor import (
-    generate_preview_data,
-    process_import_data
-)
-import csv
+from .data_processor import generate_preview_data
+from .import_jobs import create_import_job, start_import_job
+from .upload_store import SESSION_UPLOAD_KEY, load_upload_preview
 
 
 @login_required
@@ -70,16 +71,9 @@ def _handle_column_mapping_step(request):
     
     # Procesar CSV para preview de importación
     try:
-        import pandas as pd
-        import io
-        
-        csv_data = request.session.get('csv_data')
-        df = pd.read_csv(
-            io.StringIO(csv_data),
-            delimiter=import_config['delimiter'],
-            encoding=import_config['encoding'],
-            header=0
-        )
+        upload_id = request.session.get(SESSION_UPLOAD_KEY)
+        df = load_upload_preview(upload_id, import_config['delimiter'])
+        total_rows = get_upload_row_count(request, upload_id, import_config['delimiter'])
         
         # Generar preview
         preview_data = generate_preview_data(df, column_mapping, import_config)
@@ -92,7 +86,7 @@ def _handle_column_mapping_step(request):
         context = {
             'step': 3,
             'preview_data': preview_data,
-            'total_rows': len(df),
+            'total_rows': total_rows,
             'roles': roles,
             'column_mapping': column_mapping,
             'import_config': import_config,
@@ -106,68 +100,32 @@ def _handle_column_mapping_step(request):
 
 
 def _handle_import_confirmation_step(request):
-    """Manejar el paso 3: Confirmación de importación"""
-    df = handle_import_confirmation(request)
-    if df is None:  # Error
+    """Manejar el paso 3: Confirmación de importación (se procesa en segundo plano)"""
+    total_rows = handle_import_confirmation(request)
+    if not isinstance(total_rows, int):  # Error
         return redirect('CPdashadmin:user_import')
     
-    # Obtener datos de sesión
-    column_mapping = request.session.get('column_mapping')
-    import_config = request.session.get('import_config')
-    
-    # Procesar importación
-    success_count, error_count, errors, conflicts = process_import_data(
-        df, column_mapping, import_config, request
+    # Crear job de importación con los datos de sesión
+    job = create_import_job(
+        request,
+        request.session.get(SESSION_UPLOAD_KEY),
+        total_rows,
+        request.session.get('column_mapping'),
+        request.session.get('import_config'),
     )
+    start_import_job(job)
     
-    # Limpiar sesión
-    cleanup_import_session(request)
-    
-    # Mostrar resultados
-    if success_count > 0:
-        messages.success(request, f'Importación completada: {success_count} usuarios procesados exitosamente.')
-    if conflicts:
-        messages.warning(request, f'{len(conflicts)} conflictos detectados (usuarios ya existentes).')
-    if error_count > 0:
-        messages.warning(request, f'{error_count} errores durante la importación.')
+    # Limpiar sesión (el CSV de la carga queda como archivo del job)
+    cleanup_import_session(request, keep_upload=True)
     
-    return redirect('CPdashadmin:user_management')
+    messages.info(request, f'Importación iniciada: {total_rows} filas se procesarán en segundo plano.')
+    return redirect('CPdashadmin:import_job_detail', job_id=job.pk)
 
 
 @login_required
 def user_export(request):
-    """Exportar usuarios a CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="usuarios.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Username', 'Email', 'Nombre', 'Apellido', 'Cargo', 'Departamento', 
-        'Ubicación', 'Número de Empleado', 'ID SAP', 'Rol', 'Estado', 
-        'Acceso', 'Último Acceso', 'Fecha de Creación'
-    ])
-    
-    # Solo usuarios de la empresa actual
-    from core.models import User
-    users = User.objects.filter(company=request.user.company).prefetch_related('userrole_set__role')
-    
-    for user in users:
-        roles = ', '.join([ur.role.name for ur in user.userrole_set.all()])
-        writer.writerow([
-            user.username,
-            user.email,
-            user.first_name,
-            user.last_name,
-            user.title or '',
-            user.department or '',
-            user.location or '',
-            user.employee_number or '',
-            user.sap_id or '',
-            roles,
-            'Activo' if user.is_active else 'Inactivo',
-            'Permitido' if user.can_access else 'Denegado',
-            user.last_login.strftime('%d/%m/%Y %H:%M') if user.last_login else 'Nunca',
-            user.date_joined.strftime('%d/%m/%Y %H:%M')
-        ])
-    
-    return response
+    """Exportar usuarios a CSV (en streaming, ?compress=1 para gzip; solo administradores)"""
+    if not is_admin(request.user, request.roles):
+        raise PermissionDenied('Solo los administradores pueden exportar datos')
+    compress = request.GET.get('compress', '').lower() in ('1', 'true', 'yes')
+    return stream_export('users', request.user.company, compress=compress)
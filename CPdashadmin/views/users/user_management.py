@@ -5,8 +5,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
 from core.models import User, Role, UserRole, AuthLoginAudit
+from core.search import search_users
 
 
 @login_required
@@ -22,12 +22,7 @@ def user_management(request):
     
     # Aplicar filtros
     if search:
-        users = users.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+        users = search_users(users, search, company=request.user.company)
     
     if role_filter:
         users = users.filter(userrole_set__role__name=role_filter)
@@ -3,17 +3,19 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from core.models import User, Ticket, Company
+from core.roles import resolve_user_roles
 
 
-def is_other_role(user):
+def is_other_role(user, roles=None):
     """
     Verificar si el usuario tiene un rol diferente a admin o technician
+    roles: roles ya resueltos (request.roles); si no se indican se consultan
     """
     try:
-        user_role = user.userrole_set.first()
-        if user_role:
-            role_key = user_role.role.key
-            return user.is_authenticated and role_key not in ['admin', 'technician']
+        if roles is None:
+            roles = resolve_user_roles(user)
+        if roles:
+            return user.is_authenticated and roles.primary not in ['admin', 'technician']
         else:
             return user.is_authenticated and not user.is_superuser
     except:
@@ -26,7 +28,7 @@ def dashboard(request):
     Dashboard principal para otros roles
     """
     # Verificar que no sea admin ni technician
-    if not is_other_role(request.user):
+    if not is_other_role(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -59,7 +61,7 @@ def my_tickets(request):
     """
     Lista de tickets creados por el usuario
     """
-    if not is_other_role(request.user):
+    if not is_other_role(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -78,7 +80,7 @@ def create_ticket(request):
     """
     Crear nuevo ticket
     """
-    if not is_other_role(request.user):
+    if not is_other_role(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -110,7 +112,7 @@ def profile(request):
     """
     Perfil del usuario
     """
-    if not is_other_role(request.user):
+    if not is_other_role(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -4,16 +4,20 @@ from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 from django.db.models import Count, Q
 from django.core.paginator import Paginator
+from core.db_router import read_replica
 from core.models import User, Ticket, Company, TicketCategory, TicketSubcategory
+from core.roles import resolve_user_roles
 
 
-def is_technician(user):
+def is_technician(user, roles=None):
     """
     Verificar si el usuario es técnico
+    roles: roles ya resueltos (request.roles); si no se indican se consultan
     """
     try:
-        user_role = user.userrole_set.first()
-        return user.is_authenticated and user_role and user_role.role.key == 'technician'
+        if roles is None:
+            roles = resolve_user_roles(user)
+        return user.is_authenticated and bool(roles) and roles.primary == 'technician'
     except:
         return False
 
@@ -24,7 +28,7 @@ def dashboard(request):
     Dashboard principal del técnico con datos reales
     """
     # Verificar que sea técnico
-    if not is_technician(request.user):
+    if not is_technician(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -74,7 +78,7 @@ def my_tickets(request):
     """
     Lista de tickets asignados al técnico con filtros reales
     """
-    if not is_technician(request.user):
+    if not is_technician(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -134,7 +138,7 @@ def profile(request):
     """
     Perfil del técnico con funcionalidad real
     """
-    if not is_technician(request.user):
+    if not is_technician(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -184,7 +188,7 @@ def ticket_detail(request, ticket_id):
     """
     Detalle de un ticket específico
     """
-    if not is_technician(request.user):
+    if not is_technician(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -208,11 +212,12 @@ def ticket_detail(request, ticket_id):
 
 
 @login_required
+@read_replica
 def reports(request):
     """
     Reportes del técnico
     """
-    if not is_technician(request.user):
+    if not is_technician(request.user, request.roles):
         messages.error(request, "No tienes permisos para acceder a esta sección.")
         return redirect('CPlogin:login')
     
@@ -6,21 +6,20 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from core.models import Company, User, AuthLoginAudit, UserRole
+from core.roles import get_request_roles, resolve_user_roles
 import json
 
 
-def redirect_user_by_role(user):
+def redirect_user_by_role(user, roles=None):
     """
     Redirigir al usuario según su rol
+    roles: roles ya resueltos (request.roles); si no se indican se consultan
     """
     # Obtener el rol principal del usuario
     try:
-        user_role = user.userrole_set.first()
-        if user_role:
-            role_key = user_role.role.key
-        else:
-            # Si no tiene rol asignado, verificar si es superuser
-            role_key = 'admin' if user.is_superuser else 'user'
+        if roles is None:
+            roles = resolve_user_roles(user)
+        role_key = roles.primary
     except:
         role_key = 'user'
     
@@ -40,7 +39,7 @@ def login_view(request):
     """
     # Si ya está autenticado, redirigir según su rol
     if request.user.is_authenticated:
-        return redirect_user_by_role(request.user)
+        return redirect_user_by_role(request.user, request.roles)
     
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -82,7 +81,7 @@ def login_view(request):
                 
                 # Redirigir según el rol
                 messages.success(request, f"Bienvenido, {user.get_full_name() or user.username}!")
-                return redirect_user_by_role(user)
+                return redirect_user_by_role(user, get_request_roles(request))
             else:
                 # Login fallido
                 messages.error(request, "Usuario o contraseña incorrectos.")
@@ -169,7 +168,7 @@ def change_password(request):
             login(request, user)
         
         messages.success(request, "Contraseña cambiada exitosamente.")
-        return redirect_user_by_role(user)
+        return redirect_user_by_role(user, get_request_roles(request))
     
     # Pasar información del usuario al contexto
     context = {
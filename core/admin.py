@@ -7,7 +7,7 @@ from django.utils.html import format_html, mark_safe
 from .models import (
     SystemSetup, Company, Role, User, UserRole, AuthLoginAudit,
     TicketTemplate, TicketTemplateField, TicketCategory, TicketSubcategory,
-    WorkSession, Ticket, TicketTurn, Kiosk, KioskRegistrationToken
+    WorkSession, Ticket, TicketTurn, Kiosk, KioskRegistrationToken, ImportJob, ExportJob
 )
 
 @admin.register(SystemSetup)
@@ -216,3 +216,20 @@ class KioskRegistrationTokenAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'user__company')
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'company', 'created_by', 'status', 'processed_rows', 'total_rows', 'success_count', 'error_count', 'created_at']
+    list_filter = ['status', 'company', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'updated_at']
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'company', 'created_by', 'dataset', 'status', 'size', 'created_at']
+    list_filter = ['status', 'dataset', 'company', 'created_at']
+    ordering = ['-created_at']
+    # El archivo no tiene URL pública (core.storage): no se muestra en el admin
+    exclude = ['file']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'updated_at']
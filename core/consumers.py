@@ -3,29 +3,82 @@ Consumers para WebSockets con Channels
 """
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
+from django.conf import settings
 from django.utils import timezone
+from .db_config import bounded_database_sync_to_async
+from .metrics import WEBSOCKET_CONNECTIONS, CHANNEL_LAYER_FAILURES
 from .models import Kiosk, Ticket, TicketTurn
+from .redis_config import async_redis_manager
 
+# Claves de Redis de los kioskos: presencia (último heartbeat) y empresa
+KIOSK_PRESENCE_KEY = 'kiosk:presence:{kiosk_id}'
+KIOSK_COMPANY_KEY = 'kiosk:company:{kiosk_id}'
 
-class KioskConsumer(AsyncWebsocketConsumer):
-    """Consumer para comunicación con kioskos individuales"""
+
+class MetricsConsumerMixin:
+    """Contar conexiones abiertas por tipo de consumer y empresa, y fallos de la capa de canales"""
+    consumer_type = None
+    metrics_company_id = None
+    metrics_counted = False
+    
+    async def join_group(self, company_id):
+        """Unirse a room_group_name (la empresa etiqueta la conexión en las métricas)"""
+        try:
+            await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        except Exception:
+            CHANNEL_LAYER_FAILURES.inc(operation='group_add')
+            raise
+        self.metrics_company_id = company_id
+    
+    async def leave_group(self):
+        """Salir de room_group_name y descontar la conexión"""
+        if self.metrics_counted:
+            WEBSOCKET_CONNECTIONS.dec(consumer=self.consumer_type, company=self.metrics_company_id)
+            self.metrics_counted = False
+        if self.metrics_company_id is None:
+            return
+        self.metrics_company_id = None
+        try:
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        except Exception:
+            CHANNEL_LAYER_FAILURES.inc(operation='group_discard')
+            raise
+    
+    async def accept(self, subprotocol=None):
+        await super().accept(subprotocol)
+        WEBSOCKET_CONNECTIONS.inc(consumer=self.consumer_type, company=self.metrics_company_id)
+        self.metrics_counted = True
+
+
+class KioskConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
+    """
+    Consumer para comunicación con kioskos individuales
+    
+    Los heartbeats se registran en Redis (KIOSK_PRESENCE_KEY, con expiración
+    KIOSK_PRESENCE_TTL) con el cliente asyncio, sin pasar por el pool de hilos.
+    Kiosk.last_heartbeat se guarda en la base de datos al conectar y luego como
+    máximo cada KIOSK_HEARTBEAT_PERSIST_INTERVAL segundos, también si Redis no
+    está disponible (el circuit breaker de redis_config evita reintentarlo en
+    cada heartbeat): una caída de Redis no multiplica las escrituras.
+    """
+    consumer_type = 'kiosk'
+    heartbeat_persisted_at = None
     
     async def connect(self):
         """Conectar al WebSocket"""
         self.kiosk_id = self.scope['url_route']['kwargs']['kiosk_id']
         self.room_group_name = f'kiosk_{self.kiosk_id}'
         
-        # Verificar que el kiosco existe
-        if await self.kiosk_exists():
+        # Verificar que el kiosco existe (y obtener su empresa)
+        company_id = await self.get_kiosk_company_id()
+        if company_id is not None:
+            self.company_id = company_id
+            
             # Unirse al grupo del kiosco
-            await self.channel_layer.group_add(
-                self.room_group_name,
-                self.channel_name
-            )
+            await self.join_group(company_id)
             
             # Actualizar último heartbeat
-            await self.update_heartbeat()
+            await self.update_heartbeat(persist=True)
             
             await self.accept()
             
@@ -41,10 +94,7 @@ class KioskConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Desconectar del WebSocket"""
         # Salir del grupo del kiosco
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave_group()
     
     async def receive(self, text_data):
         """Recibir mensaje del WebSocket"""
@@ -80,36 +130,59 @@ class KioskConsumer(AsyncWebsocketConsumer):
         """Enviar mensaje al kiosco"""
         await self.send(text_data=json.dumps(event))
     
-    @database_sync_to_async
-    def kiosk_exists(self):
-        """Verificar que el kiosco existe"""
-        return Kiosk.objects.filter(id=self.kiosk_id).exists()
+    async def get_kiosk_company_id(self):
+        """Empresa del kiosco (None si no existe), primero desde Redis"""
+        key = KIOSK_COMPANY_KEY.format(kiosk_id=self.kiosk_id)
+        company_id = await async_redis_manager.get_json(key)
+        if company_id is None:
+            company_id = await self.fetch_kiosk_company_id()
+            if company_id is not None:
+                await async_redis_manager.set_with_expiry(
+                    key, company_id, expiry=getattr(settings, 'KIOSK_LOOKUP_CACHE_SECONDS', 300)
+                )
+        return company_id
     
-    @database_sync_to_async
-    def update_heartbeat(self):
-        """Actualizar último heartbeat del kiosco"""
-        try:
-            kiosk = Kiosk.objects.get(id=self.kiosk_id)
-            kiosk.last_heartbeat = timezone.now()
-            kiosk.save()
-        except Kiosk.DoesNotExist:
-            pass
+    @bounded_database_sync_to_async
+    def fetch_kiosk_company_id(self):
+        return Kiosk.objects.filter(id=self.kiosk_id).values_list('company_id', flat=True).first()
+    
+    async def update_heartbeat(self, persist=False):
+        """Actualizar último heartbeat del kiosco (presencia en Redis y, cada cierto tiempo, en la base de datos)"""
+        now = timezone.now()
+        await async_redis_manager.set_with_expiry(
+            KIOSK_PRESENCE_KEY.format(kiosk_id=self.kiosk_id),
+            {'company_id': self.company_id, 'last_heartbeat': now.isoformat()},
+            expiry=getattr(settings, 'KIOSK_PRESENCE_TTL', 90)
+        )
+        interval = getattr(settings, 'KIOSK_HEARTBEAT_PERSIST_INTERVAL', 60)
+        if (
+            persist or self.heartbeat_persisted_at is None
+            or (now - self.heartbeat_persisted_at).total_seconds() >= interval
+        ):
+            await self.persist_heartbeat(now)
+            self.heartbeat_persisted_at = now
+    
+    @bounded_database_sync_to_async
+    def persist_heartbeat(self, timestamp):
+        """Guardar el último heartbeat en la base de datos"""
+        Kiosk.objects.filter(id=self.kiosk_id).update(last_heartbeat=timestamp)
     
-    @database_sync_to_async
+    @bounded_database_sync_to_async
     def process_ticket_creation(self, data):
         """Procesar creación de ticket desde kiosco"""
         # TODO: Implementar lógica de creación de ticket
         pass
     
-    @database_sync_to_async
+    @bounded_database_sync_to_async
     def update_kiosk_status(self, data):
         """Actualizar estado del kiosco"""
         # TODO: Implementar actualización de estado
         pass
 
 
-class TechniciansConsumer(AsyncWebsocketConsumer):
+class TechniciansConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
     """Consumer para notificaciones a técnicos"""
+    consumer_type = 'technician'
     
     async def connect(self):
         """Conectar al WebSocket"""
@@ -117,10 +190,7 @@ class TechniciansConsumer(AsyncWebsocketConsumer):
         self.room_group_name = f'technicians_{self.company_id}'
         
         # Unirse al grupo de técnicos
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.join_group(self.company_id)
         
         await self.accept()
         
@@ -134,10 +204,7 @@ class TechniciansConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Desconectar del WebSocket"""
         # Salir del grupo de técnicos
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave_group()
     
     async def receive(self, text_data):
         """Recibir mensaje del WebSocket"""
@@ -159,15 +226,16 @@ class TechniciansConsumer(AsyncWebsocketConsumer):
         """Enviar mensaje al técnico"""
         await self.send(text_data=json.dumps(event))
     
-    @database_sync_to_async
+    @bounded_database_sync_to_async
     def update_technician_status(self, data):
         """Actualizar estado del técnico"""
         # TODO: Implementar actualización de estado
         pass
 
 
-class DisplayConsumer(AsyncWebsocketConsumer):
+class DisplayConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
     """Consumer para pantallas de turnos"""
+    consumer_type = 'display'
     
     async def connect(self):
         """Conectar al WebSocket"""
@@ -175,10 +243,7 @@ class DisplayConsumer(AsyncWebsocketConsumer):
         self.room_group_name = f'display_{self.company_id}'
         
         # Unirse al grupo de pantallas
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.join_group(self.company_id)
         
         await self.accept()
         
@@ -192,10 +257,7 @@ class DisplayConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Desconectar del WebSocket"""
         # Salir del grupo de pantallas
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave_group()
     
     async def receive(self, text_data):
         """Recibir mensaje del WebSocket"""
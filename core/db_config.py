@@ -1,56 +1,275 @@
 """
 Configuración de SQL Server para la aplicación core
+
+Conexiones:
+- WSGI: conexiones persistentes por hilo (CONN_MAX_AGE) verificadas antes de
+  reutilizarlas (CONN_HEALTH_CHECKS).
+- ASGI: cada petición síncrona corre en un hilo propio, por lo que una conexión
+  persistente quedaría abierta en un hilo que no vuelve a usarse.
+  configure_asgi_connections() aplica DB_ASGI_CONN_MAX_AGE (0: cerrar al
+  terminar) y la reapertura la resuelve el pool del driver ODBC (pyodbc).
+- Código asíncrono (consumers): database_sync_to_async es sensible al hilo y,
+  fuera de una petición HTTP, ejecuta todo en el único hilo síncrono de
+  asgiref (una operación a la vez por proceso, compartida con el resto del
+  código síncrono). bounded_database_sync_to_async usa en cambio un pool
+  propio (db_executor) de DB_ASYNC_MAX_CONNECTIONS hilos: como máximo esas
+  operaciones y conexiones simultáneas por proceso. Una operación que no
+  empieza en DB_ASYNC_ACQUIRE_TIMEOUT segundos se cancela sin ejecutarse y
+  lanza TimeoutError; la espera en cola, las operaciones en curso y las
+  cancelaciones se miden (servicenow_db_async_*).
+
+SQL directo: DatabaseManager ejecuta dentro de transaction.atomic (sin
+commit/rollback manuales), itera resultados grandes por bloques (iter_query) y
+hace cargas masivas con fast_executemany y MERGE en SQL Server (execute_many,
+bulk_upsert).
 """
-from django.db import connection
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections, transaction
 from django.conf import settings
 import logging
 from datetime import datetime
 
+from .metrics import DB_ASYNC_IN_USE, DB_ASYNC_TIMEOUTS, DB_ASYNC_WAIT_SECONDS
+
 logger = logging.getLogger(__name__)
 
+
+def configure_asgi_connections():
+    """Aplicar DB_ASGI_CONN_MAX_AGE a todas las bases de datos (antes de abrir conexiones)"""
+    max_age = getattr(settings, 'DB_ASGI_CONN_MAX_AGE', 0)
+    for alias in settings.DATABASES:
+        settings.DATABASES[alias]['CONN_MAX_AGE'] = max_age
+
+
+class DatabaseExecutor:
+    """
+    Pool de hilos propio para el acceso a la base de datos desde código asíncrono
+    Se crea al primer uso con DB_ASYNC_MAX_CONNECTIONS hilos; el resto de las
+    operaciones espera en su cola hasta DB_ASYNC_ACQUIRE_TIMEOUT segundos
+    """
+    
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'DB_ASYNC_MAX_CONNECTIONS', 20),
+                    thread_name_prefix='db-async',
+                )
+            return self._executor
+    
+    def shutdown(self):
+        """Cerrar el pool (se vuelve a crear al siguiente uso)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+    
+    @staticmethod
+    def _call(queued_at, func, args, kwargs):
+        # Como database_sync_to_async: conexiones vencidas o rotas se cierran antes y después
+        DB_ASYNC_WAIT_SECONDS.observe(perf_counter() - queued_at)
+        DB_ASYNC_IN_USE.inc()
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            DB_ASYNC_IN_USE.dec()
+    
+    async def run(self, func, *args, **kwargs):
+        """
+        Ejecutar la función síncrona func en el pool y esperar su resultado
+        Lanza TimeoutError si no empezó en DB_ASYNC_ACQUIRE_TIMEOUT segundos
+        (la operación se cancela sin ejecutarse)
+        """
+        context = contextvars.copy_context()
+        future = self.get_executor().submit(context.run, self._call, perf_counter(), func, args, kwargs)
+        result = asyncio.wrap_future(future)
+        try:
+            done, _ = await asyncio.wait({result}, timeout=getattr(settings, 'DB_ASYNC_ACQUIRE_TIMEOUT', 10))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        # Una operación ya en curso no se interrumpe: se espera a que termine
+        if not done and future.cancel():
+            DB_ASYNC_TIMEOUTS.inc()
+            logger.warning('Tiempo de espera agotado por un turno en el pool de base de datos')
+            raise asyncio.TimeoutError('Sin turno libre en el pool de base de datos')
+        return await result
+
+
+db_executor = DatabaseExecutor()
+
+
+def bounded_database_sync_to_async(func):
+    """Como database_sync_to_async, pero ejecutando func en db_executor"""
+    @functools.wraps(func)
+    async def inner(*args, **kwargs):
+        return await db_executor.run(func, *args, **kwargs)
+    
+    return inner
+
+
 class DatabaseManager:
     """
     Gestor de base de datos SQL Server
     """
     
     @staticmethod
-    def execute_query(query, params=None):
+    def atomic(using=DEFAULT_DB_ALIAS):
+        """
+        Transacción para agrupar varias operaciones (transaction.atomic)
+        Dentro de otra transacción se anida con un savepoint
+        """
+        return transaction.atomic(using=using)
+    
+    @staticmethod
+    def execute_query(query, params=None, using=DEFAULT_DB_ALIAS):
         """
         Ejecutar consulta SQL con parámetros
+        Retorna una lista de diccionarios si la consulta devuelve filas (SELECT,
+        WITH ... SELECT, OUTPUT) o el número de filas afectadas en otro caso.
+        Se ejecuta en una transacción: si ya hay una en curso, se confirma o
+        revierte con ella.
         """
         try:
-            with connection.cursor() as cursor:
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                
-                if query.strip().upper().startswith('SELECT'):
+            with transaction.atomic(using=using), connections[using].cursor() as cursor:
+                cursor.execute(query, params or None)
+                if cursor.description is not None:
                     columns = [col[0] for col in cursor.description]
-                    rows = cursor.fetchall()
-                    return [dict(zip(columns, row)) for row in rows]
-                else:
-                    connection.commit()
-                    return cursor.rowcount
-                    
+                    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return cursor.rowcount
         except Exception as e:
             logger.error(f"Error ejecutando consulta: {e}")
-            connection.rollback()
             raise
     
     @staticmethod
-    def execute_many(query, params_list):
+    def iter_query(query, params=None, using=DEFAULT_DB_ALIAS, chunk_size=2000):
+        """
+        Iterar las filas (diccionarios) de una consulta por bloques de chunk_size
+        con fetchmany, sin cargar el resultado completo en memoria.
+        En SQL Server sin MARS la conexión no admite otras consultas mientras
+        el iterador no se haya consumido.
+        """
+        with connections[using].cursor() as cursor:
+            cursor.execute(query, params or None)
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(columns, row))
+    
+    @staticmethod
+    def _enable_fast_executemany(cursor):
+        """Activar fast_executemany de pyodbc (parámetros enviados en bloque) si el driver lo soporta"""
+        raw = cursor.cursor
+        raw = getattr(raw, 'cursor', raw)  # cursor de pyodbc dentro del CursorWrapper de mssql
+        if hasattr(raw, 'fast_executemany'):
+            raw.fast_executemany = True
+    
+    @staticmethod
+    def _batches(rows, batch_size):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    @staticmethod
+    def execute_many(query, params_list, using=DEFAULT_DB_ALIAS, batch_size=5000):
         """
         Ejecutar la misma consulta con múltiples conjuntos de parámetros
+        params_list puede ser cualquier iterable: se envía por lotes de
+        batch_size (con fast_executemany en SQL Server), todo en una transacción.
+        Retorna el número de conjuntos de parámetros ejecutados.
         """
+        total = 0
         try:
-            with connection.cursor() as cursor:
-                cursor.executemany(query, params_list)
-                connection.commit()
-                return cursor.rowcount
+            with transaction.atomic(using=using), connections[using].cursor() as cursor:
+                DatabaseManager._enable_fast_executemany(cursor)
+                for batch in DatabaseManager._batches(params_list, batch_size):
+                    cursor.executemany(query, batch)
+                    total += len(batch)
+            return total
         except Exception as e:
             logger.error(f"Error ejecutando múltiples consultas: {e}")
-            connection.rollback()
+            raise
+    
+    @staticmethod
+    def bulk_upsert(table, columns, rows, key_columns, using=DEFAULT_DB_ALIAS, batch_size=5000):
+        """
+        Insertar o actualizar filas (tuplas en el orden de columns) según key_columns
+        
+        SQL Server: carga las filas en una tabla temporal con fast_executemany y
+        aplica un solo MERGE sobre la tabla. Otros motores (SQLite, PostgreSQL):
+        INSERT ... ON CONFLICT (key_columns) DO UPDATE por lotes.
+        Las columnas de identidad no deben estar en columns.
+        Retorna el número de filas recibidas.
+        """
+        db = connections[using]
+        quote = db.ops.quote_name
+        table = quote(table)
+        column_list = ', '.join(quote(column) for column in columns)
+        updates = [column for column in columns if column not in key_columns]
+        placeholders = ', '.join(['%s'] * len(columns))
+        
+        if db.vendor != 'microsoft':
+            if updates:
+                action = 'DO UPDATE SET ' + ', '.join(f'{quote(c)} = excluded.{quote(c)}' for c in updates)
+            else:
+                action = 'DO NOTHING'
+            query = (
+                f'INSERT INTO {table} ({column_list}) VALUES ({placeholders}) '
+                f'ON CONFLICT ({", ".join(quote(c) for c in key_columns)}) {action}'
+            )
+            return DatabaseManager.execute_many(query, rows, using=using, batch_size=batch_size)
+        
+        stage = '#bulk_upsert'
+        match = ' AND '.join(f'target.{quote(c)} = source.{quote(c)}' for c in key_columns)
+        insert_values = ', '.join(f'source.{quote(c)}' for c in columns)
+        update_clause = ''
+        if updates:
+            update_clause = 'WHEN MATCHED THEN UPDATE SET ' + ', '.join(
+                f'target.{quote(c)} = source.{quote(c)}' for c in updates
+            ) + ' '
+        try:
+            with transaction.atomic(using=using), db.cursor() as cursor:
+                # UNION ALL evita que la tabla temporal herede propiedades IDENTITY
+                cursor.execute(
+                    f'SELECT TOP 0 {column_list} INTO {stage} FROM {table} '
+                    f'UNION ALL SELECT TOP 0 {column_list} FROM {table}'
+                )
+                try:
+                    DatabaseManager._enable_fast_executemany(cursor)
+                    total = 0
+                    for batch in DatabaseManager._batches(rows, batch_size):
+                        cursor.executemany(f'INSERT INTO {stage} ({column_list}) VALUES ({placeholders})', batch)
+                        total += len(batch)
+                    cursor.execute(
+                        f'MERGE {table} WITH (HOLDLOCK) AS target USING {stage} AS source ON {match} '
+                        f'{update_clause}'
+                        f'WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({insert_values});'
+                    )
+                finally:
+                    cursor.execute(f'DROP TABLE {stage}')
+            return total
+        except Exception as e:
+            logger.error(f"Error en carga masiva sobre {table}: {e}")
             raise
     
     @staticmethod
@@ -0,0 +1,122 @@
+"""
+Enrutamiento de lecturas de reportes a una réplica de solo lectura
+
+Solo las lecturas marcadas con use_replica() (o las vistas con @read_replica)
+van a DATABASE_REPLICA_ALIAS; el resto de lecturas y todas las escrituras usan
+'default'. Si el alias no está en DATABASES, todo se lee de 'default'.
+
+Lectura de las propias escrituras: tras una escritura, las lecturas de la misma
+petición vuelven a 'default' y ReplicaStickinessMiddleware fija al cliente en
+'default' durante READ_REPLICA_STICKY_SECONDS (cookie), mientras la réplica se
+pone al día. Fuera de una petición (comandos, hilos) las escrituras no fijan
+las lecturas: quien combine escrituras y use_replica() debe decidirlo.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY_ALIAS = 'default'
+
+# Cookie que fija al cliente en la base de datos principal tras escribir
+PIN_COOKIE = 'db_primary_pin'
+
+_replica_requested = ContextVar('replica_requested', default=False)
+_primary_pinned = ContextVar('primary_pinned', default=False)
+# None fuera de una petición (sin seguimiento de escrituras)
+_primary_written = ContextVar('primary_written', default=None)
+
+
+def get_replica_alias():
+    """Alias de la réplica (None si no está configurada)"""
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def primary_pinned():
+    """Las lecturas del contexto actual deben ir a la base de datos principal"""
+    return _primary_pinned.get() or bool(_primary_written.get())
+
+
+@contextmanager
+def use_replica():
+    """Enviar a la réplica las lecturas del bloque (salvo si el cliente está fijado en la principal)"""
+    token = _replica_requested.set(True)
+    try:
+        yield
+    finally:
+        _replica_requested.reset(token)
+
+
+def read_replica(view_func):
+    """Decorador de vistas de reportes: lecturas en la réplica"""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return view_func(*args, **kwargs)
+    return wrapper
+
+
+def iter_on_replica(iterable):
+    """
+    Iterar leyendo de la réplica (p. ej. el contenido de una respuesta en
+    streaming, que se consume después de que la vista retorna)
+    La fijación en la principal se decide al crear el iterador
+    """
+    if primary_pinned() or get_replica_alias() is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        with use_replica():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def track_primary_pin(pinned):
+    """
+    Estado de lectura de las propias escrituras de una petición
+    pinned: el cliente escribió hace menos de READ_REPLICA_STICKY_SECONDS
+    Retorna (en el bloque) una función que indica si la petición escribió
+    """
+    pinned_token = _primary_pinned.set(pinned)
+    written_token = _primary_written.set(False)
+    try:
+        yield _primary_written.get
+    finally:
+        _primary_written.reset(written_token)
+        _primary_pinned.reset(pinned_token)
+
+
+class ReplicaRouter:
+    """Router de bases de datos: principal para escrituras, réplica para lecturas de reportes"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_requested.get() and not primary_pinned():
+            return get_replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Las lecturas siguientes de la petición deben ver esta escritura
+        if _primary_written.get() is False:
+            _primary_written.set(True)
+        # Explícito: si no, Django escribiría en instance._state.db (la réplica
+        # para instancias leídas dentro de use_replica())
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY_ALIAS, get_replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        if db == get_replica_alias():
+            return False
+        return None
@@ -0,0 +1,342 @@
+"""
+Exportación de datos en streaming (CSV y CSV comprimido con gzip)
+
+Cada dataset se lee por bloques con iterator(chunk_size=...) y se escribe
+fila a fila, de modo que la memoria usada no depende del tamaño de la
+empresa. Las exportaciones muy grandes pueden generarse en segundo plano
+como ExportJob: se toman con la misma maquinaria que las importaciones
+(core.jobs), se reanudan con el comando run_export_jobs si su runner se
+detiene, y el archivo va a un almacenamiento privado (core.storage) que
+solo se descarga por una vista autenticada.
+"""
+import csv
+import logging
+import threading
+import time
+import zlib
+
+from django.core.files.base import File
+from django.db import close_old_connections, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .db_router import iter_on_replica, primary_pinned
+from .jobs import claim_job
+
+logger = logging.getLogger(__name__)
+
+# Filas leídas por consulta en cada bloque
+EXPORT_CHUNK_SIZE = 2000
+
+# Segundos entre marcas de avance de un job de exportación en ejecución
+EXPORT_HEARTBEAT_SECONDS = 30
+
+DATE_FORMAT = '%d/%m/%Y %H:%M'
+
+
+def _format_date(value, default=''):
+    return value.strftime(DATE_FORMAT) if value else default
+
+
+def _full_name(user):
+    if user is None:
+        return ''
+    return user.get_full_name() or user.username
+
+
+# Definición de datasets
+
+def _users_queryset(company):
+    from django.db.models import Prefetch
+    from .models import User, UserRole
+    return (
+        User.objects.filter(company=company)
+        .order_by('pk')
+        .prefetch_related(Prefetch('userrole_set', queryset=UserRole.objects.select_related('role')))
+    )
+
+
+def _users_row(user):
+    roles = ', '.join([ur.role.name for ur in user.userrole_set.all()])
+    return [
+        user.username,
+        user.email,
+        user.first_name,
+        user.last_name,
+        user.title or '',
+        user.department or '',
+        user.location or '',
+        user.employee_number or '',
+        user.sap_id or '',
+        roles,
+        'Activo' if user.is_active else 'Inactivo',
+        'Permitido' if user.can_access else 'Denegado',
+        _format_date(user.last_login, 'Nunca'),
+        _format_date(user.date_joined),
+    ]
+
+
+def _tickets_queryset(company):
+    from .models import Ticket
+    return (
+        Ticket.objects.filter(company=company)
+        .order_by('pk')
+        .select_related('requester', 'assigned_to', 'category', 'subcategory')
+    )
+
+
+def _tickets_row(ticket):
+    return [
+        ticket.code,
+        ticket.get_status_display(),
+        ticket.get_priority_display(),
+        ticket.category.name,
+        ticket.subcategory.name if ticket.subcategory else '',
+        ticket.requester.username,
+        _full_name(ticket.requester),
+        _full_name(ticket.assigned_to),
+        _format_date(ticket.created_at),
+        _format_date(ticket.updated_at),
+    ]
+
+
+def _turns_queryset(company):
+    from .models import TicketTurn
+    return (
+        TicketTurn.objects.filter(ticket__company=company)
+        .order_by('pk')
+        .select_related('ticket', 'ticket__requester', 'ticket__category')
+    )
+
+
+def _turns_row(turn):
+    return [
+        turn.turn_number,
+        turn.ticket.code,
+        turn.ticket.category.name,
+        _full_name(turn.ticket.requester),
+        turn.display_message,
+        'Sí' if turn.is_called else 'No',
+        _format_date(turn.called_at),
+        _format_date(turn.created_at),
+    ]
+
+
+def _login_audit_queryset(company):
+    from .models import AuthLoginAudit
+    return (
+        AuthLoginAudit.objects.filter(user__company=company)
+        .order_by('pk')
+        .select_related('user')
+    )
+
+
+def _login_audit_row(audit):
+    return [
+        _format_date(audit.created_at),
+        audit.user.username if audit.user else '',
+        'Exitoso' if audit.success else 'Fallido',
+        audit.ip,
+        audit.user_agent,
+    ]
+
+
+EXPORT_DATASETS = {
+    'users': {
+        'filename': 'usuarios',
+        'header': [
+            'Username', 'Email', 'Nombre', 'Apellido', 'Cargo', 'Departamento',
+            'Ubicación', 'Número de Empleado', 'ID SAP', 'Rol', 'Estado',
+            'Acceso', 'Último Acceso', 'Fecha de Creación'
+        ],
+        'queryset': _users_queryset,
+        'row': _users_row,
+    },
+    'tickets': {
+        'filename': 'tickets',
+        'header': [
+            'Código', 'Estado', 'Prioridad', 'Categoría', 'Subcategoría',
+            'Username Solicitante', 'Solicitante', 'Asignado a',
+            'Fecha de Creación', 'Última Actualización'
+        ],
+        'queryset': _tickets_queryset,
+        'row': _tickets_row,
+    },
+    'turns': {
+        'filename': 'turnos',
+        'header': [
+            'Turno', 'Ticket', 'Categoría', 'Solicitante', 'Mensaje',
+            'Llamado', 'Fecha de Llamado', 'Fecha de Creación'
+        ],
+        'queryset': _turns_queryset,
+        'row': _turns_row,
+    },
+    'login_audit': {
+        'filename': 'auditoria_login',
+        'header': ['Fecha', 'Username', 'Resultado', 'IP', 'User Agent'],
+        'queryset': _login_audit_queryset,
+        'row': _login_audit_row,
+    },
+}
+
+
+# Generación del contenido
+
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(dataset, company, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterar las filas (listas) de un dataset, incluyendo la cabecera
+    """
+    definition = EXPORT_DATASETS[dataset]
+    yield definition['header']
+    row = definition['row']
+    for obj in definition['queryset'](company).iterator(chunk_size=chunk_size):
+        yield row(obj)
+
+
+def iter_csv(dataset, company, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterar las líneas CSV (str) de un dataset
+    """
+    writer = csv.writer(Echo())
+    for row in iter_rows(dataset, company, chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_gzip(lines, level=6):
+    """
+    Comprimir un iterador de líneas en formato gzip, por bloques
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for line in lines:
+        data = compressor.compress(line.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(dataset, company, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterar el contenido (bytes) de una exportación, opcionalmente comprimido
+    """
+    lines = iter_csv(dataset, company, chunk_size)
+    if compress:
+        return iter_gzip(lines)
+    return (line.encode('utf-8') for line in lines)
+
+
+def get_export_filename(dataset, compress=False):
+    """Nombre de archivo de una exportación"""
+    filename = f"{EXPORT_DATASETS[dataset]['filename']}.csv"
+    return f"{filename}.gz" if compress else filename
+
+
+def stream_export(dataset, company, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Respuesta StreamingHttpResponse con la exportación de un dataset
+    """
+    response = StreamingHttpResponse(
+        iter_on_replica(iter_export(dataset, company, compress, chunk_size)),
+        content_type='application/gzip' if compress else 'text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{get_export_filename(dataset, compress)}"'
+    return response
+
+
+# Exportaciones en segundo plano
+
+class IteratorFile:
+    """Objeto tipo archivo de solo lectura sobre un iterador de bytes"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def create_export_job(dataset, company, user=None, compress=False):
+    """Registrar un job de exportación pendiente"""
+    from .models import ExportJob
+    return ExportJob.objects.create(
+        company=company,
+        created_by=user,
+        dataset=dataset,
+        compress=compress,
+        # El hilo no hereda el contexto de la petición: decidir aquí si el cliente está fijado en la principal
+        use_replica=not primary_pinned(),
+    )
+
+
+def start_export_job(job, chunk_size=EXPORT_CHUNK_SIZE):
+    """Ejecutar el job en un hilo en segundo plano una vez confirmada la transacción"""
+    def start():
+        threading.Thread(
+            target=run_export_job,
+            args=(job.pk, chunk_size),
+            name=f'export-job-{job.pk}',
+            daemon=True,
+        ).start()
+    transaction.on_commit(start)
+
+
+def _with_heartbeat(job_id, chunks):
+    """Marcar el avance del job mientras se generan los bloques (sin avance se considera interrumpido)"""
+    from .models import ExportJob
+    last = time.monotonic()
+    for chunk in chunks:
+        yield chunk
+        if time.monotonic() - last >= EXPORT_HEARTBEAT_SECONDS:
+            ExportJob.objects.filter(pk=job_id).update(updated_at=timezone.now())
+            last = time.monotonic()
+
+
+def run_export_job(job_id, chunk_size=EXPORT_CHUNK_SIZE, statuses=('pending',), stale_before=None):
+    """
+    Generar el archivo de un job de exportación en el almacenamiento privado
+    Retorna False si el job no se pudo tomar (otro runner lo procesa o ya terminó)
+    """
+    from .models import ExportJob
+    if not claim_job(ExportJob, job_id, statuses, stale_before):
+        logger.info(f"El job de exportación {job_id} no está disponible para procesarse")
+        return False
+
+    try:
+        job = ExportJob.objects.select_related('company').get(pk=job_id)
+        chunks = iter_export(job.dataset, job.company, job.compress, chunk_size)
+        if job.use_replica:
+            chunks = iter_on_replica(chunks)
+        # Un job interrumpido que se reanuda genera el archivo de nuevo
+        if job.file:
+            job.file.delete(save=False)
+        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
+        name = f"{job.company_id}/{timestamp}-{job.pk}-{get_export_filename(job.dataset, job.compress)}"
+        job.file.save(name, File(IteratorFile(_with_heartbeat(job.pk, chunks))), save=False)
+        job.size = job.file.size
+        job.status = 'completed'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['file', 'size', 'status', 'finished_at', 'updated_at'])
+    except Exception as e:
+        logger.exception(f"Error en el job de exportación {job_id}")
+        ExportJob.objects.filter(pk=job_id).update(
+            status='failed', error_message=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+    return True
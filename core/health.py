@@ -0,0 +1,160 @@
+"""
+Verificaciones de salud por niveles
+
+- Liveness (/health/live): el proceso responde. Sin E/S: no consulta la base
+  de datos, Redis ni la sesión.
+- Readiness (/health/ready): la base de datos responde a SELECT 1 y Redis a
+  PING, con un tiempo máximo por verificación (HEALTH_CHECK_TIMEOUT). El
+  resultado se guarda en memoria y se renueva en segundo plano cuando tiene
+  más de HEALTH_CHECK_INTERVAL segundos: las sondas del orquestador y de los
+  kioskos reciben el último resultado sin esperar a la base de datos. Si la
+  renovación se bloquea (el resultado supera HEALTH_CHECK_INTERVAL +
+  HEALTH_CHECK_TIMEOUT, o la verificación en curso el tiempo máximo), el
+  proceso deja de estar listo.
+- Diagnóstico (/health/deep): información completa de la base de datos y de
+  Redis (DatabaseManager.health_check, RedisManager.health_check), solo para
+  el personal administrativo.
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .redis_config import get_redis_client, get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+# Un único hilo: una verificación a la vez, reutilizando su conexión a la base de datos
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-check')
+_lock = threading.Lock()
+_result = None
+_pending = None
+_pending_started = None
+
+
+def get_check_timeout():
+    return getattr(settings, 'HEALTH_CHECK_TIMEOUT', 2)
+
+
+def check_database():
+    """SELECT 1 en la conexión por defecto, con tiempo máximo de consulta y de bloqueo"""
+    # El hilo de verificación no pasa por el ciclo de petición: descartar conexiones rotas
+    connection.close_if_unusable_or_obsolete()
+    timeout = get_check_timeout()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'microsoft':
+            # La conexión es exclusiva del hilo de verificación: tiempo máximo de pyodbc
+            # (SQL_ATTR_QUERY_TIMEOUT, en segundos enteros) y de espera por bloqueos
+            connection.connection.timeout = max(1, math.ceil(timeout))
+            cursor.execute(f'SET LOCK_TIMEOUT {int(timeout * 1000)}')
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_redis():
+    """PING a Redis por el pool del proceso (con sus tiempos máximos de conexión y respuesta)"""
+    get_redis_client().ping()
+
+
+CHECKS = {
+    'database': check_database,
+    'redis': check_redis,
+}
+
+
+def liveness():
+    """Estado del proceso (sin E/S)"""
+    return {'status': 'alive', 'timestamp': timezone.now().isoformat()}
+
+
+def run_checks():
+    """Ejecutar las verificaciones de HEALTH_READINESS_CHECKS y retornar el resultado"""
+    checks = {}
+    for name in getattr(settings, 'HEALTH_READINESS_CHECKS', list(CHECKS)):
+        start = perf_counter()
+        try:
+            CHECKS[name]()
+            checks[name] = {'status': 'ok'}
+        except Exception as e:
+            logger.warning(f"Verificación de salud '{name}' fallida: {e}")
+            checks[name] = {'status': 'error', 'error': str(e)}
+        checks[name]['latency_ms'] = round((perf_counter() - start) * 1000, 2)
+    return {
+        'ready': all(check['status'] == 'ok' for check in checks.values()),
+        'checks': checks,
+        'checked_at': timezone.now().isoformat(),
+        'monotonic': time.monotonic(),
+    }
+
+
+def _refresh():
+    global _result
+    result = run_checks()
+    with _lock:
+        _result = result
+    return result
+
+
+def readiness():
+    """
+    Último resultado de las verificaciones (renovado en segundo plano si está vencido)
+    Solo la primera llamada del proceso espera a las verificaciones, hasta HEALTH_CHECK_TIMEOUT
+    """
+    global _pending, _pending_started
+    interval = getattr(settings, 'HEALTH_CHECK_INTERVAL', 5)
+    timeout = get_check_timeout()
+    with _lock:
+        result = _result
+        stale = result is None or time.monotonic() - result['monotonic'] >= interval
+        if stale and (_pending is None or _pending.done()):
+            _pending = _executor.submit(_refresh)
+            _pending_started = time.monotonic()
+        pending, pending_started = _pending, _pending_started
+
+    if result is None:
+        try:
+            result = pending.result(timeout=timeout)
+        except FutureTimeoutError:
+            return {
+                'ready': False,
+                'checks': {},
+                'error': 'Las verificaciones no terminaron a tiempo',
+                'checked_at': None,
+                'age_seconds': None,
+            }
+
+    response = {key: value for key, value in result.items() if key != 'monotonic'}
+    now = time.monotonic()
+    response['age_seconds'] = round(now - result['monotonic'], 3)
+    # Verificación bloqueada: el último resultado ya no describe el estado actual
+    hung = pending is not None and not pending.done() and now - pending_started > timeout
+    if response['ready'] and (hung or now - result['monotonic'] > interval + timeout):
+        response['ready'] = False
+        response['error'] = 'La verificación en curso no terminó a tiempo'
+    return response
+
+
+def reset_readiness():
+    """Olvidar el último resultado (la siguiente llamada vuelve a verificar)"""
+    global _result, _pending, _pending_started
+    with _lock:
+        _result = None
+        _pending = None
+        _pending_started = None
+
+
+def diagnostics():
+    """Diagnóstico completo de la base de datos y Redis (consultas de catálogo e INFO)"""
+    from .db_config import DatabaseManager
+
+    return {
+        'readiness': {key: value for key, value in run_checks().items() if key != 'monotonic'},
+        'database': DatabaseManager.health_check(),
+        'redis': get_redis_manager().health_check(),
+    }
@@ -0,0 +1,233 @@
+"""
+Instrumentación de peticiones: consultas SQL, caché, Redis y latencia
+
+RequestMetricsMiddleware mide una fracción de las peticiones
+(INSTRUMENTATION_SAMPLE_RATE). En cada petición medida se registran:
+
+- Consultas SQL y su tiempo, con connection.execute_wrapper en todas las
+  conexiones.
+- Aciertos y fallos de caché (backend InstrumentedRedisCache o cualquier
+  backend con CacheMetricsMixin).
+- Tiempo en Redis (InstrumentedConnection, usada por InstrumentedRedisCache).
+- Latencia total.
+
+Los valores se registran por vista (etiqueta view) en los histogramas de
+core.metrics, agregados entre workers como el resto de /metrics y resumidos
+en /api/metrics/requests/. Con INSTRUMENTATION_SERVER_TIMING (por defecto
+solo en DEBUG) se devuelven además en la cabecera Server-Timing.
+"""
+import random
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django_redis.cache import RedisCache
+from redis.connection import Connection
+
+from .metrics import (
+    CACHE_REQUESTS, REQUEST_CACHE, REQUEST_ERRORS, REQUEST_REDIS_SECONDS, REQUEST_SECONDS,
+    REQUEST_SQL_QUERIES, REQUEST_SQL_SECONDS, bucket_quantile, collector,
+)
+
+# Etiqueta de las peticiones que no resuelven a una vista (p. ej. 404)
+UNRESOLVED_VIEW = '<unresolved>'
+
+_MISSING = object()
+
+_current = ContextVar('request_metrics', default=None)
+_in_get_many = ContextVar('in_cache_get_many', default=False)
+
+
+class RequestMetrics:
+    """Contadores de una petición medida"""
+
+    __slots__ = ('sql_queries', 'sql_ms', 'cache_hits', 'cache_misses', 'redis_ms', 'redis_commands', 'total_ms')
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.redis_ms = 0.0
+        self.redis_commands = 0
+        self.total_ms = 0.0
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing"""
+        return ', '.join([
+            f'db;dur={self.sql_ms:.1f};desc="{self.sql_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'redis;dur={self.redis_ms:.1f};desc="{self.redis_commands} commands"',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+
+def current_metrics():
+    """Métricas de la petición en curso (None si no se está midiendo)"""
+    return _current.get()
+
+
+def should_sample():
+    """Decidir si se mide la petición según INSTRUMENTATION_SAMPLE_RATE"""
+    if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+        return False
+    rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.0)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@contextmanager
+def measure_request():
+    """Activar la medición de la petición en curso y registrar sus consultas SQL"""
+    metrics = RequestMetrics()
+
+    def sql_wrapper(execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.sql_queries += 1
+            metrics.sql_ms += (perf_counter() - start) * 1000
+
+    token = _current.set(metrics)
+    start = perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sql_wrapper))
+            yield metrics
+    finally:
+        metrics.total_ms = (perf_counter() - start) * 1000
+        _current.reset(token)
+
+
+# Métricas por vista
+
+REQUEST_HISTOGRAMS = {
+    'latency_seconds': REQUEST_SECONDS,
+    'sql_seconds': REQUEST_SQL_SECONDS,
+    'sql_queries': REQUEST_SQL_QUERIES,
+    'redis_seconds': REQUEST_REDIS_SECONDS,
+}
+
+
+def record_request(view_name, metrics, status_code):
+    """Registrar una petición medida en las métricas por vista (core.metrics)"""
+    REQUEST_SECONDS.observe(metrics.total_ms / 1000, view=view_name)
+    REQUEST_SQL_SECONDS.observe(metrics.sql_ms / 1000, view=view_name)
+    REQUEST_SQL_QUERIES.observe(metrics.sql_queries, view=view_name)
+    REQUEST_REDIS_SECONDS.observe(metrics.redis_ms / 1000, view=view_name)
+    if status_code >= 500:
+        REQUEST_ERRORS.inc(view=view_name)
+    if metrics.cache_hits:
+        REQUEST_CACHE.inc(metrics.cache_hits, view=view_name, result='hit')
+    if metrics.cache_misses:
+        REQUEST_CACHE.inc(metrics.cache_misses, view=view_name, result='miss')
+
+
+def request_metrics_snapshot():
+    """Resumen por vista de las métricas de peticiones agregadas de todos los workers"""
+    counters, _ = collector.collect()
+    views = {}
+    for key, histogram in REQUEST_HISTOGRAMS.items():
+        for (view_name,), data in histogram.series(counters).items():
+            views.setdefault(view_name, {})[key] = {
+                'count': int(data['count']),
+                'sum': round(data['sum'], 6),
+                'p50': bucket_quantile(data['buckets'], 0.5),
+                'p95': bucket_quantile(data['buckets'], 0.95),
+                'p99': bucket_quantile(data['buckets'], 0.99),
+                'buckets': [
+                    [bound if bound == '+Inf' else float(bound), int(cumulative)] for bound, cumulative in data['buckets']
+                ],
+            }
+    for view_name, view in views.items():
+        view['requests'] = view['latency_seconds']['count']
+        view['errors'] = int(counters.get((REQUEST_ERRORS.name, (view_name,)), 0))
+        view['cache_hits'] = int(counters.get((REQUEST_CACHE.name, (view_name, 'hit')), 0))
+        view['cache_misses'] = int(counters.get((REQUEST_CACHE.name, (view_name, 'miss')), 0))
+    return {
+        'sample_rate': getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.0),
+        'views': dict(sorted(views.items())),
+    }
+
+
+def get_view_name(request):
+    """Nombre de la vista resuelta (limita las etiquetas a las rutas conocidas)"""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else UNRESOLVED_VIEW
+
+
+# Caché y Redis
+
+class CacheMetricsMixin:
+    """
+    Contar aciertos y fallos de get/get_many: en la petición medida y en el
+    contador servicenow_cache_requests_total (core.metrics)
+    """
+
+    def _record_cache(self, hits, misses):
+        if _in_get_many.get():
+            return
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+        if hits:
+            CACHE_REQUESTS.inc(hits, result='hit')
+        if misses:
+            CACHE_REQUESTS.inc(misses, result='miss')
+
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, _MISSING, version=version, **kwargs)
+        hit = value is not _MISSING
+        self._record_cache(int(hit), int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        # Algunos backends implementan get_many con get(): no contar dos veces
+        token = _in_get_many.set(True)
+        try:
+            values = super().get_many(keys, *args, **kwargs)
+        finally:
+            _in_get_many.reset(token)
+        self._record_cache(len(values), len(keys) - len(values))
+        return values
+
+
+class InstrumentedConnection(Connection):
+    """Conexión de redis-py que suma el tiempo de cada comando a la petición medida"""
+
+    def send_packed_command(self, command, check_health=True):
+        metrics = _current.get()
+        if metrics is None:
+            return super().send_packed_command(command, check_health)
+        start = perf_counter()
+        try:
+            return super().send_packed_command(command, check_health)
+        finally:
+            metrics.redis_commands += 1
+            metrics.redis_ms += (perf_counter() - start) * 1000
+
+    def read_response(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return super().read_response(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return super().read_response(*args, **kwargs)
+        finally:
+            metrics.redis_ms += (perf_counter() - start) * 1000
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    """RedisCache de django-redis con aciertos/fallos y tiempo de Redis por petición"""
+
+    def __init__(self, server, params):
+        params = dict(params)
+        options = params['OPTIONS'] = dict(params.get('OPTIONS') or {})
+        pool_kwargs = options['CONNECTION_POOL_KWARGS'] = dict(options.get('CONNECTION_POOL_KWARGS') or {})
+        pool_kwargs.setdefault('connection_class', InstrumentedConnection)
+        super().__init__(server, params)
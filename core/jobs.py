@@ -0,0 +1,31 @@
+"""
+Toma atómica de jobs persistidos (importaciones y exportaciones)
+
+Un runner (hilo de la vista o comando de gestión) toma un job con un UPDATE
+condicional a 'running' antes de procesarlo: solo uno puede ganarlo. Un job
+'running' sin avance desde stale_before se considera interrumpido (su
+runner se detuvo, p. ej. por un reinicio) y se puede volver a tomar.
+"""
+from django.db.models import DateTimeField, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def claim_job(model, job_id, statuses=('pending',), stale_before=None):
+    """
+    Tomar un job de model para procesarlo
+    statuses: estados desde los que se puede tomar
+    stale_before: tomar también los jobs 'running' sin avance desde esa fecha
+    Retorna True si este runner ganó el job
+    """
+    claimable = Q(status__in=statuses)
+    if stale_before is not None:
+        claimable |= Q(status='running', updated_at__lt=stale_before)
+    now = timezone.now()
+    return model.objects.filter(claimable, pk=job_id).update(
+        status='running',
+        started_at=Coalesce('started_at', Value(now, output_field=DateTimeField())),
+        error_message='',
+        finished_at=None,
+        updated_at=now,
+    ) == 1
@@ -0,0 +1,289 @@
+"""
+Generación de datos sintéticos para pruebas de capacidad
+
+Crea usuarios, tickets, turnos y auditorías de login realistas con
+bulk_create por lotes. El trabajo se divide en tareas (bloques de usuarios y
+días de tickets) y cada tarea usa su propio generador aleatorio derivado de
+la semilla, de modo que el resultado es el mismo con cualquier número de
+procesos. Las tareas se reparten entre procesos (spawn) que abren su propia
+conexión a la base de datos.
+"""
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from multiprocessing import get_context
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+# Filas por INSERT en bulk_create
+LOAD_BATCH_SIZE = 1000
+
+DEFAULT_STATUS_MIX = {'open': 15, 'in_progress': 10, 'resolved': 30, 'closed': 40, 'canceled': 5}
+DEFAULT_PRIORITY_MIX = {'low': 20, 'normal': 55, 'high': 20, 'urgent': 5}
+
+# Peso relativo de cada hora del día (turnos de mina: picos al inicio de cada turno)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 6, 10, 12, 10, 8, 7, 5, 6, 8, 9, 7, 5, 6, 4, 3, 2, 2, 1]
+
+# Volumen relativo por día de la semana (lunes a domingo)
+WEEKDAY_WEIGHTS = [1.2, 1.1, 1.0, 1.0, 0.9, 0.5, 0.3]
+
+FIRST_NAMES = [
+    'Juan', 'María', 'José', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Rosa', 'Jorge', 'Lucía',
+    'Miguel', 'Elena', 'Pedro', 'Sofía', 'Raúl', 'Patricia', 'Víctor', 'Gabriela',
+]
+LAST_NAMES = [
+    'Pérez', 'López', 'García', 'Rodríguez', 'Quispe', 'Mamani', 'Flores', 'Huamán',
+    'Torres', 'Ramírez', 'Chávez', 'Núñez', 'Vargas', 'Castillo', 'Rojas', 'Mendoza',
+]
+DEPARTMENTS = [
+    'Operaciones Mina', 'Planta Concentradora', 'Mantenimiento', 'Logística',
+    'Seguridad', 'Recursos Humanos', 'Finanzas', 'Tecnología',
+]
+LOCATIONS = ['Sede Central', 'Planta', 'Mina', 'Almacén']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 Chrome/120.0 Mobile Safari/537.36',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+]
+
+# Contexto compartido por las tareas de un proceso (ver _init_worker)
+_context = None
+
+
+def parse_mix(value, choices):
+    """
+    Interpretar una distribución 'clave=peso,...' (p. ej. 'open=20,closed=80')
+    """
+    mix = {}
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        key, _, weight = part.partition('=')
+        key = key.strip()
+        if key not in choices:
+            raise ValueError(f'Valor no válido "{key}" (opciones: {", ".join(choices)})')
+        mix[key] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f'Distribución vacía: "{value}"')
+    return mix
+
+
+def skewed_weights(count, skew):
+    """Pesos tipo Zipf: el elemento i recibe 1 / (i + 1) ** skew (skew=0 es uniforme)"""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def day_volume(base, day, rng):
+    """Volumen de un día según el día de la semana, con ±10% de variación"""
+    return max(0, round(base * WEEKDAY_WEIGHTS[day.weekday()] * rng.uniform(0.9, 1.1)))
+
+
+def random_datetime(day, rng):
+    """Fecha y hora del día indicado, con la distribución horaria de HOUR_WEIGHTS"""
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    moment = datetime.combine(day, time(hour, rng.randrange(60), rng.randrange(60)))
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """
+    Permitir fechas históricas en bulk_create: desactiva temporalmente
+    auto_now/auto_now_add de los modelos indicados
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+# Usuarios
+
+def generate_users(start, count, options, context=None):
+    """
+    Crear los usuarios sintéticos [start, start + count) con el hash de contraseña del contexto
+    Retorna los ids creados
+    """
+    from .models import User, UserRole
+
+    context = context or _context
+    seed = options['seed']
+    batch_size = options['batch_size']
+    rng = random.Random(f'{seed}:users:{start}')
+    now = timezone.now()
+
+    users = []
+    for index in range(start, start + count):
+        username = f'load{seed}.{index:07d}'
+        users.append(User(
+            username=username,
+            email=f'{username}@example.com',
+            password=context['password_hash'],
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+            company_id=context['company_id'],
+            title='Técnico' if rng.random() < 0.3 else 'Operador',
+            department=rng.choice(DEPARTMENTS),
+            location=rng.choice(LOCATIONS),
+            employee_number=f'E{seed}{index:07d}',
+            is_active=rng.random() > 0.05,
+            can_access=True,
+            date_joined=now,
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        missing = [user.username for user in users if user.pk is None]
+        for offset in range(0, len(missing), batch_size):
+            pks = dict(User.objects.filter(username__in=missing[offset:offset + batch_size]).values_list('username', 'pk'))
+            for user in users:
+                user.pk = user.pk or pks.get(user.username)
+        if context.get('role_id'):
+            UserRole.objects.bulk_create(
+                [UserRole(user_id=user.pk, role_id=context['role_id']) for user in users], batch_size=batch_size
+            )
+    return [user.pk for user in users]
+
+
+# Tickets, turnos y auditorías por día
+
+def generate_day(day, options, context=None):
+    """
+    Crear los tickets, turnos y auditorías de login de un día
+    Retorna los conteos creados {'tickets': n, 'turns': n, 'login_audits': n}
+    """
+    from .models import Ticket, TicketTurn, AuthLoginAudit
+
+    context = context or _context
+    seed = options['seed']
+    batch_size = options['batch_size']
+    rng = random.Random(f'{seed}:{day.isoformat()}')
+
+    categories = context['categories']
+    category_weights = skewed_weights(len(categories), options['category_skew'])
+    statuses, status_weights = zip(*options['status_mix'].items())
+    priorities, priority_weights = zip(*options['priority_mix'].items())
+    requesters = context['user_ids']
+    technicians = context['technician_ids']
+
+    # Tickets
+    tickets = []
+    for index in range(day_volume(options['tickets_per_day'], day, rng)):
+        category = rng.choices(categories, weights=category_weights)[0]
+        status = rng.choices(statuses, weights=status_weights)[0]
+        created_at = random_datetime(day, rng)
+        requester_id = rng.choice(requesters)
+        updated_at = created_at if status == 'open' else created_at + timedelta(minutes=rng.randint(5, 60 * 48))
+        tickets.append(Ticket(
+            company_id=context['company_id'],
+            code=f'{day:%Y%m%d}-L{seed}-{index:06d}',
+            requester_id=requester_id,
+            assigned_to_id=rng.choice(technicians) if technicians and status != 'open' else None,
+            category_id=category['id'],
+            subcategory_id=rng.choice(category['subcategories']) if category['subcategories'] else None,
+            form_data=json.dumps({
+                'motivo': f'Solicitud {index + 1}',
+                'centro_de_costos': f'CC{rng.randint(1, 250):03d}',
+            }),
+            status=status,
+            priority=rng.choices(priorities, weights=priority_weights)[0],
+            created_at=created_at,
+            updated_at=updated_at,
+        ))
+    tickets.sort(key=lambda ticket: ticket.created_at)
+
+    # Auditorías de login
+    audits = [
+        AuthLoginAudit(
+            user_id=rng.choice(requesters),
+            success=rng.random() >= options['login_failure_rate'],
+            ip=f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+            user_agent=rng.choice(USER_AGENTS),
+            created_at=random_datetime(day, rng),
+        )
+        for _ in range(day_volume(options['logins_per_day'], day, rng))
+    ]
+
+    with historical_timestamps(Ticket, TicketTurn, AuthLoginAudit), transaction.atomic():
+        Ticket.objects.bulk_create(tickets, batch_size=batch_size)
+        missing = [ticket.code for ticket in tickets if ticket.pk is None]
+        for start in range(0, len(missing), batch_size):
+            pks = dict(Ticket.objects.filter(code__in=missing[start:start + batch_size]).values_list('code', 'pk'))
+            for ticket in tickets:
+                ticket.pk = ticket.pk or pks.get(ticket.code)
+
+        # Un turno por ticket, numerado por categoría y día (como al generarlo en el kiosko)
+        turns = []
+        turn_numbers = {}
+        category_names = {category['id']: category['name'] for category in categories}
+        for ticket in tickets:
+            if rng.random() >= options['turn_ratio']:
+                continue
+            turn_number = turn_numbers.get(ticket.category_id, 0) + 1
+            turn_numbers[ticket.category_id] = turn_number
+            is_called = ticket.status != 'open'
+            turns.append(TicketTurn(
+                ticket_id=ticket.pk,
+                turn_number=turn_number,
+                display_message=f'Turno {turn_number:03d} - {category_names[ticket.category_id]}',
+                is_called=is_called,
+                called_at=ticket.created_at + timedelta(minutes=rng.randint(1, 90)) if is_called else None,
+                created_at=ticket.created_at,
+            ))
+        TicketTurn.objects.bulk_create(turns, batch_size=batch_size)
+        AuthLoginAudit.objects.bulk_create(audits, batch_size=batch_size)
+
+    return {'tickets': len(tickets), 'turns': len(turns), 'login_audits': len(audits)}
+
+
+def _init_worker(context):
+    """Inicializar Django y el contexto compartido en un proceso worker"""
+    global _context
+    import django
+    django.setup()
+    _context = context
+
+
+def _run_task(func, args):
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def run_tasks(func, tasks, context, workers=1):
+    """
+    Ejecutar func(*args, context) para cada tupla de argumentos, en el proceso
+    actual o repartidas en un pool de procesos. Retorna los resultados en orden.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        for args in tasks:
+            yield func(*args, context)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(context,),
+    ) as pool:
+        chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+        yield from pool.map(_run_task, [func] * len(tasks), tasks, chunksize=chunksize)
+
+
+def iter_days(end_date, days):
+    """Días a generar, del más antiguo al más reciente"""
+    return [end_date - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
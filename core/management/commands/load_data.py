@@ -0,0 +1,225 @@
+"""
+Comando para generar datos sintéticos a escala de producción (pruebas de capacidad)
+"""
+import os
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from core.load_data import (
+    LOAD_BATCH_SIZE, DEFAULT_STATUS_MIX, DEFAULT_PRIORITY_MIX,
+    parse_mix, run_tasks, iter_days, generate_users, generate_day
+)
+from core.models import Company, User, Role, UserRole, Ticket, TicketCategory
+from core.search import index_users
+
+# Usuarios por tarea enviada a un proceso
+USERS_PER_TASK = 10000
+
+
+def _format_mix(mix):
+    return ','.join(f'{key}={weight}' for key, weight in mix.items())
+
+
+class Command(BaseCommand):
+    help = 'Genera usuarios, tickets, turnos y auditorías de login sintéticos con bulk_create y un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa (por defecto la primera disponible)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=0,
+            help='Número de usuarios a crear (además de los existentes)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Número de días de historia a generar'
+        )
+        parser.add_argument(
+            '--end-date',
+            type=date.fromisoformat,
+            default=None,
+            help='Último día a generar, AAAA-MM-DD (por defecto ayer)'
+        )
+        parser.add_argument(
+            '--tickets-per-day',
+            type=int,
+            default=1000,
+            help='Tickets por día laborable (el fin de semana baja según el día)'
+        )
+        parser.add_argument(
+            '--logins-per-day',
+            type=int,
+            default=500,
+            help='Intentos de login por día laborable'
+        )
+        parser.add_argument(
+            '--category-skew',
+            type=float,
+            default=1.0,
+            help='Sesgo tipo Zipf entre categorías (0 = uniforme)'
+        )
+        parser.add_argument(
+            '--status-mix',
+            default=_format_mix(DEFAULT_STATUS_MIX),
+            help='Distribución de estados, p. ej. "open=15,closed=85"'
+        )
+        parser.add_argument(
+            '--priority-mix',
+            default=_format_mix(DEFAULT_PRIORITY_MIX),
+            help='Distribución de prioridades, p. ej. "normal=80,urgent=20"'
+        )
+        parser.add_argument(
+            '--turn-ratio',
+            type=float,
+            default=1.0,
+            help='Fracción de tickets con turno (0 a 1)'
+        )
+        parser.add_argument(
+            '--login-failure-rate',
+            type=float,
+            default=0.05,
+            help='Fracción de logins fallidos (0 a 1)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Semilla: la misma semilla y opciones generan los mismos datos'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos en paralelo (1 = en el proceso actual)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=LOAD_BATCH_SIZE,
+            help='Filas por INSERT'
+        )
+        parser.add_argument(
+            '--password',
+            default='loadtest123',
+            help='Contraseña de los usuarios generados'
+        )
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='No indexar los usuarios generados en el directorio de búsqueda'
+        )
+
+    def handle(self, *args, **options):
+        company = self.get_company(options['company_id'])
+        seed = options['seed']
+        try:
+            generation = {
+                'seed': seed,
+                'batch_size': options['batch_size'],
+                'tickets_per_day': options['tickets_per_day'],
+                'logins_per_day': options['logins_per_day'],
+                'category_skew': options['category_skew'],
+                'status_mix': parse_mix(options['status_mix'], [key for key, _ in Ticket.STATUS_CHOICES]),
+                'priority_mix': parse_mix(options['priority_mix'], [key for key, _ in Ticket.PRIORITY_CHOICES]),
+                'turn_ratio': options['turn_ratio'],
+                'login_failure_rate': options['login_failure_rate'],
+            }
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if User.objects.filter(username__startswith=f'load{seed}.').exists() or \
+                Ticket.objects.filter(code__contains=f'-L{seed}-').exists():
+            raise CommandError(f'Ya existen datos generados con la semilla {seed}. Use otra semilla.')
+
+        categories = [
+            {
+                'id': category.pk,
+                'name': category.name,
+                'subcategories': [sub.pk for sub in category.subcategories.all() if sub.is_active],
+            }
+            for category in TicketCategory.objects.filter(company=company, is_active=True)
+            .order_by('pk').prefetch_related('subcategories')
+        ]
+        if options['days'] > 0 and not categories:
+            raise CommandError('No hay categorías disponibles. Ejecute setup_ticket_templates primero.')
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Generando datos para empresa: {company.name} (semilla {seed}, {workers} procesos)')
+        started = time.perf_counter()
+
+        # Usuarios
+        user_role = Role.objects.filter(company=company, key='user').order_by('pk').first()
+        context = {
+            'company_id': company.pk,
+            'password_hash': make_password(options['password']),
+            'role_id': user_role.pk if user_role else None,
+        }
+        created_user_ids = []
+        tasks = [
+            (start, min(USERS_PER_TASK, options['users'] - start), generation)
+            for start in range(0, options['users'], USERS_PER_TASK)
+        ]
+        for user_ids in run_tasks(generate_users, tasks, context, workers):
+            created_user_ids.extend(user_ids)
+            self.stdout.write(f'  ✓ Usuarios: {len(created_user_ids)}/{options["users"]}')
+
+        if created_user_ids and not options['skip_search_index']:
+            self.stdout.write('  Indexando usuarios en el directorio de búsqueda...')
+            for start in range(0, len(created_user_ids), options['batch_size']):
+                batch_ids = created_user_ids[start:start + options['batch_size']]
+                index_users(User.objects.filter(pk__in=batch_ids), options['batch_size'])
+
+        # Tickets, turnos y auditorías por día
+        totals = {'tickets': 0, 'turns': 0, 'login_audits': 0}
+        days = iter_days(options['end_date'] or date.today() - timedelta(days=1), options['days'])
+        if days:
+            user_ids = list(User.objects.filter(company=company, is_active=True).order_by('pk').values_list('pk', flat=True))
+            if not user_ids:
+                raise CommandError('No hay usuarios activos en la empresa. Use --users para crearlos.')
+            context['user_ids'] = user_ids
+            context['technician_ids'] = list(
+                UserRole.objects.filter(role__company=company, role__key__in=['technician', 'admin'], user__is_active=True)
+                .order_by('user_id').values_list('user_id', flat=True).distinct()
+            )
+            context['categories'] = categories
+
+            for day, counts in zip(days, run_tasks(generate_day, [(day, generation) for day in days], context, workers)):
+                for key, value in counts.items():
+                    totals[key] += value
+                self.stdout.write(
+                    f'  ✓ {day.isoformat()}: {counts["tickets"]} tickets, '
+                    f'{counts["turns"]} turnos, {counts["login_audits"]} logins'
+                )
+
+        elapsed = time.perf_counter() - started
+        rows = len(created_user_ids) + sum(totals.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✅ Datos generados en {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} filas/s):\n'
+                f'  - Usuarios: {len(created_user_ids)}\n'
+                f'  - Tickets: {totals["tickets"]}\n'
+                f'  - Turnos: {totals["turns"]}\n'
+                f'  - Auditorías de login: {totals["login_audits"]}'
+            )
+        )
+
+    def get_company(self, company_id):
+        if not company_id:
+            company = Company.objects.order_by('pk').first()
+            if not company:
+                raise CommandError('No hay empresas disponibles. Ejecute setup_system primero.')
+            return company
+        try:
+            return Company.objects.get(id=company_id)
+        except Company.DoesNotExist:
+            raise CommandError(f'Empresa con ID {company_id} no encontrada.')
@@ -0,0 +1,43 @@
+"""
+Comando para reconstruir el índice de búsqueda del directorio de usuarios
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Company, User
+from core.search import index_users
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda por prefijo del directorio de usuarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='ID de la empresa a reindexar (por defecto todas)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Número de usuarios por lote'
+        )
+
+    def handle(self, *args, **options):
+        company_id = options['company_id']
+        users = User.objects.all()
+
+        if company_id:
+            if not Company.objects.filter(id=company_id).exists():
+                self.stdout.write(
+                    self.style.ERROR(f'Empresa con ID {company_id} no encontrada.')
+                )
+                return
+            users = users.filter(company_id=company_id)
+
+        self.stdout.write('Reconstruyendo índice de búsqueda de usuarios...')
+        indexed = index_users(users, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Índice reconstruido: {indexed} usuarios indexados')
+        )
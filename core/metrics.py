@@ -0,0 +1,424 @@
+"""
+Métricas de operación en formato de exposición de Prometheus (/metrics)
+
+Los contadores, gauges e histogramas se actualizan en memoria (un diccionario
+protegido por un lock) y cada proceso envía sus incrementos a Redis como
+máximo cada METRICS_FLUSH_INTERVAL segundos, en una sola transacción. El
+código síncrono envía al registrar una métrica; además, un hilo en segundo
+plano envía cada intervalo, de modo que los procesos que solo registran desde
+el bucle de eventos (WebSockets) o que están inactivos mantienen vigentes sus
+gauges:
+
+- Contadores e histogramas: HINCRBYFLOAT sobre un hash compartido, de modo
+  que /metrics muestra el total de todos los workers.
+- Gauges: un hash por proceso con expiración (METRICS_PROCESS_TTL, unos
+  pocos intervalos de envío); /metrics suma los procesos vivos, así un
+  worker caído deja de contar en segundos.
+
+Si la caché no es django-redis (p. ej. en tests) o METRICS_REDIS_AGGREGATION
+es False, /metrics muestra solo los valores del proceso que responde.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = 'metrics:counters'
+GAUGES_KEY = 'metrics:gauges'
+PROCESSES_KEY = 'metrics:processes'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Métricas definidas, en orden de exposición
+REGISTRY = {}
+
+
+def _field(name, labels):
+    return json.dumps([name, list(labels)], separators=(',', ':'))
+
+
+def _parse_field(field):
+    if isinstance(field, bytes):
+        field = field.decode('utf-8')
+    name, labels = json.loads(field)
+    return name, tuple(labels)
+
+
+class MetricsCollector:
+    """Valores del proceso actual y su envío a Redis"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}
+        self._gauges = {}
+        self._last_flush = time.monotonic()
+        self._client = None
+        self._client_checked = False
+        # Los hilos no sobreviven a fork: cada proceso inicia el suyo
+        self._flusher = None
+
+    @property
+    def process_id(self):
+        return f'{socket.gethostname()}:{self._pid}'
+
+    def _check_process(self):
+        # Un worker creado con fork no hereda los valores del proceso padre
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def add(self, updates):
+        """Sumar [(nombre, labels, valor), ...] a los contadores"""
+        with self._lock:
+            self._check_process()
+            for name, labels, value in updates:
+                key = (name, labels)
+                self._counters[key] = self._counters.get(key, 0) + value
+        self.ensure_flusher()
+        self.maybe_flush()
+
+    def add_gauge(self, name, labels, value, absolute=False):
+        with self._lock:
+            self._check_process()
+            key = (name, labels)
+            self._gauges[key] = value if absolute else self._gauges.get(key, 0) + value
+        self.ensure_flusher()
+        self.maybe_flush()
+
+    def get_redis(self):
+        """Cliente Redis de la caché por defecto (None si no hay agregación entre procesos)"""
+        if not self._client_checked:
+            self._client_checked = True
+            if getattr(settings, 'METRICS_REDIS_AGGREGATION', True):
+                try:
+                    from django_redis import get_redis_connection
+                    self._client = get_redis_connection('default')
+                except (ImportError, NotImplementedError):
+                    self._client = None
+        return self._client
+
+    def ensure_flusher(self):
+        """Iniciar (una vez por proceso) el hilo que envía las métricas cada METRICS_FLUSH_INTERVAL"""
+        if self._flusher is not None or self.get_redis() is None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+            time.sleep(max(interval - (time.monotonic() - self._last_flush), 0.01))
+            if time.monotonic() - self._last_flush >= interval:
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.warning(f'No se pudieron enviar las métricas a Redis: {e}')
+
+    def maybe_flush(self):
+        """
+        Enviar los incrementos si pasó el intervalo
+        Desde el bucle de eventos no se bloquea: el envío queda a cargo del hilo de ensure_flusher
+        """
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        try:
+            asyncio.get_running_loop()
+            return
+        except RuntimeError:
+            pass
+        self.flush()
+
+    def flush(self):
+        """Enviar los incrementos y los gauges del proceso a Redis"""
+        client = self.get_redis()
+        if client is None:
+            return False
+        with self._lock:
+            self._check_process()
+            counters, self._counters = self._counters, {}
+            gauges = dict(self._gauges)
+            self._last_flush = time.monotonic()
+
+        process_key = f'{GAUGES_KEY}:{self.process_id}'
+        try:
+            pipe = client.pipeline()
+            for (name, labels), value in counters.items():
+                pipe.hincrbyfloat(COUNTERS_KEY, _field(name, labels), value)
+            pipe.delete(process_key)
+            if gauges:
+                pipe.hset(process_key, mapping={_field(name, labels): value for (name, labels), value in gauges.items()})
+                pipe.expire(process_key, getattr(settings, 'METRICS_PROCESS_TTL', 3 * getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)))
+            pipe.sadd(PROCESSES_KEY, self.process_id)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f'No se pudieron enviar las métricas a Redis: {e}')
+            with self._lock:
+                for key, value in counters.items():
+                    self._counters[key] = self._counters.get(key, 0) + value
+            return False
+        return True
+
+    def collect(self):
+        """Contadores y gauges agregados: ({(nombre, labels): valor}, {(nombre, labels): valor})"""
+        if not self.flush():
+            with self._lock:
+                self._check_process()
+                return dict(self._counters), dict(self._gauges)
+
+        client = self.get_redis()
+        counters = {_parse_field(field): float(value) for field, value in client.hgetall(COUNTERS_KEY).items()}
+        processes = [
+            process.decode('utf-8') if isinstance(process, bytes) else process
+            for process in client.smembers(PROCESSES_KEY)
+        ]
+        pipe = client.pipeline(transaction=False)
+        for process in processes:
+            pipe.hgetall(f'{GAUGES_KEY}:{process}')
+        gauges = {}
+        expired = []
+        for process, values in zip(processes, pipe.execute()):
+            if not values:
+                expired.append(process)
+            for field, value in values.items():
+                key = _parse_field(field)
+                gauges[key] = gauges.get(key, 0) + float(value)
+        if expired:
+            client.srem(PROCESSES_KEY, *expired)
+        return counters, gauges
+
+
+collector = MetricsCollector()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _labels(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        collector.add([(self.name, self._labels(labels), amount)])
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        collector.add_gauge(self.name, self._labels(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        collector.add_gauge(self.name, self._labels(labels), -amount)
+
+    def set(self, value, **labels):
+        collector.add_gauge(self.name, self._labels(labels), value, absolute=True)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Como decorador, cada llamada mide con su propio temporizador
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(Metric):
+    """Histograma acumulable entre procesos: un contador por bucket, _sum y _count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.bucket_labels = [str(float(bound)) for bound in self.buckets] + ['+Inf']
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        bucket = self.bucket_labels[bisect_left(self.buckets, value)]
+        collector.add([
+            (f'{self.name}_bucket', labels + (bucket,), 1),
+            (f'{self.name}_sum', labels, value),
+            (f'{self.name}_count', labels, 1),
+        ])
+
+    def time(self, **labels):
+        """Medir la duración de un bloque o función (context manager o decorador)"""
+        return _Timer(self, labels)
+
+    def series(self, counters):
+        """
+        Series del histograma en los contadores agregados (collector.collect()):
+        {labels: {'count', 'sum', 'buckets': [(límite, acumulado), ...]}}
+        """
+        series = {}
+        for labels in sorted({labels for (name, labels) in counters if name == f'{self.name}_count'}):
+            cumulative = 0
+            buckets = []
+            for bucket in self.bucket_labels:
+                cumulative += counters.get((f'{self.name}_bucket', labels + (bucket,)), 0)
+                buckets.append((bucket, cumulative))
+            series[labels] = {
+                'count': counters.get((f'{self.name}_count', labels), 0),
+                'sum': counters.get((f'{self.name}_sum', labels), 0),
+                'buckets': buckets,
+            }
+        return series
+
+
+def bucket_quantile(buckets, q):
+    """
+    Estimación de un cuantil: límite superior del bucket (acumulado) que lo contiene
+    En el bucket +Inf, como histogram_quantile de Prometheus, el mayor límite finito
+    """
+    count = buckets[-1][1] if buckets else 0
+    if not count:
+        return 0.0
+    target = math.ceil(q * count)
+    finite = [(float(bound), cumulative) for bound, cumulative in buckets if bound != '+Inf']
+    for bound, cumulative in finite:
+        if cumulative >= target:
+            return bound
+    return finite[-1][0] if finite else 0.0
+
+
+# Exposición
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics(extra=()):
+    """
+    Texto de exposición de Prometheus con todas las métricas definidas
+    extra: [(nombre, tipo, ayuda, valor), ...] calculados al momento (p. ej. *_up)
+    """
+    counters, gauges = collector.collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        if metric.kind == 'histogram':
+            for labels, data in metric.series(counters).items():
+                for bucket, cumulative in data['buckets']:
+                    lines.append(
+                        f'{metric.name}_bucket{_format_labels(metric.labelnames + ("le",), labels + (bucket,))} '
+                        f'{_format_value(cumulative)}'
+                    )
+                for suffix in ('sum', 'count'):
+                    lines.append(
+                        f'{metric.name}_{suffix}{_format_labels(metric.labelnames, labels)} {_format_value(data[suffix])}'
+                    )
+        else:
+            values = counters if metric.kind == 'counter' else gauges
+            for (name, labels), value in sorted(values.items()):
+                if name == metric.name:
+                    lines.append(f'{name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}')
+
+    for name, kind, documentation, value in extra:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# Métricas de la aplicación
+
+TICKETS_ISSUED = Counter(
+    'servicenow_tickets_issued_total', 'Tickets creados', ['company']
+)
+TICKET_ISSUANCE_SECONDS = Histogram(
+    'servicenow_ticket_issuance_seconds', 'Duración de la generación de un ticket con su turno desde el kiosko'
+)
+TURN_ALLOCATION_SECONDS = Histogram(
+    'servicenow_turn_allocation_seconds', 'Duración de la asignación del número de turno'
+)
+TURN_COLLISIONS = Counter(
+    'servicenow_turn_collisions_total', 'Turnos asignados con un número ya usado en la categoría y día (concurrencia)', ['company']
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'servicenow_websocket_connections', 'Conexiones WebSocket abiertas', ['consumer', 'company']
+)
+CHANNEL_LAYER_FAILURES = Counter(
+    'servicenow_channel_layer_failures_total', 'Operaciones fallidas en la capa de canales', ['operation']
+)
+REQUEST_SECONDS = Histogram(
+    'servicenow_request_duration_seconds', 'Latencia de las peticiones medidas por vista', ['view']
+)
+REQUEST_SQL_SECONDS = Histogram(
+    'servicenow_request_sql_seconds', 'Tiempo en consultas SQL de las peticiones medidas por vista', ['view']
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'servicenow_request_sql_queries', 'Consultas SQL de las peticiones medidas por vista', ['view'], buckets=QUERY_BUCKETS
+)
+REQUEST_REDIS_SECONDS = Histogram(
+    'servicenow_request_redis_seconds', 'Tiempo en Redis de las peticiones medidas por vista', ['view']
+)
+REQUEST_ERRORS = Counter(
+    'servicenow_request_errors_total', 'Peticiones medidas con respuesta 5xx por vista', ['view']
+)
+REQUEST_CACHE = Counter(
+    'servicenow_request_cache_total', 'Lecturas de caché de las peticiones medidas por vista y resultado', ['view', 'result']
+)
+CACHE_REQUESTS = Counter(
+    'servicenow_cache_requests_total', 'Lecturas de caché por resultado', ['result']
+)
+DB_CONNECTIONS_CREATED = Counter(
+    'servicenow_db_connections_created_total', 'Conexiones a la base de datos abiertas', ['alias']
+)
+DB_ASYNC_IN_USE = Gauge(
+    'servicenow_db_async_connections_in_use', 'Operaciones de base de datos en curso en el pool de los consumers'
+)
+DB_ASYNC_WAIT_SECONDS = Histogram(
+    'servicenow_db_async_wait_seconds', 'Espera en la cola del pool de base de datos de los consumers'
+)
+DB_ASYNC_TIMEOUTS = Counter(
+    'servicenow_db_async_timeouts_total', 'Operaciones que no empezaron en DB_ASYNC_ACQUIRE_TIMEOUT y se cancelaron'
+)
@@ -1,11 +1,16 @@
 """
 Middleware para controlar el acceso al sistema según el setup inicial
 """
+from django.conf import settings
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from .db_router import PIN_COOKIE, get_replica_alias, track_primary_pin
+from .instrumentation import should_sample, measure_request, record_request, get_view_name
 from .models import SystemSetup
+from .roles import get_request_roles
 
 class SystemSetupMiddleware(MiddlewareMixin):
     """
@@ -20,6 +25,8 @@ class SystemSetupMiddleware(MiddlewareMixin):
             '/setup/',
             '/api/schema/',
             '/api/docs/',
+            '/metrics',
+            '/health/',
         ]
         
         # Verificar si la URL actual está permitida
@@ -90,3 +97,58 @@ class CompanyAccessMiddleware(MiddlewareMixin):
                 return redirect('CPlogin:change_password')
         
         return None
+
+class UserRolesMiddleware(MiddlewareMixin):
+    """
+    Middleware que expone request.roles con los roles del usuario
+    Se resuelven de forma diferida desde la sesión (ver core.roles)
+    """
+    
+    def process_request(self, request):
+        request.roles = SimpleLazyObject(lambda: get_request_roles(request))
+        return None
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware que mide consultas SQL, caché, Redis y latencia de una
+    fracción de las peticiones (ver core.instrumentation)
+    Debe ir primero en MIDDLEWARE para incluir a los demás middlewares.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if not should_sample():
+            return self.get_response(request)
+        
+        with measure_request() as metrics:
+            response = self.get_response(request)
+        
+        record_request(get_view_name(request), metrics, response.status_code)
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Lectura de las propias escrituras con réplica (ver core.db_router): si la
+    petición escribe en la base de datos principal, el cliente lee de ella
+    durante READ_REPLICA_STICKY_SECONDS
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        with track_primary_pin(PIN_COOKIE in request.COOKIES) as wrote:
+            response = self.get_response(request)
+            if wrote() and get_replica_alias() is not None:
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=getattr(settings, 'READ_REPLICA_STICKY_SECONDS', 10),
+                    httponly=True, samesite='Lax'
+                )
+        return response
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    """Indexar los usuarios existentes"""
+    from core.search import SEARCH_FIELDS, build_user_tokens
+
+    User = apps.get_model('core', 'User')
+    UserSearchToken = apps.get_model('core', 'UserSearchToken')
+
+    tokens = []
+    for row in User.objects.values('pk', 'company_id', *SEARCH_FIELDS).iterator(chunk_size=2000):
+        tokens.extend(
+            UserSearchToken(user_id=row['pk'], company_id=row['company_id'], field=field, token=token)
+            for field, token in build_user_tokens(row)
+        )
+        if len(tokens) >= 5000:
+            UserSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    UserSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_add_related_name_to_ticket_subcategory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=32, verbose_name='Campo')),
+                ('token', models.CharField(max_length=64, verbose_name='Token')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company', verbose_name='Empresa')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Token de Búsqueda de Usuario',
+                'verbose_name_plural': 'Tokens de Búsqueda de Usuarios',
+                'db_table': 'user_search_tokens',
+                'indexes': [models.Index(fields=['token'], name='user_search_token_e8051d_idx'), models.Index(fields=['company', 'token'], name='user_search_company_a2befe_idx'), models.Index(fields=['company', 'field', 'token'], name='user_search_company_3eaefb_idx')],
+                'unique_together': {('user', 'field', 'token')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
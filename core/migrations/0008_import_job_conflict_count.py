@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_import_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='conflict_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='conflicts',
+            field=models.JSONField(blank=True, default=list, help_text='Muestra de los primeros conflictos'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='errors',
+            field=models.JSONField(blank=True, default=list, help_text='Muestra de los primeros errores'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_import_job_conflict_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='diff_summary',
+            field=models.JSONField(blank=True, default=dict, help_text='Resumen de la simulación'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='dry_run',
+            field=models.BooleanField(default=False, help_text='Simulación: no escribe usuarios; el reporte es el detalle en JSON lines'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:05
+
+import core.storage
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_import_job_dry_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(max_length=50)),
+                ('compress', models.BooleanField(default=False)),
+                ('use_replica', models.BooleanField(default=True, help_text='Leer de la réplica (si está configurada)')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En Proceso'), ('completed', 'Completada'), ('failed', 'Fallida')], default='pending', max_length=20)),
+                ('file', models.FileField(blank=True, storage=core.storage.get_export_storage, upload_to='exports/', verbose_name='Archivo')),
+                ('size', models.BigIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='core.company')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportación de Datos',
+                'verbose_name_plural': 'Exportaciones de Datos',
+                'db_table': 'export_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['company', 'status'], name='export_jobs_company_ffb5c0_idx')],
+            },
+        ),
+    ]
@@ -4,6 +4,8 @@ from django.utils import timezone
 from django.core.validators import MinLengthValidator
 import uuid
 
+from .storage import get_export_storage
+
 class SystemSetup(models.Model):
     """
     Control del setup inicial del sistema
@@ -141,6 +143,30 @@ class UserRole(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.role.name}"
 
+class UserSearchToken(models.Model):
+    """
+    Índice de búsqueda por prefijo del directorio de usuarios
+    Cada fila es un token normalizado (minúsculas, sin acentos) de un campo del usuario
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens', verbose_name="Usuario")
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name="Empresa")
+    field = models.CharField(max_length=32, verbose_name="Campo")
+    token = models.CharField(max_length=64, verbose_name="Token")
+
+    class Meta:
+        verbose_name = "Token de Búsqueda de Usuario"
+        verbose_name_plural = "Tokens de Búsqueda de Usuarios"
+        db_table = 'user_search_tokens'
+        unique_together = ['user', 'field', 'token']
+        indexes = [
+            models.Index(fields=['token']),
+            models.Index(fields=['company', 'token']),
+            models.Index(fields=['company', 'field', 'token']),
+        ]
+
+    def __str__(self):
+        return f"{self.token} ({self.field}) - {self.user_id}"
+
 class AuthLoginAudit(models.Model):
     """
     Auditoría de intentos de login
@@ -414,3 +440,98 @@ class KioskRegistrationToken(models.Model):
         """Marcar token como usado"""
         self.is_used = True
         self.save()
+
+
+class ImportJob(models.Model):
+    """Importación masiva de usuarios ejecutada en segundo plano"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En Proceso'),
+        ('completed', 'Completada'),
+        ('failed', 'Fallida'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='import_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    source_file = models.FileField(upload_to='imports/', verbose_name="Archivo CSV")
+    column_mapping = models.JSONField(default=dict)
+    import_config = models.JSONField(default=dict)
+    dry_run = models.BooleanField(default=False, help_text='Simulación: no escribe usuarios; el reporte es el detalle en JSON lines')
+    diff_summary = models.JSONField(default=dict, blank=True, help_text='Resumen de la simulación')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0, help_text='Filas ya confirmadas en la base de datos')
+    success_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    conflict_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text='Muestra de los primeros errores')
+    conflicts = models.JSONField(default=list, blank=True, help_text='Muestra de los primeros conflictos')
+    report_file = models.FileField(upload_to='imports/reports/', blank=True, verbose_name="Reporte")
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Importación de Usuarios"
+        verbose_name_plural = "Importaciones de Usuarios"
+        db_table = 'import_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Importación {self.id} - {self.get_status_display()}"
+    
+    @property
+    def progress(self):
+        """Porcentaje de filas procesadas"""
+        if not self.total_rows:
+            return 100 if self.status == 'completed' else 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+
+class ExportJob(models.Model):
+    """Exportación de datos generada en segundo plano (ver core.exports)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('running', 'En Proceso'),
+        ('completed', 'Completada'),
+        ('failed', 'Fallida'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='export_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    dataset = models.CharField(max_length=50)
+    compress = models.BooleanField(default=False)
+    use_replica = models.BooleanField(default=True, help_text='Leer de la réplica (si está configurada)')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', storage=get_export_storage, blank=True, verbose_name="Archivo")
+    size = models.BigIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Exportación de Datos"
+        verbose_name_plural = "Exportaciones de Datos"
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"Exportación {self.id} ({self.dataset}) - {self.get_status_display()}"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
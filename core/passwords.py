@@ -0,0 +1,123 @@
+"""
+Hashing de contraseñas por lotes para altas masivas de usuarios
+
+Cada usuario recibe su propia sal. Las contraseñas repetidas (p. ej. la
+contraseña por defecto de una importación) se agrupan y se envían una sola
+vez por lote junto con sus sales, y los lotes se reparten entre procesos
+para usar todos los núcleos. Quien hashea por bloques (un job de importación)
+crea el pool una vez con hashing_pool y lo pasa a cada llamada, en lugar de
+pagar el arranque de los procesos en cada bloque.
+"""
+import logging
+import math
+import os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este número de contraseñas no compensa levantar procesos
+POOL_MIN_PASSWORDS = 16
+
+# Máximo de contraseñas por tarea enviada a un proceso
+MAX_BATCH_SIZE = 256
+
+
+def get_hash_workers():
+    """Número de procesos para hashing (PASSWORD_HASH_WORKERS o número de CPUs)"""
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None)
+    return workers or os.cpu_count() or 1
+
+
+def _hash_batch(hasher_path, password, salts):
+    """Hashear una contraseña con cada sal (se ejecuta en el proceso worker)"""
+    hasher = import_string(hasher_path)()
+    return [hasher.encode(password, salt) for salt in salts]
+
+
+@contextmanager
+def hashing_pool(workers=None):
+    """
+    Pool de procesos para reutilizar entre llamadas a hash_passwords
+    Produce None si hay un solo worker o no se pueden crear procesos
+    (hash_passwords hashea entonces en el proceso actual).
+    """
+    workers = workers or get_hash_workers()
+    pool = None
+    if workers > 1:
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+        except OSError as e:
+            logger.warning(f"No se pudo crear el pool de hashing, se hashea en el proceso actual: {e}")
+    try:
+        yield pool
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def _map_batches(pool, hasher_path, tasks):
+    return list(pool.map(
+        _hash_batch,
+        repeat(hasher_path),
+        [password for password, _, _ in tasks],
+        [salts for _, _, salts in tasks],
+    ))
+
+
+def hash_passwords(passwords, hasher_path=None, workers=None, pool=None):
+    """
+    Hashear una lista de contraseñas, cada una con una sal distinta
+
+    hasher_path es la ruta de importación del hasher (por defecto el primero
+    de PASSWORD_HASHERS). pool es un pool de hashing_pool; sin él se crea
+    uno solo para esta llamada. Retorna los hashes en el mismo orden de entrada.
+    """
+    passwords = list(passwords)
+    if not passwords:
+        return []
+
+    hasher_path = hasher_path or settings.PASSWORD_HASHERS[0]
+    hasher = import_string(hasher_path)()
+    workers = workers or get_hash_workers()
+    batch_size = max(1, min(MAX_BATCH_SIZE, math.ceil(len(passwords) / workers)))
+
+    # Agrupar posiciones por contraseña y generar las sales en este proceso
+    positions_by_password = {}
+    for position, password in enumerate(passwords):
+        positions_by_password.setdefault(password, []).append(position)
+
+    tasks = []
+    for password, positions in positions_by_password.items():
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            tasks.append((password, batch, [hasher.salt() for _ in batch]))
+
+    results = None
+    if (pool is not None or workers > 1) and len(passwords) >= POOL_MIN_PASSWORDS:
+        try:
+            if pool is not None:
+                results = _map_batches(pool, hasher_path, tasks)
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=min(workers, len(tasks)),
+                    mp_context=get_context('spawn'),
+                ) as own_pool:
+                    results = _map_batches(own_pool, hasher_path, tasks)
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning(f"No se pudo usar el pool de hashing, se continúa en el proceso actual: {e}")
+
+    if results is None:
+        results = [_hash_batch(hasher_path, password, salts) for password, _, salts in tasks]
+
+    hashes = [None] * len(passwords)
+    for (_, batch, _), batch_hashes in zip(tasks, results):
+        for position, encoded in zip(batch, batch_hashes):
+            hashes[position] = encoded
+    return hashes
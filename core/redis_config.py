@@ -1,26 +1,179 @@
 """
 Configuración avanzada de Redis para la aplicación core
+
+Conexiones por proceso (worker), con los límites y tiempos de espera de settings:
+
+- Síncronas: un solo pool, el de la caché (django-redis, CACHES). Lo comparten
+  la caché, las sesiones, las métricas (core.metrics), get_redis_client() y
+  RedisManager. Si la caché por defecto no es django-redis (p. ej. en tests),
+  get_redis_client() usa un pool propio con los mismos límites.
+- Asíncronas (consumers): un pool por bucle de eventos (las conexiones asyncio
+  no pueden usarse desde otro bucle), creado por get_async_redis_client().
+- Capa de canales (channels_redis): sus propias conexiones por bucle, según
+  CHANNEL_LAYERS.
+
+Límite real por worker: REDIS_POOL_MAX_CONNECTIONS conexiones síncronas, más
+REDIS_POOL_MAX_CONNECTIONS por bucle de eventos en ASGI (un bucle por worker),
+más las de channels_redis. Bajo WSGI solo cuenta el pool síncrono.
+
+- REDIS_POOL_MAX_CONNECTIONS: conexiones máximas por pool. Al agotarse, el
+  pool espera hasta REDIS_POOL_TIMEOUT segundos por una conexión libre en vez
+  de abrir más.
+- REDIS_SOCKET_TIMEOUT y REDIS_SOCKET_CONNECT_TIMEOUT: tiempo máximo de una
+  respuesta y de la conexión.
+- REDIS_HEALTH_CHECK_INTERVAL: segundos de inactividad tras los que una
+  conexión se verifica con PING antes de reutilizarla.
+
+Los pools asíncronos comparten un circuit breaker por proceso (async_breaker):
+si Redis no acepta conexiones, durante REDIS_BREAKER_SECONDS (el doble tras
+cada fallo seguido, hasta REDIS_BREAKER_MAX_SECONDS) los comandos fallan al
+instante con RedisUnavailable en vez de reintentar la conexión en cada
+llamada; pasado ese tiempo una sola llamada vuelve a probar.
 """
+import asyncio
+import threading
+import time
+import weakref
+
 import redis
+import redis.asyncio as aioredis
 from django.conf import settings
 from django.core.cache import cache
+from django_redis import get_redis_connection
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+_pools = {}
+_async_pools = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def get_connection_kwargs(decode_responses=False):
+    """Parámetros de conexión comunes a los pools síncronos y asíncronos"""
+    return {
+        'host': settings.REDIS_HOST,
+        'port': settings.REDIS_PORT,
+        'db': settings.REDIS_DB,
+        'password': getattr(settings, 'REDIS_PASSWORD', None),
+        'socket_timeout': getattr(settings, 'REDIS_SOCKET_TIMEOUT', 5),
+        'socket_connect_timeout': getattr(settings, 'REDIS_SOCKET_CONNECT_TIMEOUT', 2),
+        'health_check_interval': getattr(settings, 'REDIS_HEALTH_CHECK_INTERVAL', 30),
+        'max_connections': getattr(settings, 'REDIS_POOL_MAX_CONNECTIONS', 50),
+        'timeout': getattr(settings, 'REDIS_POOL_TIMEOUT', 5),
+        'decode_responses': decode_responses,
+    }
+
+
+def get_connection_pool():
+    """Pool síncrono propio del proceso, si la caché no es django-redis (redis-py lo recrea tras un fork)"""
+    pool = _pools.get('default')
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get('default')
+            if pool is None:
+                pool = _pools['default'] = redis.BlockingConnectionPool(**get_connection_kwargs())
+    return pool
+
+
+def get_redis_client():
+    """
+    Cliente síncrono sobre el pool de la caché (django-redis)
+    Las respuestas son bytes, como en la caché
+    """
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return redis.Redis(connection_pool=get_connection_pool())
+
+
+class RedisUnavailable(redis.exceptions.ConnectionError):
+    """Redis no se consulta: el circuit breaker está abierto tras un fallo de conexión"""
+
+
+class CircuitBreaker:
+    """Corte de los intentos de conexión a Redis tras un fallo, con espera creciente"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+    
+    def _delay(self):
+        base = getattr(settings, 'REDIS_BREAKER_SECONDS', 1)
+        return min(base * 2 ** max(self.failures - 1, 0), getattr(settings, 'REDIS_BREAKER_MAX_SECONDS', 30))
+    
+    def before_call(self):
+        """Lanzar RedisUnavailable si está abierto; si ya venció, dejar pasar una sola prueba"""
+        with self._lock:
+            if not self.failures:
+                return
+            now = time.monotonic()
+            if now < self.open_until:
+                raise RedisUnavailable(f'Redis no disponible (reintento en {self.open_until - now:.1f}s)')
+            # Semiabierto: las demás llamadas siguen cortadas mientras se prueba
+            self.open_until = now + self._delay()
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.open_until = time.monotonic() + self._delay()
+
+
+async_breaker = CircuitBreaker()
+
+
+class BreakerConnectionPool(aioredis.BlockingConnectionPool):
+    """Pool asíncrono que consulta async_breaker antes de entregar (y conectar) una conexión"""
+    
+    async def get_connection(self, *args, **kwargs):
+        async_breaker.before_call()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError):
+            async_breaker.record_failure()
+            raise
+        async_breaker.record_success()
+        return connection
+
+
+def get_async_redis_client():
+    """
+    Cliente asyncio (respuestas decodificadas) sobre el pool del bucle de eventos en curso
+    Las conexiones asyncio no pueden usarse desde otro bucle: cada bucle tiene su pool
+    """
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = _async_pools[loop] = BreakerConnectionPool(**get_connection_kwargs(decode_responses=True))
+    return aioredis.Redis(connection_pool=pool)
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
 class RedisManager:
     """
     Gestor avanzado de Redis para operaciones complejas
+    Usa el pool de la caché (get_redis_client); hashes y sets se retornan como texto
     """
     
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True
-        )
+        self._client = None
+    
+    @property
+    def redis_client(self):
+        return self._client or get_redis_client()
+    
+    @redis_client.setter
+    def redis_client(self, client):
+        self._client = client
     
     def set_with_expiry(self, key, value, expiry=3600):
         """
@@ -34,6 +187,18 @@ class RedisManager:
             logger.error(f"Error al establecer valor en Redis: {e}")
             return False
     
+    def _write_with_expiry(self, command, key, *args, expiry=None, **kwargs):
+        """
+        Ejecutar un comando de escritura y su EXPIRE en una transacción (MULTI/EXEC)
+        Sin expiración se ejecuta solo el comando; retorna el resultado del comando
+        """
+        if not expiry:
+            return getattr(self.redis_client, command)(key, *args, **kwargs)
+        pipe = self.redis_client.pipeline(transaction=True)
+        getattr(pipe, command)(key, *args, **kwargs)
+        pipe.expire(key, expiry)
+        return pipe.execute()[0]
+    
     def get_json(self, key):
         """
         Obtener valor JSON de Redis
@@ -50,15 +215,55 @@ class RedisManager:
             logger.error(f"Error al obtener valor de Redis: {e}")
             return None
     
+    def mget_json(self, keys):
+        """
+        Obtener varios valores JSON en un solo MGET
+        Retorna {clave: valor} solo con las claves existentes y con JSON válido
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = self.redis_client.mget(keys)
+        except Exception as e:
+            logger.error(f"Error al obtener valores de Redis: {e}")
+            return {}
+        
+        result = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            try:
+                result[key] = json.loads(value)
+            except json.JSONDecodeError:
+                logger.warning(f"Valor en Redis no es JSON válido para key: {key}")
+        return result
+    
+    def mset_json(self, mapping, expiry=None):
+        """
+        Establecer varios valores JSON en una transacción
+        Sin expiración usa un solo MSET; con expiración, SET ... EX por clave
+        """
+        if not mapping:
+            return True
+        try:
+            values = {key: json.dumps(value) for key, value in mapping.items()}
+            if not expiry:
+                return bool(self.redis_client.mset(values))
+            pipe = self.redis_client.pipeline(transaction=True)
+            for key, value in values.items():
+                pipe.set(key, value, ex=expiry)
+            return all(pipe.execute())
+        except Exception as e:
+            logger.error(f"Error al establecer valores en Redis: {e}")
+            return False
+    
     def set_hash(self, hash_name, mapping, expiry=None):
         """
         Establecer hash en Redis
         """
         try:
-            result = self.redis_client.hset(hash_name, mapping=mapping)
-            if expiry:
-                self.redis_client.expire(hash_name, expiry)
-            return result
+            return self._write_with_expiry('hset', hash_name, mapping=mapping, expiry=expiry)
         except Exception as e:
             logger.error(f"Error al establecer hash en Redis: {e}")
             return False
@@ -68,20 +273,28 @@ class RedisManager:
         Obtener hash completo de Redis
         """
         try:
-            return self.redis_client.hgetall(hash_name)
+            return {_decode(field): _decode(value) for field, value in self.redis_client.hgetall(hash_name).items()}
         except Exception as e:
             logger.error(f"Error al obtener hash de Redis: {e}")
             return {}
     
-    def delete_pattern(self, pattern):
+    def delete_pattern(self, pattern, batch_size=500):
         """
         Eliminar todas las claves que coincidan con un patrón
+        Recorre el keyspace con SCAN (sin bloquear Redis como KEYS) y elimina por
+        lotes con UNLINK, que libera la memoria fuera del hilo principal de Redis
         """
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            for key in self.redis_client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += self.redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis_client.unlink(*batch)
+            return deleted
         except Exception as e:
             logger.error(f"Error al eliminar patrón de Redis: {e}")
             return 0
@@ -91,10 +304,7 @@ class RedisManager:
         Incrementar contador en Redis
         """
         try:
-            result = self.redis_client.incr(key, amount)
-            if expiry:
-                self.redis_client.expire(key, expiry)
-            return result
+            return self._write_with_expiry('incr', key, amount, expiry=expiry)
         except Exception as e:
             logger.error(f"Error al incrementar contador en Redis: {e}")
             return None
@@ -104,10 +314,7 @@ class RedisManager:
         Agregar valores a un set en Redis
         """
         try:
-            result = self.redis_client.sadd(set_name, *values)
-            if expiry:
-                self.redis_client.expire(set_name, expiry)
-            return result
+            return self._write_with_expiry('sadd', set_name, *values, expiry=expiry)
         except Exception as e:
             logger.error(f"Error al agregar a set en Redis: {e}")
             return False
@@ -117,7 +324,7 @@ class RedisManager:
         Obtener todos los miembros de un set
         """
         try:
-            return self.redis_client.smembers(set_name)
+            return {_decode(member) for member in self.redis_client.smembers(set_name)}
         except Exception as e:
             logger.error(f"Error al obtener miembros del set: {e}")
             return set()
@@ -150,3 +357,203 @@ def get_redis_manager():
     Obtener instancia del gestor de Redis
     """
     return redis_manager
+
+
+class AsyncRedisManager:
+    """
+    Versión asyncio de RedisManager (misma API, métodos con await) para los
+    consumers de Channels: usa el pool asíncrono del bucle de eventos en curso,
+    sin pasar por el pool de hilos de sync_to_async
+    Con el circuit breaker abierto las operaciones retornan su valor por
+    defecto al instante y sin registrar un error por llamada
+    """
+    
+    @staticmethod
+    def _log_error(message, error):
+        if isinstance(error, RedisUnavailable):
+            logger.debug(f"{message}: {error}")
+        else:
+            logger.error(f"{message}: {error}")
+    
+    @property
+    def redis_client(self):
+        return get_async_redis_client()
+    
+    async def _write_with_expiry(self, command, key, *args, expiry=None, **kwargs):
+        """Ejecutar un comando de escritura y su EXPIRE en una transacción (MULTI/EXEC)"""
+        client = self.redis_client
+        if not expiry:
+            return await getattr(client, command)(key, *args, **kwargs)
+        async with client.pipeline(transaction=True) as pipe:
+            getattr(pipe, command)(key, *args, **kwargs)
+            pipe.expire(key, expiry)
+            return (await pipe.execute())[0]
+    
+    async def set_with_expiry(self, key, value, expiry=3600):
+        """
+        Establecer valor con tiempo de expiración
+        """
+        try:
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value)
+            return await self.redis_client.setex(key, expiry, value)
+        except Exception as e:
+            self._log_error("Error al establecer valor en Redis", e)
+            return False
+    
+    async def get_json(self, key):
+        """
+        Obtener valor JSON de Redis
+        """
+        try:
+            value = await self.redis_client.get(key)
+            if value:
+                return json.loads(value)
+            return None
+        except json.JSONDecodeError:
+            logger.warning(f"Valor en Redis no es JSON válido para key: {key}")
+            return None
+        except Exception as e:
+            self._log_error("Error al obtener valor de Redis", e)
+            return None
+    
+    async def mget_json(self, keys):
+        """
+        Obtener varios valores JSON en un solo MGET
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = await self.redis_client.mget(keys)
+        except Exception as e:
+            self._log_error("Error al obtener valores de Redis", e)
+            return {}
+        
+        result = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            try:
+                result[key] = json.loads(value)
+            except json.JSONDecodeError:
+                logger.warning(f"Valor en Redis no es JSON válido para key: {key}")
+        return result
+    
+    async def mset_json(self, mapping, expiry=None):
+        """
+        Establecer varios valores JSON en una transacción
+        """
+        if not mapping:
+            return True
+        try:
+            values = {key: json.dumps(value) for key, value in mapping.items()}
+            if not expiry:
+                return bool(await self.redis_client.mset(values))
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, value, ex=expiry)
+                return all(await pipe.execute())
+        except Exception as e:
+            self._log_error("Error al establecer valores en Redis", e)
+            return False
+    
+    async def set_hash(self, hash_name, mapping, expiry=None):
+        """
+        Establecer hash en Redis
+        """
+        try:
+            return await self._write_with_expiry('hset', hash_name, mapping=mapping, expiry=expiry)
+        except Exception as e:
+            self._log_error("Error al establecer hash en Redis", e)
+            return False
+    
+    async def get_hash(self, hash_name):
+        """
+        Obtener hash completo de Redis
+        """
+        try:
+            return await self.redis_client.hgetall(hash_name)
+        except Exception as e:
+            self._log_error("Error al obtener hash de Redis", e)
+            return {}
+    
+    async def delete_pattern(self, pattern, batch_size=500):
+        """
+        Eliminar todas las claves que coincidan con un patrón (SCAN y UNLINK por lotes)
+        """
+        try:
+            client = self.redis_client
+            deleted = 0
+            batch = []
+            async for key in client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await client.unlink(*batch)
+            return deleted
+        except Exception as e:
+            self._log_error("Error al eliminar patrón de Redis", e)
+            return 0
+    
+    async def increment_counter(self, key, amount=1, expiry=None):
+        """
+        Incrementar contador en Redis
+        """
+        try:
+            return await self._write_with_expiry('incr', key, amount, expiry=expiry)
+        except Exception as e:
+            self._log_error("Error al incrementar contador en Redis", e)
+            return None
+    
+    async def add_to_set(self, set_name, *values, expiry=None):
+        """
+        Agregar valores a un set en Redis
+        """
+        try:
+            return await self._write_with_expiry('sadd', set_name, *values, expiry=expiry)
+        except Exception as e:
+            self._log_error("Error al agregar a set en Redis", e)
+            return False
+    
+    async def get_set_members(self, set_name):
+        """
+        Obtener todos los miembros de un set
+        """
+        try:
+            return await self.redis_client.smembers(set_name)
+        except Exception as e:
+            self._log_error("Error al obtener miembros del set", e)
+            return set()
+    
+    async def health_check(self):
+        """
+        Verificar estado de salud de Redis
+        """
+        try:
+            client = self.redis_client
+            await client.ping()
+            info = await client.info()
+            return {
+                'status': 'healthy',
+                'version': info.get('redis_version', 'N/A'),
+                'connected_clients': info.get('connected_clients', 0),
+                'used_memory': info.get('used_memory_human', 'N/A'),
+                'uptime': info.get('uptime_in_seconds', 0)
+            }
+        except Exception as e:
+            return {
+                'status': 'unhealthy',
+                'error': str(e)
+            }
+
+# Instancia global del gestor asíncrono de Redis
+async_redis_manager = AsyncRedisManager()
+
+def get_async_redis_manager():
+    """
+    Obtener instancia del gestor asíncrono de Redis
+    """
+    return async_redis_manager
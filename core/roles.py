@@ -0,0 +1,104 @@
+"""
+Resolución de roles del usuario con caché en sesión
+
+Los roles efectivos se resuelven una vez por login y se guardan en la sesión
+junto con un sello de versión. El sello combina una versión global (cambios
+en Role) y una versión por usuario (cambios en UserRole), ambas en el cache
+de Django (Redis), de modo que un cambio de roles invalida las sesiones
+afectadas sin consultar la base de datos en cada request.
+"""
+from django.core.cache import cache
+
+SESSION_ROLES_KEY = '_user_roles'
+GLOBAL_VERSION_KEY = 'roles:version'
+USER_VERSION_KEY = 'roles:version:user:{user_id}'
+
+
+class UserRoles(tuple):
+    """
+    Claves de rol del usuario, en el orden de asignación
+    El primer rol es el rol principal (equivalente a userrole_set.first())
+    """
+
+    def __new__(cls, keys=(), is_superuser=False):
+        instance = super().__new__(cls, keys)
+        instance.is_superuser = is_superuser
+        return instance
+
+    @property
+    def primary(self):
+        """Rol principal; sin roles asignados, admin para superusuarios y user para el resto"""
+        if self:
+            return self[0]
+        return 'admin' if self.is_superuser else 'user'
+
+
+def _user_version_key(user_id):
+    return USER_VERSION_KEY.format(user_id=user_id)
+
+
+def get_roles_version(user_id):
+    """Sello de versión actual de los roles de un usuario"""
+    versions = cache.get_many([GLOBAL_VERSION_KEY, _user_version_key(user_id)])
+    return [versions.get(GLOBAL_VERSION_KEY, 0), versions.get(_user_version_key(user_id), 0)]
+
+
+def _bump(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def bump_roles_version(user_id=None):
+    """
+    Invalidar roles cacheados: de un usuario, o de todos si user_id es None
+    """
+    _bump(GLOBAL_VERSION_KEY if user_id is None else _user_version_key(user_id))
+
+
+def resolve_user_roles(user):
+    """Consultar en la base de datos las claves de rol del usuario"""
+    if not user.is_authenticated:
+        return UserRoles()
+    keys = user.userrole_set.order_by('id').values_list('role__key', flat=True)
+    return UserRoles(keys, is_superuser=user.is_superuser)
+
+
+def load_session_roles(request, user):
+    """
+    Resolver los roles del usuario y guardarlos en la sesión con su sello de versión
+    El sello se lee antes de consultar, así un cambio concurrente invalida lo guardado
+    """
+    version = get_roles_version(user.pk)
+    roles = resolve_user_roles(user)
+    request.session[SESSION_ROLES_KEY] = {
+        'user_id': user.pk,
+        'version': version,
+        'roles': list(roles),
+    }
+    return roles
+
+
+def get_request_roles(request):
+    """
+    Roles del usuario del request, desde la sesión si el sello sigue vigente
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return UserRoles()
+
+    session = getattr(request, 'session', None)
+    if session is None:
+        return resolve_user_roles(user)
+
+    cached = session.get(SESSION_ROLES_KEY)
+    if (
+        cached
+        and cached.get('user_id') == user.pk
+        and cached.get('version') == get_roles_version(user.pk)
+    ):
+        return UserRoles(cached['roles'], is_superuser=user.is_superuser)
+
+    return load_session_roles(request, user)
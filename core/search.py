@@ -0,0 +1,130 @@
+"""
+Búsqueda en el directorio de usuarios mediante un índice de prefijos normalizado
+"""
+import re
+import unicodedata
+import logging
+
+from rest_framework.filters import SearchFilter
+
+logger = logging.getLogger(__name__)
+
+# Campos del usuario que se indexan
+SEARCH_FIELDS = [
+    'username', 'first_name', 'last_name', 'email',
+    'employee_number', 'sap_id', 'department', 'location',
+]
+
+# Longitud máxima de un token (igual a UserSearchToken.token)
+MAX_TOKEN_LENGTH = 64
+
+TOKEN_SPLIT_RE = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_text(value):
+    """
+    Normalizar texto: minúsculas y sin acentos ("Peña" -> "pena")
+    """
+    if value is None:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return folded.lower()
+
+
+def tokenize(value):
+    """
+    Dividir un texto normalizado en tokens alfanuméricos únicos (en orden)
+    """
+    tokens = []
+    for token in TOKEN_SPLIT_RE.split(normalize_text(value)):
+        token = token[:MAX_TOKEN_LENGTH]
+        if token and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def build_user_tokens(values):
+    """
+    Obtener los pares (campo, token) a indexar a partir de un dict de valores del usuario
+    """
+    pairs = []
+    for field in SEARCH_FIELDS:
+        for token in tokenize(values.get(field)):
+            pairs.append((field, token))
+    return pairs
+
+
+def index_user(user):
+    """
+    Reconstruir los tokens de búsqueda de un usuario
+    """
+    from .models import UserSearchToken
+
+    values = {field: getattr(user, field, '') for field in SEARCH_FIELDS}
+    UserSearchToken.objects.filter(user_id=user.pk).delete()
+    UserSearchToken.objects.bulk_create([
+        UserSearchToken(user_id=user.pk, company_id=user.company_id, field=field, token=token)
+        for field, token in build_user_tokens(values)
+    ])
+
+
+def index_users(queryset, batch_size=1000):
+    """
+    Reconstruir los tokens de búsqueda de un conjunto de usuarios por lotes
+    Retorna el número de usuarios indexados
+    """
+    from .models import UserSearchToken
+
+    user_ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        batch_ids = user_ids[start:start + batch_size]
+        rows = queryset.model.objects.filter(pk__in=batch_ids).values('pk', 'company_id', *SEARCH_FIELDS)
+
+        tokens = []
+        for row in rows:
+            tokens.extend(
+                UserSearchToken(user_id=row['pk'], company_id=row['company_id'], field=field, token=token)
+                for field, token in build_user_tokens(row)
+            )
+
+        UserSearchToken.objects.filter(user_id__in=batch_ids).delete()
+        UserSearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+
+    return len(user_ids)
+
+
+def search_users(queryset, query, fields=None, company=None):
+    """
+    Filtrar un queryset de usuarios con el índice de prefijos
+
+    Cada término de la búsqueda debe coincidir con el inicio de algún token
+    del usuario (en los campos indicados, o en todos si fields es None).
+    """
+    from .models import UserSearchToken
+
+    terms = tokenize(query)
+    if not terms:
+        return queryset
+
+    for term in terms:
+        tokens = UserSearchToken.objects.filter(token__startswith=term)
+        if company is not None:
+            tokens = tokens.filter(company=company)
+        if fields:
+            tokens = tokens.filter(field__in=fields)
+        queryset = queryset.filter(pk__in=tokens.values('user_id'))
+
+    return queryset
+
+
+class UserDirectorySearchFilter(SearchFilter):
+    """
+    SearchFilter de DRF que resuelve ?search= con el índice del directorio de usuarios
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search_users(queryset, query)
@@ -8,6 +8,59 @@ from .models import (
     WorkSession, Ticket, TicketTurn, Kiosk, KioskRegistrationToken
 )
 
+def get_user_roles_data(user):
+    """
+    Roles del usuario serializados
+    Usa el prefetch de userrole_set__role cuando el queryset lo trae, sin consultas extra
+    """
+    if 'userrole_set' in getattr(user, '_prefetched_objects_cache', {}):
+        user_roles = user.userrole_set.all()
+    else:
+        user_roles = user.userrole_set.select_related('role')
+    return [{'id': ur.role.id, 'name': ur.role.name, 'key': ur.role.key} for ur in user_roles]
+
+
+def get_requested_fields(request):
+    """
+    Obtener el conjunto de campos pedidos con ?fields=campo1,campo2 (None si no se indicó)
+    """
+    if request is None:
+        return None
+    fields_param = request.query_params.get('fields', '') if hasattr(request, 'query_params') else ''
+    requested = {name.strip() for name in fields_param.split(',') if name.strip()}
+    return requested or None
+
+
+def setup_eager_loading(queryset, fields, select_related_map, prefetch_related_map):
+    """
+    Agregar al queryset solo los select_related/prefetch_related de los campos pedidos
+    """
+    select_related = set()
+    prefetch_related = set()
+    for field_name in fields:
+        select_related.update(select_related_map.get(field_name, []))
+        prefetch_related.update(prefetch_related_map.get(field_name, []))
+    
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*sorted(prefetch_related))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin para serializers que permite limitar los campos con ?fields=
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = get_requested_fields(self.context.get('request'))
+        if requested:
+            for field_name in set(self.fields) - requested:
+                self.fields.pop(field_name)
+
+
 class SystemSetupSerializer(serializers.ModelSerializer):
     """Serializer para SystemSetup"""
     
@@ -79,8 +132,7 @@ class UserSerializer(serializers.ModelSerializer):
     
     def get_roles(self, obj) -> list:
         """Obtener roles del usuario"""
-        user_roles = UserRole.objects.filter(user=obj)
-        return [{'id': ur.role.id, 'name': ur.role.name, 'key': ur.role.key} for ur in user_roles]
+        return get_user_roles_data(obj)
 
 class UserCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear usuarios"""
@@ -202,7 +254,7 @@ class WorkSessionSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'start_time', 'end_time', 'is_active', 'created_at']
 
 
-class TicketSerializer(serializers.ModelSerializer):
+class TicketSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer para Ticket"""
     category = TicketCategorySerializer(read_only=True)
     subcategory = TicketSubcategorySerializer(read_only=True)
@@ -215,6 +267,55 @@ class TicketSerializer(serializers.ModelSerializer):
             'id', 'code', 'requester', 'assigned_to', 'category', 'subcategory',
             'template', 'form_data', 'status', 'priority', 'created_at', 'updated_at'
         ]
+    
+    # Relaciones necesarias por campo serializado
+    SELECT_RELATED = {
+        'requester': ['requester__company'],
+        'assigned_to': ['assigned_to__company'],
+        'category': ['category'],
+        'subcategory': ['subcategory'],
+    }
+    PREFETCH_RELATED = {
+        'requester': ['requester__userrole_set__role'],
+        'assigned_to': ['assigned_to__userrole_set__role'],
+    }
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields):
+        """Aplicar select_related/prefetch_related según los campos que se van a serializar"""
+        return setup_eager_loading(queryset, fields, cls.SELECT_RELATED, cls.PREFETCH_RELATED)
+
+
+class TicketListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Serializer liviano para listados de tickets (ids planos + nombres para mostrar)"""
+    requester_name = serializers.CharField(source='requester.get_full_name', read_only=True)
+    assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True, default=None)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    subcategory_name = serializers.CharField(source='subcategory.name', read_only=True, default=None)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    
+    class Meta:
+        model = Ticket
+        fields = [
+            'id', 'code', 'company', 'requester', 'requester_name', 'assigned_to', 'assigned_to_name',
+            'category', 'category_name', 'subcategory', 'subcategory_name', 'template',
+            'status', 'status_display', 'priority', 'priority_display', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    SELECT_RELATED = {
+        'requester_name': ['requester'],
+        'assigned_to_name': ['assigned_to'],
+        'category_name': ['category'],
+        'subcategory_name': ['subcategory'],
+    }
+    PREFETCH_RELATED = {}
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields):
+        """Aplicar select_related según los campos que se van a serializar"""
+        return setup_eager_loading(queryset, fields, cls.SELECT_RELATED, cls.PREFETCH_RELATED)
 
 
 class TicketCreateSerializer(serializers.ModelSerializer):
@@ -322,8 +423,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     
     def get_roles(self, obj) -> list:
         """Obtener roles del usuario"""
-        user_roles = UserRole.objects.filter(user=obj)
-        return [{'id': ur.role.id, 'name': ur.role.name, 'key': ur.role.key} for ur in user_roles]
+        return get_user_roles_data(obj)
 
 class ChangePasswordSerializer(serializers.Serializer):
     """Serializer para cambio de contraseña"""
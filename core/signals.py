@@ -0,0 +1,55 @@
+"""
+Señales de la aplicación core
+"""
+from django.contrib.auth.signals import user_logged_in
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .metrics import TICKETS_ISSUED, DB_CONNECTIONS_CREATED
+from .models import User, Role, UserRole, Ticket
+from .roles import bump_roles_version, load_session_roles
+from .search import SEARCH_FIELDS, index_user
+
+
+@receiver(post_save, sender=User)
+def update_user_search_index(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Mantener el índice de búsqueda del directorio al guardar un usuario"""
+    if raw:
+        return
+    # Guardados parciales que no tocan campos indexados (p. ej. last_login) no reindexan
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS + ['company']):
+        return
+    index_user(instance)
+
+
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_user_roles(sender, instance, **kwargs):
+    """Invalidar los roles cacheados del usuario al cambiar sus asignaciones"""
+    bump_roles_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_all_roles(sender, instance, **kwargs):
+    """Invalidar los roles cacheados de todos los usuarios al cambiar un rol"""
+    bump_roles_version()
+
+
+@receiver(user_logged_in)
+def cache_roles_on_login(sender, request, user, **kwargs):
+    """Resolver los roles una vez al iniciar sesión"""
+    if request is not None and hasattr(request, 'session'):
+        load_session_roles(request, user)
+
+
+@receiver(post_save, sender=Ticket)
+def count_issued_ticket(sender, instance, created, raw=False, **kwargs):
+    """Contar los tickets creados por empresa"""
+    if created and not raw:
+        TICKETS_ISSUED.inc(company=instance.company_id)
+
+
+@receiver(connection_created)
+def count_db_connection(sender, connection, **kwargs):
+    """Contar las conexiones abiertas a la base de datos por alias"""
+    DB_CONNECTIONS_CREATED.inc(alias=connection.alias)
@@ -0,0 +1,33 @@
+"""
+Almacenamiento privado de archivos con datos personales (exportaciones)
+
+Los archivos se guardan fuera de MEDIA_ROOT (EXPORTS_ROOT), de modo que ni
+static() en DEBUG ni el servidor web los publican, y no tienen URL: se
+descargan solo a través de vistas autenticadas.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class PrivateExportStorage(FileSystemStorage):
+    """FileSystemStorage sobre settings.EXPORTS_ROOT, sin URL pública"""
+
+    @property
+    def base_location(self):
+        return settings.EXPORTS_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError('Los archivos de exportación no tienen URL pública')
+
+
+export_storage = PrivateExportStorage()
+
+
+def get_export_storage():
+    return export_storage
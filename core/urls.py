@@ -13,6 +13,9 @@ from .views import (
     # Upload
     FileUploadAPIView,
     
+    # Metrics
+    RequestMetricsAPIView,
+    
     # Kiosk views
     kiosk_view, kiosk_status, kiosk_categories, kiosk_subcategories,
     kiosk_template, kiosk_generate_ticket, kiosk_health,
@@ -28,10 +31,7 @@ router.register(r'ticket-turns', TicketTurnViewSet, basename='ticket-turn')
 
 # URLs de la API
 urlpatterns = [
-    # Router de ViewSets
-    path('', include(router.urls)),
-    
-    # Endpoints especiales de kioskos
+    # Endpoints especiales de kioskos (antes del router para que kiosks/<pk>/ no los capture)
     path('kiosks/generate-registration-url/', GenerateKioskUrlAPIView.as_view(), name='generate-kiosk-url'),
     path('kiosks/register/<str:token>/', KioskRegistrationAPIView.as_view(), name='kiosk-registration'),
     
@@ -39,8 +39,14 @@ urlpatterns = [
     path('kiosks/templates/', KioskTemplatesAPIView.as_view(), name='kiosk-templates'),
     path('kiosks/generate-ticket-order/', GenerateTicketOrderAPIView.as_view(), name='generate-ticket-order'),
     
+    # Router de ViewSets
+    path('', include(router.urls)),
+    
     # Endpoint de upload de archivos
     path('upload/', FileUploadAPIView.as_view(), name='file-upload'),
+    
+    # Métricas de rendimiento por vista
+    path('metrics/requests/', RequestMetricsAPIView.as_view(), name='request-metrics'),
 
     # Kiosk URLs
     path('kiosk/', kiosk_view, name='kiosk'),
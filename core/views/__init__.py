@@ -26,6 +26,10 @@ from .tickets import (
 
 from .upload import FileUploadAPIView
 
+from .metrics import RequestMetricsAPIView, prometheus_metrics
+
+from .health import health_live, health_ready, HealthDiagnosticsAPIView
+
 from .kiosk import (
     kiosk_view, kiosk_status, kiosk_categories, kiosk_subcategories,
     kiosk_template, kiosk_generate_ticket, kiosk_health
@@ -53,6 +57,13 @@ __all__ = [
     
     # Upload
     'FileUploadAPIView',
+    
+    # Metrics
+    'RequestMetricsAPIView', 'prometheus_metrics',
+    
+    # Health
+    'health_live', 'health_ready', 'HealthDiagnosticsAPIView',
+    
     'kiosk_view', 'kiosk_status', 'kiosk_categories', 'kiosk_subcategories',
     'kiosk_template', 'kiosk_generate_ticket', 'kiosk_health',
 ]
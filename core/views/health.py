@@ -0,0 +1,41 @@
+"""
+Vistas de salud: liveness, readiness y diagnóstico
+"""
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+
+from .. import health
+
+
+@csrf_exempt
+@require_GET
+def health_live(request):
+    """Liveness: el proceso responde (sin consultar la base de datos ni Redis)"""
+    return JsonResponse(health.liveness())
+
+
+@csrf_exempt
+@require_GET
+def health_ready(request):
+    """Readiness: último resultado de SELECT 1 y PING (503 si alguna verificación falla)"""
+    result = health.readiness()
+    return JsonResponse(result, status=200 if result['ready'] else 503)
+
+
+class HealthDiagnosticsAPIView(APIView):
+    """Diagnóstico completo de la base de datos y Redis"""
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(
+        tags=["6. Monitoring"],
+        summary="Diagnóstico de salud",
+        description="Verificaciones de readiness sin caché, información de la base de datos (versión, tablas, tamaño) "
+                    "e información de Redis (INFO). Consultas pesadas: no usar como sonda periódica"
+    )
+    def get(self, request):
+        return Response(health.diagnostics())
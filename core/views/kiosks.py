@@ -34,6 +34,10 @@ class KioskViewSet(viewsets.ModelViewSet):
     
     def get_view_description(self, html=False):
         return "Gestión de kioskos de tickets"
+    
+    def get_queryset(self):
+        """Cargar empresa, usuario y roles del usuario en consultas fijas"""
+        return Kiosk.objects.select_related('company', 'user__company').prefetch_related('user__userrole_set__role')
 
 
 @extend_schema(tags=["5. Kiosks & Tickets"], summary="Generar URL de Registro", description="Genera URL única para registro de kiosko")
@@ -0,0 +1,62 @@
+"""
+Vistas de métricas de rendimiento
+"""
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+
+from ..instrumentation import request_metrics_snapshot
+from ..metrics import CONTENT_TYPE, collector, render_metrics
+
+
+class RequestMetricsAPIView(APIView):
+    """Histogramas por vista de latencia, SQL, caché y Redis de todos los workers"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    @extend_schema(
+        tags=["6. Monitoring"],
+        summary="Métricas por vista",
+        description="Histogramas de latencia, consultas SQL, tiempo SQL y tiempo de Redis, y aciertos/fallos de caché "
+                    "de las peticiones medidas (INSTRUMENTATION_SAMPLE_RATE), agregados entre workers como /metrics"
+    )
+    def get(self, request):
+        return Response(request_metrics_snapshot())
+
+
+def _database_up():
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        return 1
+    except Exception:
+        return 0
+
+
+def _redis_up(client):
+    try:
+        return int(bool(client.ping()))
+    except Exception:
+        return 0
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Métricas en formato de exposición de Prometheus
+    Accesible desde METRICS_ALLOWED_IPS (dirección de la conexión) o para el personal administrativo
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips and not request.user.is_staff:
+        return HttpResponseForbidden('Acceso denegado')
+    
+    extra = [('servicenow_database_up', 'gauge', 'La base de datos responde a SELECT 1', _database_up())]
+    client = collector.get_redis()
+    if client is not None:
+        extra.append(('servicenow_redis_up', 'gauge', 'Redis responde a PING', _redis_up(client)))
+    return HttpResponse(render_metrics(extra), content_type=CONTENT_TYPE)
@@ -262,7 +262,7 @@ class SystemStatusAPIView(APIView):
             from django import get_version
             from rest_framework import VERSION as drf_version
             from django.conf import settings
-            import redis
+            from ..redis_config import get_redis_client
             
             setup = SystemSetup.objects.first()
             companies_count = Company.objects.count()
@@ -274,8 +274,7 @@ class SystemStatusAPIView(APIView):
             # Verificar Redis
             redis_available = False
             try:
-                r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
-                r.ping()
+                get_redis_client().ping()
                 redis_available = True
             except:
                 pass
@@ -4,16 +4,26 @@ Vistas para gestión de tickets y turnos
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiResponse
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiResponse, OpenApiParameter
+from django.db.models import Prefetch
 from django.utils import timezone
 import json
 
+from ..metrics import TICKET_ISSUANCE_SECONDS, TURN_ALLOCATION_SECONDS, TURN_COLLISIONS
 from ..models import Ticket, TicketTurn, TicketCategory, TicketSubcategory, TicketTemplate, TicketTemplateField, WorkSession
-from ..serializers import TicketSerializer, TicketTurnSerializer
+from ..serializers import TicketSerializer, TicketListSerializer, TicketTurnSerializer, get_requested_fields
 
 
 @extend_schema_view(
-    list=extend_schema(summary="Listar tickets", description="Obtiene la lista de tickets del sistema", tags=["5. Kiosks & Tickets"]),
+    list=extend_schema(
+        summary="Listar tickets",
+        description="Obtiene la lista de tickets del sistema",
+        tags=["5. Kiosks & Tickets"],
+        parameters=[
+            OpenApiParameter(name='mode', type=str, enum=['full', 'lean'], description='lean: ids planos y nombres para mostrar en lugar de objetos anidados'),
+            OpenApiParameter(name='fields', type=str, description='Campos a incluir separados por coma (sparse fieldset)'),
+        ]
+    ),
     create=extend_schema(summary="Crear ticket", description="Crea un nuevo ticket", tags=["5. Kiosks & Tickets"]),
     retrieve=extend_schema(summary="Obtener ticket", description="Obtiene los detalles de un ticket específico", tags=["5. Kiosks & Tickets"]),
     update=extend_schema(summary="Actualizar ticket", description="Actualiza los datos de un ticket", tags=["5. Kiosks & Tickets"]),
@@ -33,6 +43,18 @@ class TicketViewSet(viewsets.ModelViewSet):
     
     def get_view_description(self, html=False):
         return "Gestión de tickets de soporte"
+    
+    def get_serializer_class(self):
+        """Usar el serializer liviano en modo lean"""
+        if getattr(self.request, 'query_params', {}).get('mode') == 'lean':
+            return TicketListSerializer
+        return TicketSerializer
+    
+    def get_queryset(self):
+        """Cargar solo las relaciones que necesitan los campos solicitados"""
+        serializer_class = self.get_serializer_class()
+        fields = get_requested_fields(self.request) or serializer_class.Meta.fields
+        return serializer_class.setup_eager_loading(Ticket.objects.all(), fields)
 
 
 @extend_schema_view(
@@ -56,6 +78,15 @@ class TicketTurnViewSet(viewsets.ModelViewSet):
     
     def get_view_description(self, html=False):
         return "Gestión de turnos de tickets"
+    
+    def get_queryset(self):
+        """Cargar el ticket anidado con sus relaciones en consultas fijas"""
+        return TicketTurn.objects.select_related(
+            'ticket__requester__company', 'ticket__assigned_to__company',
+            'ticket__category', 'ticket__subcategory'
+        ).prefetch_related(
+            'ticket__requester__userrole_set__role', 'ticket__assigned_to__userrole_set__role'
+        )
 
 
 @extend_schema(tags=["5. Kiosks & Tickets"], summary="Obtener Plantillas de Tickets", description="Obtiene las plantillas de tickets disponibles para el kiosko")
@@ -139,11 +170,15 @@ class KioskTemplatesAPIView(APIView):
                     'error': 'No hay empresas disponibles'
                 }, status=status.HTTP_404_NOT_FOUND)
         
-        # Obtener categorías activas con sus subcategorías y plantillas
+        # Obtener categorías activas con sus subcategorías activas y la plantilla
+        # de la categoría (con sus campos ordenados) en consultas fijas
         categories = TicketCategory.objects.filter(
             company=company,
             is_active=True
-        ).prefetch_related('subcategories', 'subcategories__template', 'subcategories__template__fields')
+        ).select_related('template').prefetch_related(
+            Prefetch('subcategories', queryset=TicketSubcategory.objects.filter(is_active=True)),
+            Prefetch('template__fields', queryset=TicketTemplateField.objects.order_by('order_no')),
+        )
         
         categories_data = []
         for category in categories:
@@ -155,28 +190,15 @@ class KioskTemplatesAPIView(APIView):
                 'subcategories': []
             }
             
-            for subcategory in category.subcategories.filter(is_active=True):
-                subcategory_data = {
-                    'id': subcategory.id,
-                    'name': subcategory.name,
-                    'icon': subcategory.icon,
-                    'color': subcategory.color,
-                    'template': None
-                }
-                
-                # Obtener plantilla si existe
-                if hasattr(subcategory, 'template') and subcategory.template:
-                    template = subcategory.template
-                    template_data = {
-                        'id': template.id,
-                        'name': template.name,
-                        'fields': []
-                    }
-                    
-                    # Obtener campos de la plantilla
-                    fields = template.fields.all().order_by('order_no')
-                    for field in fields:
-                        field_data = {
+            # Las subcategorías usan la plantilla de su categoría
+            template_data = None
+            template = category.template
+            if template:
+                template_data = {
+                    'id': template.id,
+                    'name': template.name,
+                    'fields': [
+                        {
                             'id': field.id,
                             'name': field.name,
                             'label': field.label,
@@ -184,11 +206,18 @@ class KioskTemplatesAPIView(APIView):
                             'required': field.required,
                             'options': field.options
                         }
-                        template_data['fields'].append(field_data)
-                    
-                    subcategory_data['template'] = template_data
-                
-                category_data['subcategories'].append(subcategory_data)
+                        for field in template.fields.all()
+                    ]
+                }
+            
+            for subcategory in category.subcategories.all():
+                category_data['subcategories'].append({
+                    'id': subcategory.id,
+                    'name': subcategory.name,
+                    'icon': subcategory.icon,
+                    'color': subcategory.color,
+                    'template': template_data
+                })
             
             categories_data.append(category_data)
         
@@ -202,6 +231,19 @@ class KioskTemplatesAPIView(APIView):
 
 
 @extend_schema(tags=["5. Kiosks & Tickets"], summary="Generar Orden de Ticket", description="Genera una orden de ticket desde el kiosko")
+def repeats_earlier_turn(turn, category, date):
+    """
+    El número del turno ya lo tiene un turno anterior (menor pk) de la categoría y día
+    Solo el turno posterior de cada par lo detecta: una colisión se cuenta una vez
+    """
+    return TicketTurn.objects.filter(
+        ticket__category=category,
+        ticket__created_at__date=date,
+        turn_number=turn.turn_number,
+        pk__lt=turn.pk
+    ).exists()
+
+
 class GenerateTicketOrderAPIView(APIView):
     """Vista para generar orden de ticket desde kiosko"""
     permission_classes = []  # Sin autenticación para kiosko
@@ -255,6 +297,7 @@ class GenerateTicketOrderAPIView(APIView):
             404: OpenApiResponse(description="Categoría o subcategoría no encontrada")
         }
     )
+    @TICKET_ISSUANCE_SECONDS.time()
     def post(self, request):
         """Generar orden de ticket desde kiosko"""
         from ..models import Company, User
@@ -330,19 +373,24 @@ class GenerateTicketOrderAPIView(APIView):
         
         # Generar turno
         # Obtener el último turno del día para esta categoría
-        today = timezone.now().date()
-        last_turn = TicketTurn.objects.filter(
-            ticket__category=category,
-            ticket__created_at__date=today
-        ).order_by('-turn_number').first()
-        
-        turn_number = 1 if not last_turn else last_turn.turn_number + 1
+        today = timezone.localdate()
+        with TURN_ALLOCATION_SECONDS.time():
+            last_turn = TicketTurn.objects.filter(
+                ticket__category=category,
+                ticket__created_at__date=today
+            ).order_by('-turn_number').first()
+            
+            turn_number = 1 if not last_turn else last_turn.turn_number + 1
+            
+            turn = TicketTurn.objects.create(
+                ticket=ticket,
+                turn_number=turn_number,
+                display_message=f"Turno {turn_number:03d} - {category.name}"
+            )
         
-        turn = TicketTurn.objects.create(
-            ticket=ticket,
-            turn_number=turn_number,
-            display_message=f"Turno {turn_number:03d} - {category.name}"
-        )
+        # Detectar números de turno repetidos por generaciones simultáneas
+        if repeats_earlier_turn(turn, category, today):
+            TURN_COLLISIONS.inc(company=company.pk)
         
         return Response({
             'message': 'Orden de ticket generada exitosamente',
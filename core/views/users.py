@@ -2,14 +2,16 @@
 Vistas para gestión de usuarios y roles
 """
 from rest_framework import viewsets, permissions
-from django.db import models
+from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from ..models import Role, UserRole
+from ..search import UserDirectorySearchFilter, search_users
 from ..serializers import (
     UserSerializer, UserCreateSerializer, RoleSerializer, UserRoleSerializer
 )
@@ -23,7 +25,7 @@ User = get_user_model()
         description="Obtiene la lista de usuarios del sistema con búsqueda y filtros avanzados",
         tags=["3. Users & Roles"],
         parameters=[
-            OpenApiParameter(name='search', type=str, description='Búsqueda general'),
+            OpenApiParameter(name='search', type=str, description='Búsqueda general por prefijo (username, nombres, email, número de empleado, SAP ID, departamento, ubicación)'),
             OpenApiParameter(name='full_name', type=str, description='Buscar por nombre completo'),
             OpenApiParameter(name='employee_number', type=str, description='Buscar por número de empleado'),
             OpenApiParameter(name='sap_id', type=str, description='Buscar por SAP ID'),
@@ -50,10 +52,11 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, UserDirectorySearchFilter, OrderingFilter]
     filterset_fields = ['company', 'is_active', 'can_access', 'department', 'location']
     search_fields = [
-        'username', 'email', 'first_name', 'last_name', 'company__name',
-        'employee_number', 'u_sap_id', 'title'
+        'username', 'email', 'first_name', 'last_name',
+        'employee_number', 'sap_id', 'department', 'location'
     ]
     ordering_fields = [
         'username', 'company__name', 'created_at', 'last_login',
@@ -80,25 +83,16 @@ class UserViewSet(viewsets.ModelViewSet):
         """Filtrado personalizado para búsquedas avanzadas"""
         queryset = super().filter_queryset(queryset)
         
-        # Búsqueda por nombre completo (first_name + last_name)
-        full_name = self.request.query_params.get('full_name', None)
-        if full_name:
-            queryset = queryset.filter(
-                models.Q(first_name__icontains=full_name) |
-                models.Q(last_name__icontains=full_name) |
-                models.Q(first_name__icontains=full_name.split()[0]) |
-                models.Q(last_name__icontains=full_name.split()[-1])
-            )
-        
-        # Búsqueda por número de empleado
-        employee_number = self.request.query_params.get('employee_number', None)
-        if employee_number:
-            queryset = queryset.filter(employee_number__icontains=employee_number)
-        
-        # Búsqueda por SAP ID
-        sap_id = self.request.query_params.get('sap_id', None)
-        if sap_id:
-            queryset = queryset.filter(u_sap_id__icontains=sap_id)
+        # Búsquedas por campo usando el índice del directorio
+        indexed_params = [
+            ('full_name', ['first_name', 'last_name']),
+            ('employee_number', ['employee_number']),
+            ('sap_id', ['sap_id']),
+        ]
+        for param, fields in indexed_params:
+            value = self.request.query_params.get(param, None)
+            if value:
+                queryset = search_users(queryset, value, fields=fields)
         
         # Búsqueda por título/cargo
         title = self.request.query_params.get('title', None)
@@ -16,10 +16,13 @@ from channels.security.websocket import AllowedHostsOriginValidator
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
 
+django_asgi_app = get_asgi_application()
+
 # Importar después de configurar Django
+from core.db_config import configure_asgi_connections
 from core.routing import websocket_urlpatterns
 
-django_asgi_app = get_asgi_application()
+configure_asgi_connections()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
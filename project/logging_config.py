@@ -87,9 +87,11 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': False,
         },
+        # Las consultas solo se registran en DEBUG; su conteo y tiempo por
+        # vista los mide core.instrumentation
         'django.db.backends': {
             'handlers': ['console', 'db_file'],
-            'level': 'INFO',
+            'level': 'WARNING',
             'propagate': False,
         },
         'core': {
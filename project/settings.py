@@ -40,12 +40,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.UserRolesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.SystemSetupMiddleware',
@@ -87,10 +90,27 @@ DATABASES = {
         'OPTIONS': {
             'driver': 'ODBC Driver 17 for SQL Server',
             'unicode_results': True,
+            # Tiempo máximo de inicio de sesión: un servidor que no responde no bloquea hilos indefinidamente
+            'connection_timeout': 5,
         },
+        # Conexión persistente por hilo (WSGI), verificada antes de reutilizarla
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplica de solo lectura para reportes, dashboards y exportaciones (core.db_router).
+# Se activa agregando a DATABASES un alias 'replica' con los datos de conexión de la
+# réplica y 'TEST': {'MIRROR': 'default'}; sin él, todo se lee de 'default'.
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica'
+READ_REPLICA_STICKY_SECONDS = 10  # lecturas en la principal tras una escritura del cliente
+
+# Conexiones bajo ASGI y desde código asíncrono (core.db_config)
+DB_ASGI_CONN_MAX_AGE = 0  # cada petición ASGI usa un hilo nuevo: cerrar al terminar
+DB_ASYNC_MAX_CONNECTIONS = 20  # hilos (y conexiones) del pool de base de datos de los consumers por proceso
+DB_ASYNC_ACQUIRE_TIMEOUT = 10  # segundos máximos en cola antes de cancelar la operación
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -110,6 +130,9 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Procesos para hashear contraseñas en altas masivas (None = número de CPUs)
+PASSWORD_HASH_WORKERS = None
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -130,6 +153,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Exportaciones con datos personales: fuera de MEDIA_ROOT, se descargan solo por vistas autenticadas
+EXPORTS_ROOT = os.path.join(BASE_DIR, 'private', 'exports')
+
 # Configuración de sesiones
 SESSION_COOKIE_AGE = 86400  # 24 horas en segundos
 SESSION_COOKIE_SECURE = False  # True en producción con HTTPS
@@ -150,18 +176,67 @@ REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
 REDIS_DB = 0
 REDIS_PASSWORD = None
+REDIS_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}'
+
+# Pools de conexiones a Redis por proceso (core.redis_config, caché y canales)
+# Por worker: un pool síncrono (el de la caché, compartido por core.redis_config)
+# y, bajo ASGI, uno por bucle de eventos; channels_redis abre sus propias conexiones
+REDIS_POOL_MAX_CONNECTIONS = 50  # conexiones máximas por pool
+REDIS_POOL_TIMEOUT = 5  # segundos de espera por una conexión libre del pool
+REDIS_SOCKET_TIMEOUT = 5
+REDIS_SOCKET_CONNECT_TIMEOUT = 2
+REDIS_HEALTH_CHECK_INTERVAL = 30  # PING antes de reutilizar una conexión inactiva
+REDIS_BREAKER_SECONDS = 1  # sin conexión a Redis, los consumers no lo reintentan durante este tiempo
+REDIS_BREAKER_MAX_SECONDS = 30  # la espera se duplica con cada fallo seguido hasta este máximo
 
 # Configuración de Cache con Redis
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}',
+        'BACKEND': 'core.instrumentation.InstrumentedRedisCache',
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'PASSWORD': REDIS_PASSWORD,
+            'SOCKET_TIMEOUT': REDIS_SOCKET_TIMEOUT,
+            'SOCKET_CONNECT_TIMEOUT': REDIS_SOCKET_CONNECT_TIMEOUT,
+            'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool',
+            'CONNECTION_POOL_KWARGS': {
+                'max_connections': REDIS_POOL_MAX_CONNECTIONS,
+                'timeout': REDIS_POOL_TIMEOUT,
+                'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+            },
         }
     }
 }
 
+# Instrumentación por petición (core.instrumentation): fracción de peticiones
+# medidas, con histogramas por vista en /metrics y /api/metrics/requests/
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+INSTRUMENTATION_SERVER_TIMING = DEBUG  # la cabecera expone tiempos internos: solo en desarrollo
+
+# Métricas de Prometheus (core.metrics) en /metrics, agregadas entre workers en Redis
+METRICS_REDIS_AGGREGATION = True
+METRICS_FLUSH_INTERVAL = 10  # segundos entre envíos de cada proceso
+METRICS_PROCESS_TTL = 3 * METRICS_FLUSH_INTERVAL  # un proceso sin envíos (caído) deja de sumar sus gauges
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Verificaciones de salud (core.health)
+HEALTH_CHECK_INTERVAL = 5  # segundos que se reutiliza el resultado de readiness
+HEALTH_CHECK_TIMEOUT = 2  # segundos máximos por verificación (SELECT 1 / PING)
+HEALTH_READINESS_CHECKS = ['database', 'redis']
+
+# Kioskos conectados por WebSocket (core.consumers)
+KIOSK_PRESENCE_TTL = 90  # segundos sin heartbeat tras los que el kiosko deja de figurar en Redis
+KIOSK_HEARTBEAT_PERSIST_INTERVAL = 60  # segundos mínimos entre escrituras de Kiosk.last_heartbeat
+KIOSK_LOOKUP_CACHE_SECONDS = 300  # caché en Redis de la empresa de cada kiosko
+
+# Importaciones de usuarios en segundo plano (CPdashadmin.views.users.import_jobs)
+IMPORT_JOB_STALE_SECONDS = 900  # un job 'running' sin avance en este tiempo se considera interrumpido
+
+# Exportaciones en segundo plano (core.exports)
+EXPORT_JOB_STALE_SECONDS = 900  # un job 'running' sin avance en este tiempo se considera interrumpido
+
 # Configuración de Session con Redis
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -171,7 +246,13 @@ CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [f'{REDIS_HOST}:{REDIS_PORT}'],
+            # Sin socket_timeout: la recepción bloquea en BZPOPMIN hasta 5 segundos
+            'hosts': [{
+                'address': REDIS_URL,
+                'password': REDIS_PASSWORD,
+                'socket_connect_timeout': REDIS_SOCKET_CONNECT_TIMEOUT,
+                'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+            }],
             'capacity': 1500,
             'expiry': 10,
         },
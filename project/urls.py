@@ -20,12 +20,17 @@ from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from core.views import HealthDiagnosticsAPIView, health_live, health_ready, prometheus_metrics
 from . import views
 
 urlpatterns = [
     path('', views.home_view, name='home'),
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
+    path('metrics', prometheus_metrics, name='metrics'),
+    path('health/live', health_live, name='health-live'),
+    path('health/ready', health_ready, name='health-ready'),
+    path('health/deep', HealthDiagnosticsAPIView.as_view(), name='health-deep'),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('setup/', include('CPsetup.urls')),
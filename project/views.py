@@ -8,7 +8,7 @@ def home_view(request):
     if request.user.is_authenticated:
         # Si está autenticado, redirigir según su rol
         from CPlogin.views import redirect_user_by_role
-        return redirect_user_by_role(request.user)
+        return redirect_user_by_role(request.user, request.roles)
     else:
         # Si no está autenticado, redirigir al login
         return redirect('CPlogin:login')
@@ -0,0 +1,179 @@
+"""
+Tests para las exportaciones en streaming del dashboard de administración
+"""
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.exports import iter_rows, run_export_job
+from core.models import (
+    SystemSetup, Company, Role, User, UserRole, AuthLoginAudit,
+    TicketCategory, Ticket, TicketTurn, ExportJob
+)
+
+
+class ExportTestMixin:
+    """Datos comunes para los tests de exportación"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        cls.other_company = Company.objects.create(name='Otra Empresa')
+        admin_role = Role.objects.create(company=cls.company, key='admin', name='Administrador')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@cerroverde.com', password='Admin123!',
+            first_name='Ana', last_name='Peña', company=cls.company, can_access=True
+        )
+        UserRole.objects.create(user=cls.admin, role=admin_role)
+        for i in range(5):
+            User.objects.create_user(username=f'usuario{i}', password='x', company=cls.company)
+        User.objects.create_user(username='externo', password='x', company=cls.other_company)
+        
+        category = TicketCategory.objects.create(company=cls.company, name='Soporte')
+        for i in range(3):
+            ticket = Ticket.objects.create(
+                company=cls.company, requester=cls.admin, category=category, priority='high'
+            )
+            TicketTurn.objects.create(ticket=ticket, turn_number=i + 1)
+        AuthLoginAudit.objects.create(user=cls.admin, success=True, ip='10.0.0.1')
+    
+    def read_csv(self, content):
+        return list(csv.reader(io.StringIO(content.decode('utf-8'))))
+
+
+class StreamingExportTest(ExportTestMixin, TestCase):
+    """Tests para la descarga en streaming"""
+    
+    def setUp(self):
+        self.client.force_login(self.admin)
+    
+    def test_user_export_streams_csv(self):
+        """Test: La exportación de usuarios es streaming y mantiene el formato"""
+        response = self.client.get(reverse('CPdashadmin:user_export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = self.read_csv(b''.join(response.streaming_content))
+        self.assertEqual(rows[0][0], 'Username')
+        self.assertEqual(len(rows), 7)  # cabecera + 6 usuarios de la empresa
+        self.assertEqual(rows[1][:4], ['admin', 'admin@cerroverde.com', 'Ana', 'Peña'])
+        self.assertEqual(rows[1][9], 'Administrador')
+    
+    def test_gzip_export(self):
+        """Test: ?compress=1 entrega el CSV comprimido con gzip"""
+        response = self.client.get(reverse('CPdashadmin:data_export', args=['tickets']), {'compress': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('tickets.csv.gz', response['Content-Disposition'])
+        rows = self.read_csv(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][2], 'Alta')
+    
+    def test_all_datasets(self):
+        """Test: Todos los datasets se exportan solo con datos de la empresa"""
+        expected = {'users': 7, 'tickets': 4, 'turns': 4, 'login_audit': 2}
+        for dataset, count in expected.items():
+            response = self.client.get(reverse('CPdashadmin:data_export', args=[dataset]))
+            self.assertEqual(response.status_code, 200, dataset)
+            self.assertEqual(len(self.read_csv(b''.join(response.streaming_content))), count, dataset)
+    
+    def test_unknown_dataset(self):
+        """Test: Un dataset desconocido retorna 404"""
+        response = self.client.get(reverse('CPdashadmin:data_export', args=['passwords']))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_queries_do_not_grow_with_rows(self):
+        """Test: Una consulta de usuarios más una de roles por bloque"""
+        with self.assertNumQueries(2):
+            rows = list(iter_rows('users', self.company, chunk_size=100))
+        self.assertEqual(len(rows), 7)
+        with self.assertNumQueries(3):
+            list(iter_rows('users', self.company, chunk_size=3))
+
+
+class BackgroundExportTest(ExportTestMixin, TestCase):
+    """Tests para las exportaciones en segundo plano"""
+    
+    def setUp(self):
+        exports_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, exports_root, ignore_errors=True)
+        settings_override = override_settings(EXPORTS_ROOT=exports_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.admin)
+    
+    def start_job(self, dataset, **params):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(reverse('CPdashadmin:data_export', args=[dataset]), {'background': '1', **params})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        return response.json()
+    
+    def test_job_writes_private_file(self):
+        """Test: El job escribe el archivo fuera de media y se descarga solo por la vista autenticada"""
+        started = self.start_job('turns', compress='1')
+        self.assertEqual(started['status'], 'pending')
+        self.assertTrue(run_export_job(started['id']))
+        
+        job = ExportJob.objects.get(pk=started['id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertTrue(job.file.name.startswith(f'exports/{self.company.pk}/'))
+        self.assertTrue(job.file.path.startswith(settings.EXPORTS_ROOT))
+        self.assertFalse(job.file.path.startswith(settings.MEDIA_ROOT))
+        with self.assertRaises(ValueError):
+            job.file.url
+        
+        status = self.client.get(started['status_url']).json()
+        self.assertEqual(status['status'], 'completed')
+        response = self.client.get(status['download_url'])
+        self.assertIn('turnos.csv.gz', response['Content-Disposition'])
+        rows = self.read_csv(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(rows), 4)
+    
+    def test_job_claimed_once(self):
+        """Test: Un job terminado no se vuelve a ejecutar"""
+        started = self.start_job('users')
+        self.assertTrue(run_export_job(started['id']))
+        self.assertFalse(run_export_job(started['id']))
+    
+    def test_stale_job_resumed(self):
+        """Test: Un job 'running' sin avance (worker reiniciado) se reanuda con --resume"""
+        started = self.start_job('tickets')
+        ExportJob.objects.filter(pk=started['id']).update(status='running')
+        
+        call_command('run_export_jobs', '--resume', stdout=io.StringIO())
+        self.assertEqual(ExportJob.objects.get(pk=started['id']).status, 'running')
+        
+        ExportJob.objects.filter(pk=started['id']).update(updated_at=timezone.now() - timedelta(hours=1))
+        call_command('run_export_jobs', '--resume', stdout=io.StringIO())
+        self.assertEqual(ExportJob.objects.get(pk=started['id']).status, 'completed')
+    
+    def test_job_scoped_to_company(self):
+        """Test: No se puede consultar ni descargar el job de otra empresa"""
+        job = ExportJob.objects.create(company=self.other_company, dataset='users')
+        run_export_job(job.pk)
+        for name in ('export_job_status', 'export_job_download'):
+            response = self.client.get(reverse(f'CPdashadmin:{name}', args=[job.pk]))
+            self.assertEqual(response.status_code, 404)
+    
+    def test_requires_admin_role(self):
+        """Test: Un usuario sin rol de administrador no puede exportar ni descargar"""
+        job = ExportJob.objects.create(company=self.company, dataset='login_audit')
+        run_export_job(job.pk)
+        user = User.objects.create_user(username='operador', password='x', company=self.company, can_access=True)
+        self.client.force_login(user)
+        urls = [
+            reverse('CPdashadmin:data_export', args=['login_audit']),
+            reverse('CPdashadmin:user_export'),
+            reverse('CPdashadmin:export_job_status', args=[job.pk]),
+            reverse('CPdashadmin:export_job_download', args=[job.pk]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403, url)
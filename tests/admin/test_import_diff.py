@@ -0,0 +1,186 @@
+"""
+Tests para la simulación (dry-run) de importaciones de usuarios
+"""
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from CPdashadmin.views.users.data_processor import import_users
+from CPdashadmin.views.users.import_diff import compute_import_diff, read_diff_page
+from CPdashadmin.views.users.import_jobs import create_import_job, run_import_job
+from CPdashadmin.views.users.upload_store import iter_upload_chunks
+from CPdashadmin.views.users.upload_store import SESSION_UPLOAD_KEY
+from core.models import SystemSetup, Company, Role, User, UserRole
+from .test_user_import import COLUMN_MAPPING, make_import_config, store_csv
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+HEADER = 'usuario,correo,nombre,apellido,area,rol\n'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImportDiffTest(TestCase):
+    """Tests para las simulaciones (jobs dry_run) y sus endpoints"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        other_company = Company.objects.create(name='Otra Empresa')
+        cls.user_role = Role.objects.create(company=cls.company, key='user', name='Usuario')
+        Role.objects.create(company=cls.company, key='technician', name='Técnico')
+        cls.admin = User.objects.create_user(username='admin', password='x', company=cls.company, can_access=True)
+        
+        existing = User.objects.create_user(
+            username='jperez', email='jperez@cerroverde.com', password='x', company=cls.company,
+            first_name='Juan', last_name='Pérez', department='Mina', must_change_password=True, can_access=True,
+        )
+        UserRole.objects.create(user=existing, role=cls.user_role)
+        User.objects.create_user(
+            username='mlopez', email='mlopez@cerroverde.com', password='x', company=cls.company,
+            first_name='María', last_name='López', department='Planta', must_change_password=True, can_access=True,
+        )
+        User.objects.create_user(username='externo', email='externo@otra.com', password='x', company=other_company)
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    
+    def run_diff(self, upload_id, import_config, chunk_size=1000):
+        """Ejecutar una simulación como lo hace el runner y retornar el job terminado"""
+        request = RequestFactory().post('/')
+        request.user = self.admin
+        job = create_import_job(request, upload_id, 0, COLUMN_MAPPING, import_config, dry_run=True)
+        run_import_job(job.pk, chunk_size=chunk_size)
+        job.refresh_from_db()
+        return job
+    
+    def make_upload(self):
+        return store_csv(HEADER + (
+            'nuevo,nuevo@cerroverde.com,Ana,Rojas,Mina,Usuario\n'
+            'jperez,jperez@cerroverde.com,Juan,Pérez,Planta,Técnico\n'
+            'mlopez,mlopez@cerroverde.com,María,López,Planta,\n'
+            'externo,externo@otra.com,Ext,Erno,Mina,Usuario\n'
+            ',sin-usuario@cerroverde.com,Sin,Usuario,Mina,Usuario\n'
+            'nuevo,nuevo2@cerroverde.com,Ana,Rojas,Mina,Inexistente\n'
+        ))
+    
+    def test_full_diff(self):
+        """Test: Altas, cambios por campo y de rol, conflictos e inválidas, sin escribir"""
+        upload_id = self.make_upload()
+        users_before = User.objects.count()
+        
+        job = self.run_diff(upload_id, make_import_config(update_existing=True), chunk_size=4)
+        summary = job.diff_summary
+        
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.total_rows), (6, 6))
+        self.assertEqual(User.objects.count(), users_before)
+        self.assertEqual(summary['total_rows'], 6)
+        self.assertEqual(summary['counts'], {'create': 1, 'update': 1, 'unchanged': 1, 'conflict': 2, 'invalid': 1})
+        self.assertEqual(summary['role_changes'], 2)
+        self.assertEqual(summary['field_changes'], {'department': 1})
+        
+        entries = read_diff_page(job, page_size=10)['entries']
+        self.assertEqual([entry['row'] for entry in entries], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(entries[0]['role_change'], [[], 'Usuario'])
+        self.assertEqual(entries[1]['changes'], {'department': ['Mina', 'Planta']})
+        self.assertEqual(entries[1]['role_change'], [['Usuario'], 'Técnico'])
+        self.assertEqual(entries[2]['type'], 'unchanged')
+        self.assertEqual(entries[3]['messages'], ['Usuario externo pertenece a otra empresa'])
+        self.assertEqual(entries[4]['messages'], ['Username y email son obligatorios'])
+        self.assertEqual(entries[5]['messages'], ['Usuario nuevo repetido en el archivo (fila 1)'])
+    
+    def test_existing_without_update_is_conflict(self):
+        """Test: Sin actualizar existentes, los usuarios existentes son conflictos"""
+        summary = self.run_diff(self.make_upload(), make_import_config()).diff_summary
+        self.assertEqual(summary['counts'], {'create': 1, 'update': 0, 'unchanged': 0, 'conflict': 4, 'invalid': 1})
+    
+    def test_import_matches_diff(self):
+        """Test: La importación aplica exactamente lo que anticipa la simulación"""
+        upload_id = self.make_upload()
+        import_config = make_import_config(update_existing=True)
+        job = self.run_diff(upload_id, import_config)
+        counts = job.diff_summary['counts']
+        
+        success_count = error_count = 0
+        conflicts = []
+        seen_rows = {}
+        for chunk in iter_upload_chunks(upload_id, ',', chunk_size=2):
+            success, errors_found, _, chunk_conflicts = import_users(
+                chunk, COLUMN_MAPPING, import_config, self.company, seen_rows
+            )
+            success_count += success
+            error_count += errors_found
+            conflicts += chunk_conflicts
+        
+        self.assertEqual(success_count, counts['create'] + counts['update'] + counts['unchanged'])
+        self.assertEqual(error_count, counts['conflict'] + counts['invalid'])
+        self.assertEqual(conflicts, [
+            f"Fila {entry['row']}: {entry['messages'][-1]}"
+            for entry in read_diff_page(job, 'conflict', page_size=10)['entries']
+        ])
+        
+        external = User.objects.get(username='externo')
+        self.assertEqual(external.email, 'externo@otra.com')
+        self.assertFalse(external.userrole_set.exists())
+        self.assertEqual(User.objects.get(username='nuevo').email, 'nuevo@cerroverde.com')
+        jperez = User.objects.get(username='jperez')
+        self.assertEqual(jperez.department, 'Planta')
+        self.assertEqual(list(jperez.userrole_set.values_list('role__name', flat=True)), ['Técnico'])
+        
+        # Tras importar, la misma simulación ya no anticipa altas ni cambios
+        summary = self.run_diff(upload_id, import_config).diff_summary
+        self.assertEqual(summary['counts']['create'], 0)
+        self.assertEqual(summary['counts']['update'], 0)
+    
+    def test_queries_batched_per_chunk(self):
+        """Test: Las consultas no dependen del número de filas"""
+        upload_id = store_csv(HEADER + ''.join(
+            f'user{i},user{i}@cerroverde.com,N,A,Mina,Usuario\n' for i in range(300)
+        ) + 'jperez,jperez@cerroverde.com,Juan,Pérez,Mina,Usuario\n')
+        request = RequestFactory().post('/')
+        request.user = self.admin
+        job = create_import_job(request, upload_id, 0, COLUMN_MAPPING, make_import_config(), dry_run=True)
+        with CaptureQueriesContext(connection) as queries:
+            summary = compute_import_diff(job, iter_upload_chunks(upload_id, ','))
+        self.assertEqual(summary['counts']['create'], 300)
+        self.assertEqual(summary['counts']['conflict'], 1)
+        # Roles de la empresa, usuarios existentes, sus roles, usernames de otras empresas y avance del job
+        self.assertEqual(len(queries), 5)
+    
+    def test_endpoints_with_paging(self):
+        """Test: La simulación corre como job y su estado pagina el detalle por tipo"""
+        self.client.force_login(self.admin)
+        session = self.client.session
+        session[SESSION_UPLOAD_KEY] = self.make_upload()
+        session['column_mapping'] = COLUMN_MAPPING
+        session['import_config'] = make_import_config(update_existing=True, delimiter=',')
+        session.save()
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('CPdashadmin:import_dry_run'))
+        self.assertEqual(response.status_code, 202)
+        started = response.json()
+        self.assertTrue(started['dry_run'])
+        self.assertEqual((started['status'], started['total_rows']), ('pending', 6))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(User.objects.filter(username='nuevo').count(), 0)
+        
+        # El hilo del job se reemplaza por una ejecución directa
+        run_import_job(started['id'])
+        status_url = started['status_url']
+        result = self.client.get(status_url, {'type': 'conflict', 'page_size': 1, 'page': 2}).json()
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(result['summary']['counts']['conflict'], 2)
+        page = result['details']
+        self.assertEqual((page['total'], page['num_pages'], page['page']), (2, 2, 2))
+        self.assertEqual([entry['username'] for entry in page['entries']], ['nuevo'])
+        self.assertEqual(User.objects.filter(username='nuevo').count(), 0)
+        
+        response = self.client.get(status_url, {'type': 'otro'})
+        self.assertEqual(response.status_code, 400)
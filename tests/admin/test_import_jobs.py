@@ -0,0 +1,185 @@
+"""
+Tests para las importaciones de usuarios en segundo plano
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from CPdashadmin.views.users import import_jobs
+from CPdashadmin.views.users.import_jobs import create_import_job, run_import_job
+from CPdashadmin.views.users.upload_store import SESSION_UPLOAD_KEY
+from core.models import SystemSetup, Company, Role, User, ImportJob
+from .test_user_import import COLUMN_MAPPING, make_import_config, store_csv
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_csv(count, start=0):
+    lines = ['usuario,correo,nombre,apellido,area,rol']
+    for i in range(start, start + count):
+        lines.append(f'user{i},user{i}@cerroverde.com,Nombre,Apellido,Mina,Usuario')
+    return '\n'.join(lines) + '\n'
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ImportJobTest(TestCase):
+    """Tests para run_import_job y sus endpoints"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        Role.objects.create(company=cls.company, key='user', name='Usuario')
+        cls.admin = User.objects.create_user(username='admin', password='x', company=cls.company, can_access=True)
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    
+    def setUp(self):
+        request = RequestFactory().post('/')
+        request.user = self.admin
+        self.request = request
+        self.client.force_login(self.admin)
+    
+    def create_job(self, csv_data, total_rows, **config):
+        return create_import_job(self.request, store_csv(csv_data), total_rows, COLUMN_MAPPING, make_import_config(**config))
+    
+    def test_run_job_in_chunks(self):
+        """Test: El job procesa el CSV por bloques y guarda el reporte"""
+        job = self.create_job(make_csv(25) + 'user0,user0@cerroverde.com,A,B,C,Usuario\n', 26)
+        run_import_job(job.pk, chunk_size=10)
+        
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.success_count, job.error_count), (26, 25, 1))
+        self.assertEqual(job.conflicts, ['Fila 26: Usuario user0 repetido en el archivo (fila 1)'])
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 25)
+        self.assertTrue(job.report_file)
+        
+        response = self.client.get(reverse('CPdashadmin:import_job_report', args=[job.pk]))
+        self.assertIn('Conflicto,Fila 26: Usuario user0 repetido en el archivo (fila 1)', response.content.decode('utf-8'))
+    
+    def test_roles_version_bumped_after_commit(self):
+        """Test: Los roles cacheados se invalidan al confirmar el bloque, no dentro de su transacción"""
+        job = self.create_job(make_csv(3), 3)
+        with mock.patch('CPdashadmin.views.users.data_processor.bump_roles_version') as bump:
+            with self.captureOnCommitCallbacks() as callbacks:
+                run_import_job(job.pk)
+            bump.assert_not_called()
+            for callback in callbacks:
+                callback()
+        bumped = sorted(call.args[0] for call in bump.call_args_list)
+        self.assertEqual(bumped, sorted(User.objects.filter(username__startswith='user').values_list('pk', flat=True)))
+    
+    def test_resume_after_failure(self):
+        """Test: Un job fallido se reanuda desde la última fila confirmada"""
+        job = self.create_job(make_csv(30), 30)
+        original = import_jobs.import_users
+        calls = []
+        
+        def failing_import(df, *args):
+            calls.append(len(df))
+            if len(calls) == 2:
+                raise RuntimeError('Conexión perdida')
+            return original(df, *args)
+        
+        with mock.patch.object(import_jobs, 'import_users', side_effect=failing_import):
+            run_import_job(job.pk, chunk_size=10)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.processed_rows, 10)
+        self.assertEqual(job.error_message, 'Conexión perdida')
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 10)
+        
+        call_command('run_import_jobs', '--resume', '--chunk-size', '10', stdout=mock.Mock())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.success_count, job.error_count), (30, 30, 0))
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 30)
+    
+    def test_job_claimed_once(self):
+        """Test: Un job ya tomado por otro runner no se vuelve a procesar"""
+        job = self.create_job(make_csv(5), 5)
+        self.assertTrue(import_jobs.claim_import_job(job.pk))
+        self.assertFalse(run_import_job(job.pk))
+        self.assertFalse(User.objects.filter(username__startswith='user').exists())
+        
+        # --resume solo toma los jobs 'running' sin avance reciente
+        call_command('run_import_jobs', '--resume', stdout=mock.Mock())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows), ('running', 0))
+        
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        call_command('run_import_jobs', '--resume', stdout=mock.Mock())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.success_count), ('completed', 5))
+        self.assertFalse(run_import_job(job.pk, statuses=('pending', 'failed')))
+    
+    def test_report_from_parts_with_capped_sample(self):
+        """Test: El job guarda una muestra de conflictos y el reporte completo se arma por bloques"""
+        job = self.create_job(make_csv(5) + make_csv(5).split('\n', 1)[1], 10)
+        with mock.patch.object(import_jobs, 'IMPORT_JOB_SAMPLE_SIZE', 2):
+            run_import_job(job.pk, chunk_size=3)
+        
+        job.refresh_from_db()
+        self.assertEqual((job.success_count, job.error_count, job.conflict_count), (5, 5, 5))
+        self.assertEqual(len(job.conflicts), 2)
+        with job.report_file.open('rb') as report:
+            lines = report.read().decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'Tipo,Detalle')
+        self.assertEqual([line.split(',', 1)[1].split(':')[0] for line in lines[1:]], [f'Fila {n}' for n in range(6, 11)])
+        self.assertEqual(import_jobs.list_report_parts(job), [])
+    
+    def test_status_endpoint(self):
+        """Test: El endpoint de estado retorna el progreso del job"""
+        job = self.create_job(make_csv(4), 4)
+        response = self.client.get(reverse('CPdashadmin:import_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(response.json()['progress'], 0)
+        
+        run_import_job(job.pk)
+        data = self.client.get(reverse('CPdashadmin:import_job_status', args=[job.pk])).json()
+        self.assertEqual((data['status'], data['progress'], data['success_count']), ('completed', 100, 4))
+        self.assertTrue(data['is_finished'])
+    
+    def test_job_scoped_to_company(self):
+        """Test: No se puede consultar el job de otra empresa"""
+        other_company = Company.objects.create(name='Otra Empresa')
+        job = self.create_job(make_csv(1), 1)
+        ImportJob.objects.filter(pk=job.pk).update(company=other_company)
+        response = self.client.get(reverse('CPdashadmin:import_job_status', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_confirmation_starts_job(self):
+        """Test: Confirmar la importación crea el job y lo lanza al confirmar la transacción"""
+        session = self.client.session
+        session[SESSION_UPLOAD_KEY] = store_csv(make_csv(3))
+        session['column_mapping'] = COLUMN_MAPPING
+        session['import_config'] = dict(make_import_config(), delimiter=',', encoding='utf-8')
+        session.save()
+        
+        with mock.patch.object(import_jobs.threading, 'Thread') as thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('CPdashadmin:user_import'), {'confirm_import': '1'})
+        
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, reverse('CPdashadmin:import_job_detail', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(job.total_rows, 3)
+        self.assertEqual(thread.call_args.kwargs['args'], (job.pk,))
+        thread.return_value.start.assert_called_once()
+        self.assertNotIn(SESSION_UPLOAD_KEY, self.client.session)
+        self.assertTrue(default_storage.exists(job.source_file.name))
+        
+        response = self.client.get(reverse('CPdashadmin:import_job_detail', args=[job.pk]))
+        self.assertContains(response, 'Importación de Usuarios')
@@ -0,0 +1,128 @@
+"""
+Tests para la evaluación vectorizada de reglas de interpretación
+"""
+import copy
+import random
+
+import pandas as pd
+
+from django.test import SimpleTestCase
+from CPdashadmin.views.users.data_processor import (
+    apply_interpretation_rules, extract_user_data_from_row, extract_user_frame,
+)
+from CPdashadmin.views.users.import_config import get_suggested_rules
+from CPdashadmin.views.users.rule_compiler import compile_rules, apply_compiled_rules
+
+COLUMN_MAPPING = {
+    'username': 'usuario', 'email': 'correo', 'department': 'area',
+    'title': 'cargo', 'location': 'sede', 'is_active': 'activo',
+}
+
+CUSTOM_RULES = [
+    {'name': 'Técnicos de TI', 'field': 'role', 'operator': 'equals', 'value': 'admin',
+     'action_field': 'can_access', 'action_value': 'True', 'priority': 5},
+    {'name': 'Planta', 'field': 'department', 'operator': 'starts_with', 'value': 'plan',
+     'action_field': 'role', 'action_value': 'Usuario', 'priority': 2},
+    {'name': 'Sin sede', 'field': 'location', 'operator': 'not_equals', 'value': 'Arequipa',
+     'action_field': 'must_change_password', 'action_value': 'True', 'priority': 1},
+    {'name': 'Gerencia', 'field': 'title', 'operator': 'ends_with', 'value': 'GERENTE ',
+     'action_field': 'role', 'action_value': 'Gerente', 'priority': 2},
+    {'name': 'No practicante', 'field': 'title', 'operator': 'not_contains', 'value': 'practicante',
+     'action_field': 'is_active', 'action_value': True, 'priority': 3},
+    {'name': 'Activos', 'field': 'is_active', 'operator': 'equals', 'value': 'true',
+     'action_field': 'location', 'action_value': 'Arequipa', 'priority': 4},
+    {'name': 'No mapeado', 'field': 'sap_id', 'operator': 'contains', 'value': '1',
+     'action_field': 'role', 'action_value': 'admin', 'priority': 1},
+    {'name': 'Operador desconocido', 'field': 'department', 'operator': 'regex', 'value': '.*',
+     'action_field': 'role', 'action_value': 'admin', 'priority': 1},
+]
+
+
+def make_records(count, seed=7):
+    rng = random.Random(seed)
+    departments = ['TI', 'Planta Concentradora', 'planta', ' Mina ', 'Finanzas TI', '']
+    titles = ['Practicante de TI', 'Gerente', 'Sub gerente  ', 'Operador', 'PRACTICANTE']
+    locations = ['Arequipa', 'arequipa ', 'Lima', 'Cerro Verde']
+    records = []
+    for i in range(count):
+        record = {'username': f'user{i}', 'email': f'user{i}@cerroverde.com'}
+        if rng.random() < 0.9:
+            record['department'] = rng.choice(departments)
+        if rng.random() < 0.8:
+            record['title'] = rng.choice(titles)
+        if rng.random() < 0.7:
+            record['location'] = rng.choice(locations)
+        if rng.random() < 0.5:
+            record['is_active'] = rng.choice([True, False])
+        records.append(record)
+    return records
+
+
+class RuleCompilerEquivalenceTest(SimpleTestCase):
+    """La evaluación vectorizada reproduce apply_interpretation_rules"""
+    
+    def assertSameAsRowByRow(self, records, import_config):
+        expected_records = copy.deepcopy(records)
+        expected = [
+            apply_interpretation_rules(record, import_config, COLUMN_MAPPING)
+            for record in expected_records
+        ]
+        
+        applied, conflicts = apply_compiled_rules(records, compile_rules(import_config, COLUMN_MAPPING))
+        self.assertEqual(records, expected_records)
+        self.assertEqual(list(zip(applied, conflicts)), expected)
+    
+    def test_custom_rules(self):
+        """Test: Reglas personalizadas encadenadas por prioridad"""
+        self.assertSameAsRowByRow(make_records(500), {
+            'selected_rules': [], 'custom_rules': CUSTOM_RULES,
+        })
+    
+    def test_suggested_and_custom_rules(self):
+        """Test: Reglas sugeridas seleccionadas seguidas de personalizadas"""
+        suggested = get_suggested_rules()
+        self.assertSameAsRowByRow(make_records(500, seed=11), {
+            'selected_rules': [suggested[1]['name'], suggested[0]['name'], 'Inexistente', suggested[2]['name']],
+            'suggested_rules': suggested,
+            'custom_rules': CUSTOM_RULES,
+        })
+    
+    def test_selected_rules_without_definitions(self):
+        """Test: Sin definiciones de reglas sugeridas solo aplican las personalizadas"""
+        self.assertSameAsRowByRow(make_records(100), {
+            'selected_rules': ['Rol por Departamento'], 'custom_rules': CUSTOM_RULES[:2],
+        })
+    
+    def test_no_rules(self):
+        """Test: Sin reglas no se modifica nada"""
+        records = make_records(10)
+        applied, conflicts = apply_compiled_rules(records, [])
+        self.assertEqual(applied, [[]] * 10)
+        self.assertEqual(conflicts, [[]] * 10)
+        self.assertEqual(apply_compiled_rules([], compile_rules({'selected_rules': []}, COLUMN_MAPPING)), ([], []))
+
+    def test_rule_without_text_value(self):
+        """Test: Una regla con valor vacío o no textual no interrumpe la evaluación"""
+        rules = compile_rules({'selected_rules': [], 'custom_rules': [
+            {'name': 'Sin valor', 'field': 'department', 'operator': 'equals', 'value': None,
+             'action_field': 'role', 'action_value': 'Usuario'},
+            {'name': 'Numérica', 'field': 'department', 'operator': 'contains', 'value': 7,
+             'action_field': 'title', 'action_value': 'Operador'},
+        ]}, COLUMN_MAPPING)
+        records = [{'department': ''}, {'department': 'Mina 7'}]
+        applied, _ = apply_compiled_rules(records, rules)
+        self.assertEqual(applied, [['Sin valor'], ['Numérica']])
+    
+    def test_frame_extraction_matches_rows(self):
+        """Test: La extracción por columnas da los mismos registros que fila a fila"""
+        df = pd.DataFrame({
+            'usuario': ['jperez', ' mlopez ', None, 'aruiz'],
+            'correo': ['jperez@cerroverde.com', None, 'x@cerroverde.com', 'aruiz@cerroverde.com'],
+            'area': [' Planta ', 'TI', '', None],
+            'activo': ['SI', 'falso', 'quizás', None],
+        }, index=[10, 11, 12, 13])
+        mapping = {'username': 'usuario', 'email': 'correo', 'department': 'area',
+                   'is_active': 'activo', 'title': 'cargo'}
+        import_config = {'default_is_active': 'por defecto'}
+        expected = [extract_user_data_from_row(row, mapping, import_config) for _, row in df.iterrows()]
+        self.assertEqual(extract_user_frame(df, mapping, import_config).to_records(), expected)
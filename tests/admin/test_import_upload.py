@@ -0,0 +1,161 @@
+"""
+Tests para el almacenamiento de los CSV cargados fuera de la sesión
+"""
+import shutil
+import io
+import tempfile
+from unittest import mock
+
+import pandas as pd
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from CPdashadmin.views.users import import_handlers
+from CPdashadmin.views.users.upload_store import (
+    SESSION_UPLOAD_KEY, SNIFF_SIZE, PREVIEW_ROWS, CsvRowCounter, get_upload_path, get_upload_meta,
+    iter_upload_chunks, load_upload_preview
+)
+from CPdashadmin.views.users.encoding_detection import detect_file_encoding
+from core.models import SystemSetup, Company, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+CSV_CONTENT = 'usuario;correo;nombre\njperez;jperez@cerroverde.com;Juan Pérez\nmlopez;mlopez@cerroverde.com;María\n'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadStoreTest(TestCase):
+    """Tests para el paso de carga del asistente de importación"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        company = Company.objects.create(name='Cerro Verde')
+        cls.admin = User.objects.create_user(username='admin', password='x', company=company, can_access=True)
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+    
+    def setUp(self):
+        self.client.force_login(self.admin)
+    
+    def upload(self, content=CSV_CONTENT):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        csv_file = SimpleUploadedFile('usuarios.csv', content, content_type='text/csv')
+        return self.client.post(reverse('CPdashadmin:user_import'), {'upload_csv': '1', 'csv_file': csv_file})
+    
+    def test_session_only_keeps_upload_handle(self):
+        """Test: La sesión guarda el id de la carga y no el contenido del CSV"""
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        
+        session = self.client.session
+        upload_id = session[SESSION_UPLOAD_KEY]
+        self.assertNotIn('csv_data', session)
+        self.assertNotIn('csv_preview', session)
+        self.assertEqual(session['csv_delimiter'], ';')
+        self.assertEqual(session['csv_total_rows'], 2)
+        with default_storage.open(get_upload_path(upload_id), 'rb') as stored:
+            self.assertEqual(stored.read().decode('utf-8'), CSV_CONTENT)
+    
+    def test_latin1_upload_transcoded_to_utf8(self):
+        """Test: Un archivo Latin-1 se detecta y se guarda como UTF-8 sin perder acentos"""
+        self.upload(CSV_CONTENT.encode('latin-1'))
+        
+        session = self.client.session
+        upload_id = session[SESSION_UPLOAD_KEY]
+        self.assertEqual(session['csv_encoding'], 'cp1252')
+        self.assertEqual(get_upload_meta(upload_id), {'encoding': 'cp1252', 'delimiter': ';', 'total_rows': 2})
+        with default_storage.open(get_upload_path(upload_id), 'rb') as stored:
+            self.assertEqual(stored.read().decode('utf-8'), CSV_CONTENT)
+    
+    def test_large_upload_read_by_chunks(self):
+        """Test: Un archivo grande se detecta con una muestra y se lee por bloques"""
+        rows = ''.join(f'user{i};user{i}@cerroverde.com;Usuario {i}\n' for i in range(20000))
+        content = 'usuario;correo;nombre\n' + rows
+        self.assertGreater(len(content), SNIFF_SIZE)
+        
+        with mock.patch.object(import_handlers, 'detect_delimiter', wraps=import_handlers.detect_delimiter) as detect, \
+                mock.patch('CPdashadmin.views.users.upload_store.pd.read_csv', wraps=pd.read_csv) as read_csv:
+            self.upload(content)
+        # Solo se parsean las filas de la vista previa; el conteo sale del guardado
+        self.assertTrue(all(call.kwargs.get('nrows') for call in read_csv.call_args_list))
+        self.assertLessEqual(len(detect.call_args.args[0]), SNIFF_SIZE)
+        
+        session = self.client.session
+        self.assertEqual(session['csv_total_rows'], 20000)
+        self.assertEqual(session['csv_columns'], ['usuario', 'correo', 'nombre'])
+        
+        upload_id = session[SESSION_UPLOAD_KEY]
+        self.assertEqual(len(load_upload_preview(upload_id, ';')), PREVIEW_ROWS)
+        chunks = list(iter_upload_chunks(upload_id, ';', chunk_size=6000))
+        self.assertEqual([len(chunk) for chunk in chunks], [6000, 6000, 6000, 2000])
+        self.assertEqual(chunks[-1].index[-1], 19999)
+    
+    def test_new_upload_replaces_previous(self):
+        """Test: Una nueva carga elimina el archivo de la anterior"""
+        self.upload()
+        previous_id = self.client.session[SESSION_UPLOAD_KEY]
+        
+        self.upload()
+        self.assertNotEqual(self.client.session[SESSION_UPLOAD_KEY], previous_id)
+        self.assertFalse(default_storage.exists(get_upload_path(previous_id)))
+
+
+class CsvRowCounterTest(SimpleTestCase):
+    """Tests para el conteo de filas durante el guardado"""
+    
+    def count(self, text, chunk_size):
+        counter = CsvRowCounter()
+        for start in range(0, len(text), chunk_size):
+            counter.feed(text[start:start + chunk_size])
+        return counter.rows
+    
+    def test_matches_pandas(self):
+        """Test: Coincide con pandas con saltos de línea entre comillas y sin salto final"""
+        samples = [
+            CSV_CONTENT,
+            CSV_CONTENT.rstrip('\n'),
+            CSV_CONTENT.replace('\n', '\r\n'),
+            'usuario;nota\njperez;"linea 1\nlinea 2"\nmlopez;"dice ""hola""\n"\naruiz;ok',
+            'usuario;correo\n',
+        ]
+        for text in samples:
+            expected = len(pd.read_csv(io.StringIO(text), delimiter=';'))
+            for chunk_size in (1, 3, 1024):
+                self.assertEqual(self.count(text, chunk_size), expected, (text, chunk_size))
+
+
+class EncodingDetectionTest(SimpleTestCase):
+    """Tests para la detección de codificación por muestras"""
+    
+    def detect(self, content, sample_size=1024):
+        return detect_file_encoding(SimpleUploadedFile('usuarios.csv', content), sample_size=sample_size)
+    
+    def test_utf8_and_bom(self):
+        """Test: UTF-8 estricto y UTF-8 con BOM"""
+        self.assertEqual(self.detect(CSV_CONTENT.encode('utf-8')), 'utf-8')
+        self.assertEqual(self.detect(CSV_CONTENT.encode('utf-8-sig')), 'utf-8-sig')
+    
+    def test_windows_1252(self):
+        """Test: Exportaciones Windows-1252 (con caracteres fuera de Latin-1)"""
+        content = CSV_CONTENT + 'rnuñez;rnunez@cerroverde.com;Raúl “Ñuñez”\n'
+        self.assertEqual(self.detect(content.encode('cp1252')), 'cp1252')
+    
+    def test_latin1_bytes_undefined_in_cp1252(self):
+        """Test: Bytes no definidos en Windows-1252 recurren a Latin-1"""
+        self.assertEqual(self.detect(b'usuario;nombre\nx;\x81\xe9\n'), 'latin-1')
+    
+    def test_reads_bounded_samples(self):
+        """Test: Solo se leen muestras acotadas, incluido el final del archivo"""
+        content = ('a;b\n' + 'x;y\n' * 5000).encode('utf-8') + 'z;Peña\n'.encode('latin-1')
+        csv_file = SimpleUploadedFile('usuarios.csv', content)
+        with mock.patch.object(csv_file, 'file', wraps=csv_file.file) as wrapped:
+            self.assertEqual(detect_file_encoding(csv_file, sample_size=1024), 'cp1252')
+        self.assertEqual([call.args[0] for call in wrapped.read.call_args_list], [1024, 1024, 1024])
+        self.assertEqual(csv_file.tell(), 0)
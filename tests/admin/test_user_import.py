@@ -0,0 +1,202 @@
+"""
+Tests para la importación masiva de usuarios
+"""
+import pandas as pd
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, RequestFactory, override_settings
+from CPdashadmin.views.users.data_processor import process_import_data
+from CPdashadmin.views.users.upload_store import save_upload_stream
+from core.models import Company, Role, User, UserRole, UserSearchToken
+from core.search import search_users
+
+
+COLUMN_MAPPING = {
+    'username': 'usuario',
+    'email': 'correo',
+    'first_name': 'nombre',
+    'last_name': 'apellido',
+    'department': 'area',
+    'role': 'rol',
+}
+
+
+def make_import_config(**overrides):
+    config = {
+        'default_password': 'changeme123',
+        'default_is_active': True,
+        'default_can_access': True,
+        'default_must_change_password': True,
+        'update_existing': False,
+        'selected_rules': [],
+        'custom_rules': [],
+    }
+    config.update(overrides)
+    return config
+
+
+def store_csv(content, encoding='utf-8'):
+    """Guardar un CSV como lo hace el asistente de importación y retornar el id de la carga"""
+    uploaded_file = SimpleUploadedFile('usuarios.csv', content.encode(encoding), content_type='text/csv')
+    upload_id, _, _ = save_upload_stream(uploaded_file, encoding)
+    return upload_id
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkUserImportTest(TestCase):
+    """Tests para process_import_data"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        cls.user_role = Role.objects.create(company=cls.company, key='user', name='Usuario')
+        cls.technician_role = Role.objects.create(company=cls.company, key='technician', name='Técnico')
+        cls.admin = User.objects.create_user(username='admin', password='x', company=cls.company)
+    
+    def setUp(self):
+        self.request = RequestFactory().post('/')
+        self.request.user = self.admin
+    
+    def make_df(self, rows):
+        return pd.DataFrame(rows, columns=['usuario', 'correo', 'nombre', 'apellido', 'area', 'rol'])
+    
+    def run_import(self, rows, **config):
+        return process_import_data(self.make_df(rows), COLUMN_MAPPING, make_import_config(**config), self.request)
+    
+    def test_creates_users_with_roles(self):
+        """Test: Crea usuarios, contraseña por defecto y rol asignado"""
+        success, error_count, errors, conflicts = self.run_import([
+            ['jperez', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Mina', 'Técnico'],
+            ['mlopez', 'mlopez@cerroverde.com', 'María', 'López', 'Planta', 'Usuario'],
+        ])
+        self.assertEqual((success, error_count, errors, conflicts), (2, 0, [], []))
+        
+        user = User.objects.get(username='jperez')
+        self.assertEqual(user.company, self.company)
+        self.assertTrue(user.check_password('changeme123'))
+        self.assertTrue(user.must_change_password)
+        self.assertEqual(list(user.userrole_set.values_list('role__key', flat=True)), ['technician'])
+    
+    def test_search_index_updated(self):
+        """Test: Los usuarios importados quedan en el índice de búsqueda"""
+        self.run_import([['jperez', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Mina', '']])
+        self.assertTrue(UserSearchToken.objects.filter(user__username='jperez').exists())
+        self.assertEqual(list(search_users(User.objects.all(), 'perez').values_list('username', flat=True)), ['jperez'])
+    
+    def test_existing_user_conflict(self):
+        """Test: Sin update_existing, los usuarios existentes son conflictos"""
+        success, error_count, errors, conflicts = self.run_import([
+            ['admin', 'admin@cerroverde.com', 'Ana', 'Admin', '', ''],
+        ])
+        self.assertEqual((success, error_count), (0, 1))
+        self.assertEqual(conflicts, ['Fila 1: Usuario admin ya existe'])
+    
+    def test_user_of_other_company_is_conflict(self):
+        """Test: Un username de otra empresa es un conflicto, nunca una actualización"""
+        other_company = Company.objects.create(name='Otra Empresa')
+        external = User.objects.create_user(
+            username='externo', email='externo@otra.com', password='x', company=other_company, department='Ventas'
+        )
+        
+        success, error_count, errors, conflicts = self.run_import([
+            ['externo', 'externo@cerroverde.com', 'Ext', 'Erno', 'Mina', 'Técnico'],
+        ], update_existing=True)
+        self.assertEqual((success, error_count), (0, 1))
+        self.assertEqual(conflicts, ['Fila 1: Usuario externo pertenece a otra empresa'])
+        external.refresh_from_db()
+        self.assertEqual((external.company, external.department), (other_company, 'Ventas'))
+        self.assertFalse(external.userrole_set.exists())
+    
+    def test_update_existing_replaces_roles(self):
+        """Test: Con update_existing se actualizan campos y se reemplaza el rol"""
+        user = User.objects.create_user(username='jperez', password='x', company=self.company)
+        UserRole.objects.create(user=user, role=self.user_role)
+        
+        success, error_count, errors, conflicts = self.run_import([
+            ['jperez', 'nuevo@cerroverde.com', 'Juan', 'Pérez', 'Mina', 'Técnico'],
+        ], update_existing=True)
+        self.assertEqual((success, error_count), (1, 0))
+        user.refresh_from_db()
+        self.assertEqual(user.email, 'nuevo@cerroverde.com')
+        self.assertEqual(user.department, 'Mina')
+        self.assertTrue(user.check_password('x'))
+        self.assertEqual(list(user.userrole_set.values_list('role__key', flat=True)), ['technician'])
+    
+    def test_duplicate_rows_in_file(self):
+        """Test: Una fila repetida es un conflicto, también con update_existing"""
+        rows = [
+            ['jperez', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Mina', ''],
+            ['jperez', 'otro@cerroverde.com', 'Juan', 'Pérez', 'Planta', ''],
+        ]
+        success, error_count, errors, conflicts = self.run_import(rows)
+        self.assertEqual((success, error_count), (1, 1))
+        self.assertEqual(conflicts, ['Fila 2: Usuario jperez repetido en el archivo (fila 1)'])
+        
+        User.objects.filter(username='jperez').delete()
+        success, error_count, errors, conflicts = self.run_import(rows, update_existing=True)
+        self.assertEqual((success, error_count, len(conflicts)), (1, 1, 1))
+        self.assertEqual(User.objects.get(username='jperez').department, 'Mina')
+    
+    def test_username_normalized_before_lookup(self):
+        """Test: Un username que la normalización NFKC cambia se busca y reporta normalizado"""
+        User.objects.create_user(username='jperez', password='x', company=self.company)
+        
+        success, error_count, errors, conflicts = self.run_import([
+            ['ｊｐｅｒｅｚ', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Mina', ''],
+            ['jperez', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Mina', ''],
+        ], update_existing=True)
+        self.assertEqual((success, error_count), (1, 1))
+        self.assertEqual(conflicts, ['Fila 2: Usuario jperez repetido en el archivo (fila 1)'])
+        self.assertEqual(User.objects.get(username='jperez').department, 'Mina')
+    
+    def test_roles_version_bumped_only_for_changed_users(self):
+        """Test: Solo se invalidan los roles cacheados de los usuarios cuyo rol cambió"""
+        from core.roles import GLOBAL_VERSION_KEY, get_roles_version
+        from django.core.cache import cache
+        
+        cache.clear()
+        global_version = cache.get(GLOBAL_VERSION_KEY, 0)
+        user = User.objects.create_user(username='jperez', password='x', company=self.company)
+        UserRole.objects.create(user=user, role=self.technician_role)
+        version = get_roles_version(user.pk)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import([
+                ['jperez', 'jperez@cerroverde.com', 'Juan', 'Pérez', 'Planta', 'Técnico'],
+                ['mlopez', 'mlopez@cerroverde.com', 'María', 'López', 'Planta', 'Usuario'],
+            ], update_existing=True)
+        self.assertEqual(get_roles_version(user.pk), version)
+        self.assertEqual(cache.get(GLOBAL_VERSION_KEY, 0), global_version)
+        new_user = User.objects.get(username='mlopez')
+        self.assertEqual(get_roles_version(new_user.pk)[1], 1)
+    
+    def test_validation_and_unknown_role_errors(self):
+        """Test: Filas sin email y roles inexistentes se reportan"""
+        success, error_count, errors, conflicts = self.run_import([
+            ['jperez', '', 'Juan', 'Pérez', 'Mina', ''],
+            ['mlopez', 'mlopez@cerroverde.com', 'María', 'López', 'Planta', 'Gerente'],
+        ])
+        self.assertEqual((success, error_count), (1, 1))
+        self.assertEqual(errors, [
+            'Fila 1: Username y email son obligatorios',
+            'Fila 2: Rol "Gerente" no encontrado',
+        ])
+        self.assertFalse(UserRole.objects.filter(user__username='mlopez').exists())
+    
+    def test_queries_do_not_grow_with_rows(self):
+        """Test: El número de consultas no depende del número de filas"""
+        def rows(prefix, count):
+            return [[f'{prefix}{i}', f'{prefix}{i}@cerroverde.com', 'Nombre', 'Apellido', 'Mina', 'Usuario']
+                    for i in range(count)]
+        
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as small:
+            self.run_import(rows('a', 5))
+        with CaptureQueriesContext(connection) as large:
+            self.run_import(rows('b', 100))
+        # SQLite divide los INSERT masivos según su límite de parámetros
+        def non_insert(captured):
+            return [q for q in captured.captured_queries if not q['sql'].startswith('INSERT')]
+        self.assertEqual(len(non_insert(small)), len(non_insert(large)))
+        self.assertEqual(UserRole.objects.filter(role=self.user_role).count(), 105)
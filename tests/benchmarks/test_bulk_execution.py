@@ -0,0 +1,93 @@
+"""
+Filas por segundo del SQL directo de DatabaseManager en cargas de 100k filas
+
+- row_by_row: un INSERT por fila en una transacción (sobre BULK_ROW_BY_ROW filas)
+- execute_many: INSERT por lotes (fast_executemany en SQL Server)
+- bulk_upsert: actualización de todas las filas (MERGE en SQL Server, ON CONFLICT en SQLite)
+- execute_query / iter_query: lectura completa en una lista frente a lectura por bloques
+
+    RUN_BENCHMARKS=1 BULK_ROWS=100000 python manage.py test tests.benchmarks.test_bulk_execution
+"""
+import os
+import time
+from django.db import connection, transaction
+from django.test import TestCase
+from core.db_config import DatabaseManager
+from .utils import benchmark, save_results
+
+ROWS = int(os.environ.get('BULK_ROWS', 100000))
+ROW_BY_ROW = min(ROWS, int(os.environ.get('BULK_ROW_BY_ROW', 10000)))
+
+TABLE = 'bench_bulk_rows'
+INSERT = f'INSERT INTO {TABLE} (code, name, quantity) VALUES (%s, %s, %s)'
+
+
+def rows(count, offset=0):
+    return ((f'R{i:08d}', f'Elemento {i}', i + offset) for i in range(count))
+
+
+def timed(func):
+    """Ejecutar func y retornar (resultado, segundos)"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def rate(count, seconds):
+    return {'rows': count, 'seconds': round(seconds, 3), 'rows_per_second': round(count / seconds) if seconds else 0}
+
+
+@benchmark
+class BulkExecutionBenchmark(TestCase):
+    """Filas/s de inserción, carga masiva y lectura con DatabaseManager"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {TABLE} (code VARCHAR(20) PRIMARY KEY, name VARCHAR(100), quantity INTEGER)'
+            )
+
+    def truncate(self):
+        DatabaseManager.execute_query(f'DELETE FROM {TABLE}')
+
+    def test_bulk_execution(self):
+        results = {'vendor': connection.vendor, 'rows': ROWS}
+
+        def row_by_row():
+            with transaction.atomic():
+                for row in rows(ROW_BY_ROW):
+                    DatabaseManager.execute_query(INSERT, list(row))
+
+        _, seconds = timed(row_by_row)
+        results['row_by_row'] = rate(ROW_BY_ROW, seconds)
+        self.truncate()
+
+        count, seconds = timed(lambda: DatabaseManager.execute_many(INSERT, rows(ROWS)))
+        results['execute_many'] = rate(count, seconds)
+
+        count, seconds = timed(lambda: DatabaseManager.bulk_upsert(
+            TABLE, ['code', 'name', 'quantity'], rows(ROWS, offset=1), ['code']
+        ))
+        results['bulk_upsert'] = rate(count, seconds)
+
+        fetched, seconds = timed(lambda: DatabaseManager.execute_query(f'SELECT code, name, quantity FROM {TABLE}'))
+        results['execute_query'] = rate(len(fetched), seconds)
+        del fetched
+
+        count, seconds = timed(lambda: sum(1 for _ in DatabaseManager.iter_query(
+            f'SELECT code, name, quantity FROM {TABLE}'
+        )))
+        results['iter_query'] = rate(count, seconds)
+
+        path = save_results('bulk_execution', results)
+        print(f'\nBenchmark SQL directo -> {path}')
+        for name, result in results.items():
+            if isinstance(result, dict):
+                print(f"  {name}: {result['rows_per_second']} filas/s ({result['rows']} filas en {result['seconds']}s)")
+
+        self.assertEqual(results['iter_query']['rows'], ROWS)
+        self.assertEqual(
+            DatabaseManager.execute_query(f'SELECT SUM(quantity) AS total FROM {TABLE}')[0]['total'],
+            sum(i + 1 for i in range(ROWS))
+        )
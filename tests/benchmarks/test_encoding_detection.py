@@ -0,0 +1,65 @@
+"""
+Benchmark de detección de codificación sobre exportaciones de RR.HH.
+(chardet sobre el archivo completo vs muestras acotadas)
+"""
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from CPdashadmin.views.users.encoding_detection import chardet, detect_file_encoding
+from .utils import benchmark, save_results
+
+ROWS = 20000
+
+DEPARTMENTS = ['Gerencia de Operaciones', 'Planta Concentradora', 'Logística', 'Mantención Eléctrica']
+
+
+def build_hr_export(rows=ROWS):
+    """CSV de RR.HH. con nombres y áreas con acentos"""
+    lines = ['usuario;correo;nombre;apellido;departamento;cargo;activo']
+    for i in range(rows):
+        lines.append(
+            f'usr{i};usr{i}@cerroverde.com;José María;Peña Núñez;'
+            f'{DEPARTMENTS[i % len(DEPARTMENTS)]};Técnico “Senior”;sí'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+@benchmark
+class EncodingDetectionBenchmark(SimpleTestCase):
+    """Tiempo de detección por codificación del archivo"""
+    
+    def test_detection_time(self):
+        content = build_hr_export()
+        results = {}
+        
+        for encoding in ['utf-8', 'cp1252', 'latin-1']:
+            if encoding == 'latin-1':
+                data = content.replace('“', '"').replace('”', '"').encode('latin-1')
+            else:
+                data = content.encode(encoding)
+            
+            start = time.perf_counter()
+            full = chardet.detect(data)
+            full_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            detected = detect_file_encoding(SimpleUploadedFile('usuarios.csv', data))
+            sampled_seconds = time.perf_counter() - start
+            
+            results[encoding] = {
+                'size_bytes': len(data),
+                'chardet_full': {'encoding': full['encoding'], 'confidence': round(full['confidence'] or 0, 3), 'seconds': round(full_seconds, 4)},
+                'sampled': {'encoding': detected, 'seconds': round(sampled_seconds, 4)},
+                'speedup': round(full_seconds / sampled_seconds, 1) if sampled_seconds else None,
+            }
+            self.assertEqual(data.decode(detected), data.decode(encoding))
+        
+        path = save_results('encoding_detection', results)
+        print(f'\nBenchmark detección de codificación -> {path}')
+        for encoding, result in results.items():
+            print(
+                f"  {encoding} ({result['size_bytes'] // 1024} KB): chardet completo "
+                f"{result['chardet_full']['seconds']}s ({result['chardet_full']['encoding']}), "
+                f"muestras {result['sampled']['seconds']}s ({result['sampled']['encoding']})"
+            )
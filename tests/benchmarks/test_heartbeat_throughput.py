@@ -0,0 +1,123 @@
+"""
+Heartbeats por segundo del KioskConsumer en un solo worker
+
+Compara el registro de heartbeats:
+
+- database: cada heartbeat se guarda en la base de datos por el pool de
+  base de datos de los consumers (db_executor; comportamiento anterior a la
+  presencia en Redis, con KIOSK_HEARTBEAT_PERSIST_INTERVAL=0).
+- redis: presencia en Redis con el cliente asyncio y Kiosk.last_heartbeat cada
+  KIOSK_HEARTBEAT_PERSIST_INTERVAL segundos. Requiere Redis en REDIS_HOST;
+  sin servidor se omite.
+- no_io: el consumer sin escrituras (techo del bucle de eventos y del cliente
+  simulado).
+
+    RUN_BENCHMARKS=1 HEARTBEAT_KIOSKS=500 python manage.py test tests.benchmarks.test_heartbeat_throughput
+"""
+import asyncio
+import os
+import time
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from core.consumers import KioskConsumer
+from core.models import Company, Kiosk, User
+from core.redis_config import async_redis_manager
+from .utils import ConsumerDatabaseMixin, benchmark, save_results, summarize
+
+KIOSK_COUNT = int(os.environ.get('HEARTBEAT_KIOSKS', 200))
+HEARTBEATS_PER_KIOSK = int(os.environ.get('HEARTBEATS_PER_KIOSK', 20))
+
+TIMEOUT = 10
+
+
+async def connect(kiosk_id):
+    communicator = WebsocketCommunicator(KioskConsumer.as_asgi(), f'/ws/kiosk/{kiosk_id}/')
+    communicator.scope['url_route'] = {'kwargs': {'kiosk_id': str(kiosk_id)}}
+    connected, _ = await communicator.connect(timeout=TIMEOUT)
+    assert connected
+    await communicator.receive_json_from(timeout=TIMEOUT)
+    return communicator
+
+
+async def send_heartbeats(communicator):
+    samples = []
+    for _ in range(HEARTBEATS_PER_KIOSK):
+        start = time.perf_counter()
+        await communicator.send_json_to({'type': 'heartbeat'})
+        await communicator.receive_json_from(timeout=TIMEOUT)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def run_heartbeats(kiosk_ids):
+    """Conectar los kioskos y medir heartbeats/s con todos enviando a la vez"""
+    communicators = await asyncio.gather(*[connect(kiosk_id) for kiosk_id in kiosk_ids])
+    start = time.perf_counter()
+    sample_lists = await asyncio.gather(*[send_heartbeats(communicator) for communicator in communicators])
+    elapsed = time.perf_counter() - start
+    for communicator in communicators:
+        await communicator.disconnect()
+
+    samples = [sample for samples in sample_lists for sample in samples]
+    result = summarize(samples)
+    result['kiosks'] = len(kiosk_ids)
+    result['heartbeats_per_second'] = round(len(samples) / elapsed, 1)
+    return result
+
+
+async def redis_available():
+    try:
+        return bool(await async_redis_manager.redis_client.ping())
+    except Exception:
+        return False
+
+
+@benchmark
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class HeartbeatThroughputBenchmark(ConsumerDatabaseMixin, TransactionTestCase):
+    """Heartbeats/s por worker: base de datos por heartbeat frente a presencia en Redis"""
+
+    def setUp(self):
+        super().setUp()
+        self.company = Company.objects.create(name='Cerro Verde')
+        user = User.objects.create(username='kiosko', email='kiosko@cerroverde.com', password='!', company=self.company)
+        Kiosk.objects.bulk_create([
+            Kiosk(
+                company=self.company, user=user, name=f'Kiosko {i}',
+                mac_address=f'02:00:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}', device_type='web'
+            )
+            for i in range(KIOSK_COUNT)
+        ], batch_size=500)
+        self.kiosk_ids = list(Kiosk.objects.filter(company=self.company).values_list('pk', flat=True))
+
+    async def test_heartbeat_throughput(self):
+        results = {'heartbeats_per_kiosk': HEARTBEATS_PER_KIOSK}
+        company_lookup = mock.AsyncMock(return_value=None)
+
+        with mock.patch.object(async_redis_manager, 'get_json', company_lookup), \
+                mock.patch.object(async_redis_manager, 'set_with_expiry', mock.AsyncMock(return_value=False)), \
+                override_settings(KIOSK_HEARTBEAT_PERSIST_INTERVAL=0):
+            results['database'] = await run_heartbeats(self.kiosk_ids)
+
+        with mock.patch.object(async_redis_manager, 'get_json', company_lookup), \
+                mock.patch.object(async_redis_manager, 'set_with_expiry', mock.AsyncMock(return_value=True)):
+            results['no_io'] = await run_heartbeats(self.kiosk_ids)
+
+        if await redis_available():
+            results['redis'] = await run_heartbeats(self.kiosk_ids)
+        else:
+            results['redis'] = 'omitido: Redis no disponible'
+
+        path = save_results('heartbeat_throughput', results)
+        print(f'\nBenchmark heartbeats -> {path}')
+        for name, result in results.items():
+            if isinstance(result, dict):
+                print(
+                    f"  {name}: {result['heartbeats_per_second']} heartbeats/s "
+                    f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms"
+                )
+            else:
+                print(f'  {name}: {result}')
+
+        self.assertEqual(results['database']['iterations'], KIOSK_COUNT * HEARTBEATS_PER_KIOSK)
@@ -0,0 +1,170 @@
+"""
+Benchmark de los endpoints de kiosko que reciben la carga de producción
+
+- Latencia p50/p95/p99 y consultas por petición de /api/kiosks/templates/,
+  /api/kiosks/generate-ticket-order/, kiosk_status y kiosk_categories.
+- Tickets por segundo con varios kioskos simultáneos generando turnos.
+
+Las peticiones pasan por el cliente de pruebas (middlewares incluidos). Se
+ejecutan contra la base de datos de pruebas de la configuración activa
+(SQLite en memoria o SQL Server si settings apunta a él); el motor queda
+registrado en el JSON de resultados. Con SQLite las escrituras simultáneas
+se bloquean entre sí (database table is locked) y se cuentan como errores.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import time
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from core.models import (
+    Company, SystemSetup, User, WorkSession, Ticket, TicketTurn,
+    TicketCategory, TicketSubcategory, TicketTemplate, TicketTemplateField
+)
+from .utils import benchmark, measure, measure_concurrent, save_results
+
+CATEGORY_COUNT = 8
+SUBCATEGORIES_PER_CATEGORY = 5
+FIELDS_PER_TEMPLATE = 6
+
+# Kioskos simultáneos y tickets que genera cada uno
+KIOSK_COUNTS = [1, 4, 8]
+TICKETS_PER_KIOSK = 15
+
+
+def create_kiosk_catalog():
+    """Empresa con usuario, sesión de trabajo y catálogo de categorías con plantillas"""
+    SystemSetup.objects.create(is_completed=True)
+    company = Company.objects.create(name='Cerro Verde')
+    User.objects.create(
+        username='kiosko', email='kiosko@cerroverde.com', password='!',
+        company=company, can_access=True
+    )
+    WorkSession.objects.create(company=company, name='Día completo', start_time=time(0, 0), end_time=time(23, 59, 59))
+
+    for i in range(CATEGORY_COUNT):
+        template = TicketTemplate.objects.create(company=company, name=f'Plantilla {i}')
+        TicketTemplateField.objects.bulk_create([
+            TicketTemplateField(
+                template=template, name=f'campo_{j}', label=f'Campo {j}',
+                field_type='text', required=j == 0, order_no=j
+            )
+            for j in range(FIELDS_PER_TEMPLATE)
+        ])
+        category = TicketCategory.objects.create(
+            company=company, name=f'Categoría {i}', icon='fa-ticket', color='#0066cc', template=template
+        )
+        TicketSubcategory.objects.bulk_create([
+            TicketSubcategory(category=category, name=f'Subcategoría {i}.{j}', is_active=j != 0)
+            for j in range(SUBCATEGORIES_PER_CATEGORY)
+        ])
+    return company
+
+
+def ticket_order_payload(company, category, subcategory, index):
+    return json.dumps({
+        'company_id': company.pk,
+        'category_id': category.pk,
+        'subcategory_id': subcategory.pk,
+        'priority': 'normal',
+        'form_data': {'campo_0': f'Solicitud {index}', 'campo_1': 'Planta'},
+    })
+
+
+@benchmark
+class KioskEndpointsBenchmark(TestCase):
+    """Latencia y consultas por petición de los endpoints de kiosko"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = create_kiosk_catalog()
+        cls.category = TicketCategory.objects.filter(company=cls.company).order_by('pk').first()
+        cls.subcategory = cls.category.subcategories.filter(is_active=True).order_by('pk').first()
+
+    def test_endpoint_latency(self):
+        client = Client()
+        orders = iter(range(10 ** 6))
+
+        def get(url, **params):
+            def call():
+                response = client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+            return call
+
+        def generate_ticket_order():
+            response = client.post(
+                reverse('generate-ticket-order'),
+                ticket_order_payload(self.company, self.category, self.subcategory, next(orders)),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+        results = {
+            'kiosk_templates': measure(get(reverse('kiosk-templates'), company_id=self.company.pk), iterations=30),
+            'kiosk_categories': measure(get(reverse('kiosk_categories')), iterations=30),
+            'kiosk_status': measure(get(reverse('kiosk_status')), iterations=30),
+            'generate_ticket_order': measure(generate_ticket_order, iterations=30),
+        }
+
+        path = save_results('kiosk_endpoints', results)
+        print(f'\nBenchmark endpoints de kiosko -> {path}')
+        for name, result in results.items():
+            print(
+                f"  {name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                f"p99={result['p99_ms']}ms queries={result['queries_per_call']}"
+            )
+
+        # El catálogo se arma con consultas fijas, sin importar su tamaño
+        self.assertLessEqual(results['kiosk_templates']['queries_per_call'], 5)
+
+
+@benchmark
+class KioskConcurrencyBenchmark(TransactionTestCase):
+    """Tickets por segundo con varios kioskos generando turnos a la vez"""
+
+    def setUp(self):
+        self.company = create_kiosk_catalog()
+        self.categories = list(
+            TicketCategory.objects.filter(company=self.company).order_by('pk').prefetch_related('subcategories')
+        )
+
+    def test_concurrent_ticket_generation(self):
+        results = {}
+        for kiosks in KIOSK_COUNTS:
+            Ticket.objects.all().delete()
+            clients = [Client(raise_request_exception=False) for _ in range(kiosks)]
+
+            def generate(kiosk_index, call_index):
+                category = self.categories[(kiosk_index + call_index) % len(self.categories)]
+                subcategory = [sub for sub in category.subcategories.all() if sub.is_active][0]
+                response = clients[kiosk_index].post(
+                    reverse('generate-ticket-order'),
+                    ticket_order_payload(self.company, category, subcategory, call_index),
+                    content_type='application/json'
+                )
+                if response.status_code != 201:
+                    raise AssertionError(f'HTTP {response.status_code}')
+
+            # Los errores se cuentan en el resultado; no se registran sus trazas
+            request_logger = logging.getLogger('django.request')
+            request_logger.disabled = True
+            try:
+                result = measure_concurrent(generate, workers=kiosks, calls_per_worker=TICKETS_PER_KIOSK)
+            finally:
+                request_logger.disabled = False
+            result['tickets_per_second'] = result.pop('calls_per_second')
+            # Turnos repetidos dentro de una categoría (numeración concurrente)
+            turn_counts = Counter(TicketTurn.objects.values_list('ticket__category_id', 'turn_number'))
+            result['duplicate_turn_numbers'] = sum(count - 1 for count in turn_counts.values())
+            results[f'kiosks_{kiosks}'] = result
+
+        path = save_results('kiosk_concurrency', results)
+        print(f'\nBenchmark kioskos simultáneos -> {path}')
+        for name, result in results.items():
+            print(
+                f"  {name}: {result['tickets_per_second']} tickets/s p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms errores={result['errors']} "
+                f"turnos_duplicados={result['duplicate_turn_numbers']}"
+            )
+
+        self.assertGreater(results[f'kiosks_{KIOSK_COUNTS[0]}']['tickets_per_second'], 0)
@@ -0,0 +1,37 @@
+"""
+Benchmark de hashing de contraseñas en altas masivas (usuarios/segundo)
+"""
+import os
+import time
+
+from django.test import SimpleTestCase
+from core.passwords import hash_passwords
+from .utils import benchmark, save_results
+
+USERS = 48
+
+
+@benchmark
+class PasswordHashingBenchmark(SimpleTestCase):
+    """Usuarios por segundo con el hasher configurado, en un proceso y con pool"""
+    
+    def test_users_per_second(self):
+        passwords = ['changeme123'] * USERS
+        results = {}
+        
+        for name, workers in [('single_process', 1), ('process_pool', os.cpu_count() or 1)]:
+            start = time.perf_counter()
+            hashes = hash_passwords(passwords, workers=workers)
+            elapsed = time.perf_counter() - start
+            self.assertEqual(len(set(hashes)), USERS)
+            results[name] = {
+                'workers': workers,
+                'users': USERS,
+                'seconds': round(elapsed, 3),
+                'users_per_second': round(USERS / elapsed, 1),
+            }
+        
+        path = save_results('password_hashing', results)
+        print(f'\nBenchmark hashing de contraseñas -> {path}')
+        for name, result in results.items():
+            print(f"  {name}: {result['users_per_second']} usuarios/s ({result['workers']} procesos)")
@@ -0,0 +1,63 @@
+"""
+Benchmark del listado /api/users/ con distintos tamaños de página
+"""
+from unittest import mock
+from django.test import TestCase
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import Company, Role, User, UserRole
+from core.views import UserViewSet
+from .utils import benchmark, measure, save_results
+
+PAGE_SIZES = [20, 200, 2000]
+
+
+@benchmark
+class UsersAPIListBenchmark(TestCase):
+    """Latencia del listado de usuarios (con roles) por tamaño de página"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        roles = [
+            Role.objects.create(company=cls.company, key=key, name=name)
+            for key, name in Role.ROLE_CHOICES
+        ]
+        User.objects.bulk_create([
+            User(
+                username=f'user{i:05d}', email=f'user{i:05d}@cerroverde.com', password='!',
+                first_name=f'Nombre{i}', last_name='Apellido', company=cls.company,
+                department='Operaciones', location='Arequipa'
+            )
+            for i in range(max(PAGE_SIZES))
+        ], batch_size=500)
+        users = list(User.objects.filter(company=cls.company))
+        UserRole.objects.bulk_create([
+            UserRole(user=user, role=roles[i % len(roles)]) for i, user in enumerate(users)
+        ], batch_size=500)
+        cls.admin = users[0]
+    
+    def test_list_latency_by_page_size(self):
+        view = UserViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        results = {}
+        
+        for page_size in PAGE_SIZES:
+            def list_users():
+                request = factory.get('/api/users/', {'ordering': 'username'})
+                force_authenticate(request, user=self.admin)
+                response = view(request)
+                response.render()
+                self.assertEqual(len(response.data['results']), page_size)
+            
+            with mock.patch.object(PageNumberPagination, 'page_size', page_size):
+                results[f'page_{page_size}'] = measure(list_users, iterations=10 if page_size < 2000 else 5)
+        
+        path = save_results('users_api_list', results)
+        print(f'\nBenchmark /api/users/ -> {path}')
+        for name, result in results.items():
+            print(f"  {name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms queries={result['queries_per_call']}")
+        
+        # El número de consultas no depende del tamaño de página
+        query_counts = {result['queries_per_call'] for result in results.values()}
+        self.assertEqual(len(query_counts), 1)
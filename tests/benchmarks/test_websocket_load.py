@@ -0,0 +1,253 @@
+"""
+Prueba de carga de los consumers de WebSocket (kioskos, técnicos y pantallas)
+
+Abre miles de conexiones simuladas con WebsocketCommunicator contra la
+aplicación ASGI del proyecto (validación de origen y autenticación incluidas)
+y la capa de canales configurada (en memoria o Redis local):
+
+1. Conexión de kioskos, pantallas y técnicos: latencia de conexión (hasta el
+   mensaje connection_established) y conexiones fallidas.
+2. Heartbeats de todos los kioskos: latencia de ida y vuelta.
+3. Mensajes al grupo de cada kiosko y difusiones a pantallas y técnicos:
+   latencia de entrega por mensaje y tasa de pérdida.
+
+Un mensaje sin respuesta en TIMEOUT segundos cierra su conexión (el
+communicator cancela la aplicación): cada fase reporta las conexiones
+perdidas y sus mensajes pendientes cuentan como no entregados.
+4. Memoria por conexión (tracemalloc) sobre una muestra de pantallas.
+
+Los clientes simulados y los consumers comparten el bucle de eventos, por lo
+que las latencias incluyen la planificación de los clientes: sirven para
+comparar commits y configuraciones, no como latencia absoluta de producción.
+
+El tamaño se ajusta con WS_LOAD_KIOSKS, WS_LOAD_DISPLAYS y WS_LOAD_TECHNICIANS:
+
+    RUN_BENCHMARKS=1 WS_LOAD_KIOSKS=5000 python manage.py test tests.benchmarks.test_websocket_load
+"""
+import asyncio
+import os
+import time
+import tracemalloc
+from contextlib import suppress
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import TransactionTestCase
+from core.models import Company, Kiosk, SystemSetup, User
+from project.asgi import application
+from .utils import ConsumerDatabaseMixin, benchmark, save_results, summarize
+
+KIOSK_COUNT = int(os.environ.get('WS_LOAD_KIOSKS', 1000))
+DISPLAY_COUNT = int(os.environ.get('WS_LOAD_DISPLAYS', 500))
+TECHNICIAN_COUNT = int(os.environ.get('WS_LOAD_TECHNICIANS', 200))
+
+# Conexiones abiertas a la vez (el resto espera su turno)
+CONNECT_BATCH = 200
+
+# Rondas de heartbeat y mensajes difundidos por grupo
+HEARTBEAT_ROUNDS = 3
+BROADCAST_MESSAGES = 10
+
+# Conexiones usadas para estimar la memoria por conexión
+MEMORY_SAMPLE = 200
+
+# Segundos de espera por conexión o mensaje antes de darlo por perdido
+TIMEOUT = 5
+
+HEADERS = [(b'origin', f'http://{settings.ALLOWED_HOSTS[0]}'.encode())]
+
+
+async def connect(path):
+    """
+    Abrir una conexión y esperar el mensaje connection_established
+    Retorna (communicator, latencia en ms) o (None, None) si falla
+    """
+    communicator = WebsocketCommunicator(application, path, headers=HEADERS)
+    start = time.perf_counter()
+    try:
+        connected, _ = await communicator.connect(timeout=TIMEOUT)
+        if connected:
+            message = await communicator.receive_json_from(timeout=TIMEOUT)
+            if message.get('type') == 'connection_established':
+                return communicator, (time.perf_counter() - start) * 1000
+    except asyncio.TimeoutError:
+        pass
+    return None, None
+
+
+async def connect_all(paths):
+    """Abrir las conexiones por lotes de CONNECT_BATCH y resumir la latencia"""
+    communicators = []
+    samples = []
+    for start in range(0, len(paths), CONNECT_BATCH):
+        for communicator, latency in await asyncio.gather(*[connect(path) for path in paths[start:start + CONNECT_BATCH]]):
+            if communicator is not None:
+                communicators.append(communicator)
+                samples.append(latency)
+    result = summarize(samples)
+    result['connections'] = len(paths)
+    result['failed'] = len(paths) - len(communicators)
+    return communicators, result
+
+
+def is_open(communicator):
+    """La conexión sigue abierta (un tiempo de espera agotado cancela la aplicación)"""
+    return not communicator.future.done()
+
+
+def kiosk_id_of(communicator):
+    return int(communicator.scope['path'].strip('/').rsplit('/', 1)[-1])
+
+
+async def disconnect_all(communicators):
+    for start in range(0, len(communicators), CONNECT_BATCH):
+        batch = communicators[start:start + CONNECT_BATCH]
+        for communicator in filter(is_open, batch):
+            with suppress(Exception):
+                await communicator.disconnect(timeout=TIMEOUT)
+
+
+async def receive_messages(communicator, message_type, expected):
+    """
+    Recibir hasta expected mensajes del tipo indicado con su latencia (sent_at)
+    Un tiempo de espera agotado cierra la conexión: el resto cuenta como perdido
+    """
+    samples = []
+    while len(samples) < expected and is_open(communicator):
+        try:
+            message = await communicator.receive_json_from(timeout=TIMEOUT)
+        except asyncio.TimeoutError:
+            break
+        if message.get('type') == message_type:
+            samples.append((time.perf_counter() - message['sent_at']) * 1000)
+    return samples
+
+
+def delivery_result(sample_lists, expected_per_connection, communicators):
+    """
+    Latencia de entrega y tasa de pérdida a partir de las muestras por conexión
+    Las conexiones cerradas al terminar la fase se reportan como perdidas
+    """
+    samples = [sample for samples in sample_lists for sample in samples]
+    expected = expected_per_connection * len(sample_lists)
+    result = summarize(samples)
+    result['expected'] = expected
+    result['delivered'] = len(samples)
+    result['drop_rate'] = round(1 - len(samples) / expected, 4) if expected else 0.0
+    result['lost_connections'] = sum(not is_open(communicator) for communicator in communicators)
+    return result
+
+
+async def heartbeat(communicator):
+    samples = []
+    for _ in range(HEARTBEAT_ROUNDS):
+        if not is_open(communicator):
+            break
+        start = time.perf_counter()
+        await communicator.send_json_to({'type': 'heartbeat'})
+        try:
+            message = await communicator.receive_json_from(timeout=TIMEOUT)
+        except asyncio.TimeoutError:
+            break
+        if message.get('type') == 'heartbeat_confirmed':
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def broadcast(group, message_type, communicators):
+    """Difundir BROADCAST_MESSAGES mensajes a un grupo y medir su entrega"""
+    channel_layer = get_channel_layer()
+    receivers = [
+        asyncio.ensure_future(receive_messages(communicator, message_type, BROADCAST_MESSAGES))
+        for communicator in communicators
+    ]
+    for seq in range(BROADCAST_MESSAGES):
+        await channel_layer.group_send(group, {'type': message_type, 'seq': seq, 'sent_at': time.perf_counter()})
+    return delivery_result(await asyncio.gather(*receivers), BROADCAST_MESSAGES, communicators)
+
+
+async def push_to_kiosks(communicators):
+    """
+    Enviar un mensaje al grupo de cada kiosko y medir su entrega
+    Los kioskos con la conexión ya perdida reciben el envío igual y cuentan como pérdida
+    """
+    channel_layer = get_channel_layer()
+    receivers = [
+        asyncio.ensure_future(receive_messages(communicator, 'kiosk_message', 1))
+        for communicator in communicators
+    ]
+    for communicator in communicators:
+        await channel_layer.group_send(
+            f'kiosk_{kiosk_id_of(communicator)}', {'type': 'kiosk_message', 'sent_at': time.perf_counter()}
+        )
+    return delivery_result(await asyncio.gather(*receivers), 1, communicators)
+
+
+@benchmark
+class WebSocketLoadBenchmark(ConsumerDatabaseMixin, TransactionTestCase):
+    """Carga de miles de kioskos, pantallas y técnicos conectados a la vez"""
+
+    def setUp(self):
+        super().setUp()
+        SystemSetup.objects.create(is_completed=True)
+        self.company = Company.objects.create(name='Cerro Verde')
+        user = User.objects.create(username='kiosko', email='kiosko@cerroverde.com', password='!', company=self.company)
+        Kiosk.objects.bulk_create([
+            Kiosk(
+                company=self.company, user=user, name=f'Kiosko {i}',
+                mac_address=f'02:00:{i >> 16 & 255:02x}:{i >> 8 & 255:02x}:{i & 255:02x}:00',
+                device_type='web'
+            )
+            for i in range(KIOSK_COUNT)
+        ], batch_size=500)
+        self.kiosk_ids = list(Kiosk.objects.filter(company=self.company).order_by('pk').values_list('pk', flat=True))
+
+    async def test_websocket_load(self):
+        company_id = self.company.pk
+        results = {'channel_layer': settings.CHANNEL_LAYERS['default']['BACKEND']}
+
+        kiosks, results['connect_kiosks'] = await connect_all([f'/ws/kiosk/{pk}/' for pk in self.kiosk_ids])
+        displays, results['connect_displays'] = await connect_all([f'/ws/display/{company_id}/'] * DISPLAY_COUNT)
+        technicians, results['connect_technicians'] = await connect_all(
+            [f'/ws/technicians/{company_id}/'] * TECHNICIAN_COUNT
+        )
+
+        results['heartbeat'] = delivery_result(
+            await asyncio.gather(*[heartbeat(communicator) for communicator in kiosks]), HEARTBEAT_ROUNDS, kiosks
+        )
+        results['kiosk_push'] = await push_to_kiosks(kiosks)
+        results['display_broadcast'] = await broadcast(f'display_{company_id}', 'display_message', displays)
+        results['technician_broadcast'] = await broadcast(
+            f'technicians_{company_id}', 'technician_message', technicians
+        )
+        await disconnect_all(kiosks + displays + technicians)
+
+        # Memoria por conexión sobre una muestra de pantallas
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            sample, _ = await connect_all([f'/ws/display/{company_id}/'] * MEMORY_SAMPLE)
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        await disconnect_all(sample)
+        results['memory_per_connection_kb'] = round((after - before) / max(1, len(sample)) / 1024, 2)
+
+        path = save_results('websocket_load', results)
+        print(f'\nBenchmark WebSocket -> {path}')
+        for name, result in results.items():
+            if not isinstance(result, dict):
+                print(f'  {name}: {result}')
+            elif 'connections' in result:
+                print(
+                    f"  {name}: {result['connections']} conexiones p50={result['p50_ms']}ms "
+                    f"p99={result['p99_ms']}ms fallidas={result['failed']}"
+                )
+            else:
+                print(
+                    f"  {name}: p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                    f"p99={result['p99_ms']}ms pérdida={result['drop_rate']:.2%} "
+                    f"conexiones perdidas={result['lost_connections']}"
+                )
+
+        self.assertEqual(results['connect_kiosks']['failed'], 0)
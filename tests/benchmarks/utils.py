@@ -0,0 +1,157 @@
+"""
+Utilidades comunes para los benchmarks de rendimiento
+
+Los benchmarks son tests de Django que se omiten salvo que se defina
+RUN_BENCHMARKS=1, y guardan sus resultados en JSON para comparar commits:
+
+    RUN_BENCHMARKS=1 python manage.py test tests.benchmarks
+"""
+import json
+import os
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from core.db_config import db_executor
+
+BENCHMARKS_ENABLED = bool(os.environ.get('RUN_BENCHMARKS'))
+
+# Decorador para clases/métodos de benchmark
+benchmark = skipUnless(BENCHMARKS_ENABLED, 'Defina RUN_BENCHMARKS=1 para ejecutar los benchmarks')
+
+OUTPUT_DIR = os.environ.get('BENCHMARK_OUTPUT_DIR', 'benchmark_results')
+
+
+def percentile(samples, pct):
+    """Percentil por interpolación lineal (pct entre 0 y 100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples_ms):
+    """Resumen estadístico de una lista de latencias en milisegundos"""
+    return {
+        'iterations': len(samples_ms),
+        'mean_ms': round(statistics.mean(samples_ms), 3) if samples_ms else 0.0,
+        'min_ms': round(min(samples_ms), 3) if samples_ms else 0.0,
+        'max_ms': round(max(samples_ms), 3) if samples_ms else 0.0,
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+    }
+
+
+class ConsumerDatabaseMixin:
+    """
+    Benchmarks de consumers: el pool db_executor se recrea en cada test
+    SQLite admite un solo escritor, por lo que con SQLite el pool usa un hilo
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            settings_override = override_settings(DB_ASYNC_MAX_CONNECTIONS=1)
+            settings_override.enable()
+            self.addCleanup(settings_override.disable)
+        db_executor.shutdown()
+        self.addCleanup(db_executor.shutdown)
+        super().setUp()
+
+
+def measure(func, iterations=20, warmup=2):
+    """
+    Ejecutar func varias veces y devolver latencias y consultas SQL por ejecución
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    queries = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+
+    result = summarize(samples)
+    result['queries_per_call'] = max(queries) if queries else 0
+    return result
+
+
+def measure_concurrent(func, workers=4, calls_per_worker=10):
+    """
+    Ejecutar func desde varios hilos a la vez (p. ej. kioskos simultáneos)
+    Cada hilo usa su propia conexión a la base de datos, que se cierra al
+    terminar. Devuelve latencias, llamadas por segundo y errores.
+    """
+    lock = threading.Lock()
+    samples = []
+    errors = []
+
+    def worker(worker_index):
+        try:
+            for call_index in range(calls_per_worker):
+                start = time.perf_counter()
+                try:
+                    func(worker_index, call_index)
+                except Exception as e:
+                    with lock:
+                        errors.append(f'{type(e).__name__}: {e}')
+                    continue
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    samples.append(elapsed)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+    elapsed = time.perf_counter() - start
+
+    result = summarize(samples)
+    result['workers'] = workers
+    result['calls_per_second'] = round(len(samples) / elapsed, 2) if elapsed else 0.0
+    result['errors'] = len(errors)
+    result['error_samples'] = sorted(set(errors))[:5]
+    return result
+
+
+def current_commit():
+    """Hash del commit actual (si el proyecto es un repositorio git)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name, results):
+    """
+    Guardar resultados en OUTPUT_DIR/<name>.json y devolver la ruta
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, f'{name}.json')
+    payload = {
+        'benchmark': name,
+        'commit': current_commit(),
+        'database': connection.vendor,
+        'timestamp': datetime.now().isoformat(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(payload, output, indent=2, ensure_ascii=False, default=str)
+    return path
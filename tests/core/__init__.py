@@ -0,0 +1 @@
+# Tests del módulo core
@@ -0,0 +1,85 @@
+"""
+Tests para el consumer de kioskos (heartbeats en Redis y en la base de datos)
+"""
+from unittest import mock
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from core.consumers import KIOSK_COMPANY_KEY, KIOSK_PRESENCE_KEY, KioskConsumer
+from core.models import Company, Kiosk, User
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class KioskConsumerHeartbeatTest(TransactionTestCase):
+    """
+    Tests para los heartbeats del KioskConsumer
+    Sin transacción por test: el consumer accede a la base de datos desde el pool db_executor
+    """
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Cerro Verde')
+        user = User.objects.create(username='kiosko', email='kiosko@cerroverde.com', password='!', company=self.company)
+        self.kiosk = Kiosk.objects.create(
+            company=self.company, user=user, name='Kiosko 1', mac_address='02:00:00:00:00:01', device_type='web'
+        )
+        patcher = mock.patch('core.consumers.async_redis_manager')
+        self.redis = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.redis.get_json = mock.AsyncMock(return_value=None)
+        self.redis.set_with_expiry = mock.AsyncMock(return_value=True)
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(KioskConsumer.as_asgi(), f'/ws/kiosk/{self.kiosk.pk}/')
+        communicator.scope['url_route'] = {'kwargs': {'kiosk_id': str(self.kiosk.pk)}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection_established')
+        return communicator
+
+    async def heartbeat(self, communicator):
+        await communicator.send_json_to({'type': 'heartbeat'})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'heartbeat_confirmed')
+
+    @database_sync_to_async
+    def last_heartbeat(self):
+        return Kiosk.objects.values_list('last_heartbeat', flat=True).get(pk=self.kiosk.pk)
+
+    async def test_heartbeats_go_to_redis(self):
+        """Test: Los heartbeats actualizan la presencia en Redis y no escriben en la base de datos"""
+        communicator = await self.connect()
+        connected_at = await self.last_heartbeat()
+        self.assertIsNotNone(connected_at)
+        self.redis.set_with_expiry.assert_any_await(
+            KIOSK_COMPANY_KEY.format(kiosk_id=self.kiosk.pk), self.company.pk, expiry=300
+        )
+
+        await self.heartbeat(communicator)
+        await self.heartbeat(communicator)
+        self.assertEqual(await self.last_heartbeat(), connected_at)
+
+        key, value = self.redis.set_with_expiry.await_args.args
+        self.assertEqual(key, KIOSK_PRESENCE_KEY.format(kiosk_id=self.kiosk.pk))
+        self.assertEqual(value['company_id'], self.company.pk)
+        await communicator.disconnect()
+
+    async def test_cached_company_skips_database(self):
+        """Test: La empresa del kiosko en Redis evita la consulta al conectar"""
+        self.redis.get_json.return_value = self.company.pk
+        with mock.patch.object(KioskConsumer, 'fetch_kiosk_company_id') as fetch:
+            communicator = await self.connect()
+        fetch.assert_not_called()
+        await communicator.disconnect()
+
+    async def test_redis_unavailable_persists_at_interval(self):
+        """Test: Sin Redis el heartbeat se guarda en la base de datos solo cada KIOSK_HEARTBEAT_PERSIST_INTERVAL"""
+        self.redis.set_with_expiry.return_value = False
+        communicator = await self.connect()
+        connected_at = await self.last_heartbeat()
+
+        await self.heartbeat(communicator)
+        self.assertEqual(await self.last_heartbeat(), connected_at)
+
+        with override_settings(KIOSK_HEARTBEAT_PERSIST_INTERVAL=0):
+            await self.heartbeat(communicator)
+        self.assertGreater(await self.last_heartbeat(), connected_at)
+        await communicator.disconnect()
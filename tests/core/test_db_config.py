@@ -0,0 +1,136 @@
+"""
+Tests para la gestión de conexiones (pool asíncrono y ASGI) y el SQL directo de DatabaseManager
+"""
+import asyncio
+import threading
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from core.db_config import DatabaseExecutor, DatabaseManager, configure_asgi_connections
+from tests.core.test_metrics import metric_value
+
+
+class DatabaseExecutorTest(SimpleTestCase):
+    """Tests para DatabaseExecutor"""
+
+    def run_executor(self, coroutine_factory):
+        executor = DatabaseExecutor()
+        self.addCleanup(executor.shutdown)
+        return asyncio.run(coroutine_factory(executor))
+
+    @override_settings(DB_ASYNC_MAX_CONNECTIONS=2)
+    def test_limits_concurrent_operations(self):
+        """Test: Nunca hay más operaciones en curso que DB_ASYNC_MAX_CONNECTIONS, fuera del hilo del bucle"""
+        lock = threading.Lock()
+        running = []
+        peak = []
+        threads = set()
+
+        def operation():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+                threads.add(threading.current_thread().name)
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+            return 'ok'
+
+        waits = metric_value('servicenow_db_async_wait_seconds_count')
+
+        async def main(executor):
+            return await asyncio.gather(*[executor.run(operation) for _ in range(6)])
+
+        self.assertEqual(self.run_executor(main), ['ok'] * 6)
+        self.assertEqual(max(peak), 2)
+        self.assertTrue(all(name.startswith('db-async') for name in threads))
+        self.assertEqual(metric_value('servicenow_db_async_wait_seconds_count'), waits + 6)
+        self.assertEqual(metric_value('servicenow_db_async_connections_in_use'), 0)
+
+    @override_settings(DB_ASYNC_MAX_CONNECTIONS=1, DB_ASYNC_ACQUIRE_TIMEOUT=0.05)
+    def test_queued_operation_times_out(self):
+        """Test: Una operación sin turno a tiempo se cancela sin ejecutarse y se cuenta"""
+        executed = []
+        timeouts = metric_value('servicenow_db_async_timeouts_total')
+
+        async def main(executor):
+            holder = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(asyncio.TimeoutError):
+                await executor.run(executed.append, 1)
+            await holder
+
+        self.run_executor(main)
+        self.assertEqual(executed, [])
+        self.assertEqual(metric_value('servicenow_db_async_timeouts_total'), timeouts + 1)
+
+    @override_settings(DB_ASYNC_MAX_CONNECTIONS=1, DB_ASYNC_ACQUIRE_TIMEOUT=0.05)
+    def test_running_operation_not_interrupted(self):
+        """Test: El tiempo de espera solo aplica a la cola: una operación en curso termina"""
+        async def main(executor):
+            return await executor.run(lambda: time.sleep(0.2) or 'fin')
+
+        self.assertEqual(self.run_executor(main), 'fin')
+
+
+class AsgiConnectionsTest(SimpleTestCase):
+    """Tests para configure_asgi_connections"""
+
+    def test_asgi_conn_max_age(self):
+        """Test: Bajo ASGI las conexiones usan DB_ASGI_CONN_MAX_AGE"""
+        original = {alias: config.get('CONN_MAX_AGE') for alias, config in settings.DATABASES.items()}
+        try:
+            with override_settings(DB_ASGI_CONN_MAX_AGE=0):
+                configure_asgi_connections()
+            self.assertTrue(all(config['CONN_MAX_AGE'] == 0 for config in settings.DATABASES.values()))
+        finally:
+            for alias, max_age in original.items():
+                settings.DATABASES[alias]['CONN_MAX_AGE'] = max_age
+
+
+class DatabaseManagerTest(TestCase):
+    """Tests para el SQL directo de DatabaseManager"""
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE bulk_items (code VARCHAR(20) PRIMARY KEY, quantity INTEGER)')
+
+    def count(self):
+        return DatabaseManager.execute_query('SELECT COUNT(*) AS count FROM bulk_items')[0]['count']
+
+    def test_execute_query_reads_and_writes(self):
+        """Test: Las consultas con filas (incluidas las CTE) retornan diccionarios y las escrituras su conteo"""
+        self.assertEqual(
+            DatabaseManager.execute_query('INSERT INTO bulk_items (code, quantity) VALUES (%s, %s)', ['A', 1]), 1
+        )
+        rows = DatabaseManager.execute_query(
+            'WITH items AS (SELECT code, quantity FROM bulk_items) SELECT code, quantity FROM items'
+        )
+        self.assertEqual(rows, [{'code': 'A', 'quantity': 1}])
+
+    def test_writes_join_outer_transaction(self):
+        """Test: Dentro de una transacción la escritura se revierte con ella"""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            DatabaseManager.execute_query("INSERT INTO bulk_items (code, quantity) VALUES ('A', 1)")
+            raise RuntimeError
+        self.assertEqual(self.count(), 0)
+
+    def test_execute_many_and_iter_query(self):
+        """Test: execute_many acepta un generador por lotes e iter_query lee por bloques"""
+        executed = DatabaseManager.execute_many(
+            'INSERT INTO bulk_items (code, quantity) VALUES (%s, %s)',
+            ((f'C{i:03d}', i) for i in range(25)), batch_size=10
+        )
+        self.assertEqual(executed, 25)
+        rows = list(DatabaseManager.iter_query('SELECT code FROM bulk_items ORDER BY code', chunk_size=7))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[-1], {'code': 'C024'})
+
+    def test_bulk_upsert(self):
+        """Test: bulk_upsert inserta las filas nuevas y actualiza las existentes"""
+        DatabaseManager.execute_query("INSERT INTO bulk_items (code, quantity) VALUES ('A', 1)")
+        DatabaseManager.bulk_upsert('bulk_items', ['code', 'quantity'], [('A', 5), ('B', 2)], ['code'])
+        rows = DatabaseManager.execute_query('SELECT code, quantity FROM bulk_items ORDER BY code')
+        self.assertEqual(rows, [{'code': 'A', 'quantity': 5}, {'code': 'B', 'quantity': 2}])
@@ -0,0 +1,89 @@
+"""
+Tests para el enrutamiento de lecturas de reportes a la réplica
+"""
+from unittest import mock
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from core.db_router import PIN_COOKIE, iter_on_replica, read_replica, track_primary_pin, use_replica
+from core.middleware import ReplicaStickinessMiddleware
+from core.models import Company, Ticket
+
+REPLICA = {'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}
+
+
+def read_alias():
+    """Base de datos a la que iría una lectura en el contexto actual"""
+    return Ticket.objects.all().db
+
+
+class ReplicaRouterTest(TestCase):
+    """Tests para ReplicaRouter y ReplicaStickinessMiddleware"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, REPLICA)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_marked_reads_use_replica(self):
+        """Test: Solo las lecturas marcadas van a la réplica; las escrituras a la principal"""
+        self.assertEqual(read_alias(), 'default')
+        with use_replica():
+            self.assertEqual(read_alias(), 'replica')
+        self.assertEqual(read_replica(read_alias)(), 'replica')
+        self.assertEqual(Company.objects.create(name='Cerro Verde')._state.db, 'default')
+
+    def test_saving_replica_instance_writes_primary(self):
+        """Test: Guardar una instancia leída dentro de use_replica() escribe en la principal"""
+        company = Company.objects.create(name='Cerro Verde')
+        # La réplica de prueba no tiene tablas: marcar la instancia como cargada desde ella
+        company._state.db = 'replica'
+        with use_replica():
+            company.name = 'Cerro Azul'
+            company.save()
+        self.assertEqual(company._state.db, 'default')
+        self.assertEqual(Company.objects.get(pk=company.pk).name, 'Cerro Azul')
+
+    def test_without_replica_alias_reads_primary(self):
+        """Test: Sin alias de réplica en DATABASES todo se lee de la principal"""
+        with mock.patch.dict(settings.DATABASES):
+            del settings.DATABASES['replica']
+            with use_replica():
+                self.assertEqual(read_alias(), 'default')
+
+    def test_reads_after_write_use_primary(self):
+        """Test: Tras escribir, las lecturas de la misma petición van a la principal"""
+        with track_primary_pin(False) as wrote:
+            with use_replica():
+                self.assertEqual(read_alias(), 'replica')
+                Company.objects.create(name='Cerro Verde')
+                self.assertEqual(read_alias(), 'default')
+            self.assertTrue(wrote())
+
+    def test_streaming_iterator_reads_replica(self):
+        """Test: Un iterador consumido fuera de la vista sigue leyendo de la réplica"""
+        aliases = list(iter_on_replica(read_alias() for _ in range(2)))
+        self.assertEqual(aliases, ['replica', 'replica'])
+        self.assertEqual(read_alias(), 'default')
+
+    def test_stickiness_cookie(self):
+        """Test: Una escritura fija al cliente en la principal durante READ_REPLICA_STICKY_SECONDS"""
+        factory = RequestFactory()
+
+        def writing_view(request):
+            Company.objects.create(name='Cerro Verde')
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(writing_view)(factory.post('/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.READ_REPLICA_STICKY_SECONDS)
+
+        def report_view(request):
+            with use_replica():
+                return HttpResponse(read_alias())
+
+        self.assertEqual(ReplicaStickinessMiddleware(report_view)(factory.get('/')).content, b'replica')
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        response = ReplicaStickinessMiddleware(report_view)(request)
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,98 @@
+"""
+Tests para las verificaciones de salud (liveness, readiness y diagnóstico)
+"""
+import threading
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core import health
+from core.models import Company, User
+
+
+@override_settings(HEALTH_READINESS_CHECKS=['database'], HEALTH_CHECK_INTERVAL=60)
+class HealthEndpointsTest(TestCase):
+    """Tests para /health/live, /health/ready y /health/deep"""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Cerro Verde')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@cerroverde.com', password='x',
+            company=company, is_staff=True, can_access=True
+        )
+
+    def setUp(self):
+        health.reset_readiness()
+
+    def test_liveness_without_io(self):
+        """Test: Liveness responde sin consultas aunque el sistema no esté configurado"""
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health-live'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'alive')
+
+    def test_readiness_is_cached(self):
+        """Test: Readiness verifica una vez y reutiliza el resultado dentro del intervalo"""
+        with mock.patch.dict(health.CHECKS, {'database': mock.Mock()}):
+            first = self.client.get(reverse('health-ready'))
+            second = self.client.get(reverse('health-ready'))
+            self.assertEqual(health.CHECKS['database'].call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.json()['checks']['database']['status'], 'ok')
+        self.assertEqual(second.json()['checked_at'], first.json()['checked_at'])
+
+    def test_readiness_failure_returns_503(self):
+        """Test: Una verificación fallida responde 503 con el error"""
+        check = mock.Mock(side_effect=ConnectionError('sin conexión'))
+        with mock.patch.dict(health.CHECKS, {'database': check}):
+            response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['ready'])
+        self.assertEqual(response.json()['checks']['database']['error'], 'sin conexión')
+
+    @override_settings(HEALTH_CHECK_INTERVAL=0)
+    def test_stale_result_refreshed_in_background(self):
+        """Test: Un resultado vencido se entrega y se renueva en segundo plano"""
+        with mock.patch.dict(health.CHECKS, {'database': mock.Mock()}):
+            first = health.readiness()
+            second = health.readiness()
+            health._pending.result(timeout=5)
+            third = health.readiness()
+        self.assertTrue(second['ready'])
+        self.assertNotEqual(third['checked_at'], first['checked_at'])
+
+    @override_settings(HEALTH_CHECK_TIMEOUT=0.05)
+    def test_first_readiness_times_out(self):
+        """Test: Si la primera verificación no termina a tiempo, no está listo"""
+        release = mock.Mock(side_effect=lambda: health.time.sleep(0.3))
+        with mock.patch.dict(health.CHECKS, {'database': release}):
+            result = health.readiness()
+            health._pending.result(timeout=5)
+        self.assertFalse(result['ready'])
+
+    @override_settings(HEALTH_CHECK_INTERVAL=0.1, HEALTH_CHECK_TIMEOUT=0.2)
+    def test_hung_check_is_not_ready(self):
+        """Test: Si la renovación se bloquea, el resultado anterior deja de contar como listo"""
+        release = threading.Event()
+        with mock.patch.dict(health.CHECKS, {'database': mock.Mock()}):
+            self.assertTrue(health.readiness()['ready'])
+        with mock.patch.dict(health.CHECKS, {'database': mock.Mock(side_effect=lambda: release.wait(5))}):
+            health.time.sleep(0.15)
+            self.assertTrue(health.readiness()['ready'])
+            health.time.sleep(0.25)
+            result = health.readiness()
+            release.set()
+            health._pending.result(timeout=5)
+        self.assertFalse(result['ready'])
+        self.assertIn('error', result)
+
+    def test_deep_diagnostics_requires_staff(self):
+        """Test: El diagnóstico completo es solo para el personal administrativo"""
+        self.assertEqual(self.client.get(reverse('health-deep')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        with mock.patch('core.redis_config.RedisManager.health_check', return_value={'status': 'healthy'}):
+            response = self.client.get(reverse('health-deep'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['readiness']['ready'])
+        self.assertEqual(response.json()['database']['status'], 'healthy')
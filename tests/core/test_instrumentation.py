@@ -0,0 +1,127 @@
+"""
+Tests para la instrumentación por petición (SQL, caché, Server-Timing y métricas)
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from core.instrumentation import CacheMetricsMixin, measure_request, request_metrics_snapshot
+from core.metrics import REGISTRY, Histogram, bucket_quantile, collector, render_metrics
+from core.models import Company, SystemSetup, TicketCategory, User
+
+
+def view_snapshot(view_name):
+    """Métricas agregadas de una vista (None si aún no tiene peticiones)"""
+    return request_metrics_snapshot()['views'].get(view_name)
+
+
+def view_requests(view_name):
+    view = view_snapshot(view_name)
+    return view['requests'] if view else 0
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    """Caché local con conteo de aciertos y fallos"""
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_SERVER_TIMING=True)
+class RequestMetricsMiddlewareTest(TestCase):
+    """Tests para RequestMetricsMiddleware y el endpoint de métricas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        TicketCategory.objects.create(company=cls.company, name='Soporte')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@cerroverde.com', password='x',
+            company=cls.company, is_staff=True, can_access=True
+        )
+        cls.user = User.objects.create_user(
+            username='user', email='user@cerroverde.com', password='x',
+            company=cls.company, can_access=True
+        )
+
+    def test_server_timing_header(self):
+        """Test: La respuesta incluye el conteo y tiempo de SQL y la latencia total"""
+        with self.assertNumQueries(3) as captured:
+            response = self.client.get(reverse('kiosk_categories'))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(captured.captured_queries)} queries"', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(INSTRUMENTATION_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Test: Sin INSTRUMENTATION_SERVER_TIMING la petición se mide pero no expone sus tiempos"""
+        requests = view_requests('kiosk_categories')
+        response = self.client.get(reverse('kiosk_categories'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(view_requests('kiosk_categories'), requests + 1)
+
+    def test_requests_are_aggregated_by_view(self):
+        """Test: Las peticiones medidas se registran en los histogramas de core.metrics con la vista como etiqueta"""
+        before = view_snapshot('kiosk_categories') or {
+            'requests': 0, 'sql_queries': {'sum': 0}, 'latency_seconds': {'buckets': [['+Inf', 0]]}
+        }
+        for _ in range(3):
+            self.client.get(reverse('kiosk_categories'))
+        view = view_snapshot('kiosk_categories')
+        self.assertEqual(view['requests'], before['requests'] + 3)
+        self.assertEqual(view['sql_queries']['sum'], before['sql_queries']['sum'] + 9)
+        self.assertEqual(view['latency_seconds']['buckets'][-1], ['+Inf', before['latency_seconds']['buckets'][-1][1] + 3])
+        self.assertIn(
+            f'servicenow_request_duration_seconds_count{{view="kiosk_categories"}} {view["requests"]}', render_metrics()
+        )
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        """Test: Sin muestreo no hay cabecera ni métricas"""
+        requests = view_requests('kiosk_categories')
+        response = self.client.get(reverse('kiosk_categories'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(view_requests('kiosk_categories'), requests)
+
+    def test_metrics_endpoint_requires_staff(self):
+        """Test: Solo el personal administrativo consulta las métricas por vista"""
+        self.client.get(reverse('kiosk_categories'))
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('request-metrics')).status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('request-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('kiosk_categories', response.json()['views'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'tests.core.test_instrumentation.InstrumentedLocMemCache'}})
+class InstrumentationUnitTest(TestCase):
+    """Tests para los contadores de caché y los histogramas"""
+
+    def test_cache_hits_and_misses(self):
+        """Test: get y get_many cuentan aciertos y fallos solo en la petición medida"""
+        cache = caches['default']
+        cache.set('a', 1)
+        cache.set('b', None)
+        with measure_request() as metrics:
+            self.assertEqual(cache.get('a'), 1)
+            self.assertIsNone(cache.get('b', 'x'))
+            self.assertEqual(cache.get('c', 'x'), 'x')
+            self.assertEqual(cache.get_many(['a', 'c']), {'a': 1})
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (3, 2))
+        self.assertEqual(cache.get('c'), None)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (3, 2))
+
+    def test_histogram_series_and_quantiles(self):
+        """Test: Las series se leen acumuladas y los cuantiles se estiman por bucket"""
+        histogram = Histogram('test_quantiles_seconds', 'Histograma de prueba', ['view'], buckets=(10, 100))
+        self.addCleanup(REGISTRY.pop, 'test_quantiles_seconds')
+        for value in [1, 5, 50, 500]:
+            histogram.observe(value, view='a')
+        counters, _ = collector.collect()
+        data = histogram.series(counters)[('a',)]
+        self.assertEqual(data['buckets'], [('10.0', 2), ('100.0', 3), ('+Inf', 4)])
+        self.assertEqual((data['count'], data['sum']), (4, 556))
+        self.assertEqual(bucket_quantile(data['buckets'], 0.5), 10)
+        self.assertEqual(bucket_quantile(data['buckets'], 0.99), 100)
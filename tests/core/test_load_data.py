@@ -0,0 +1,91 @@
+"""
+Tests para el comando load_data (datos sintéticos para pruebas de capacidad)
+"""
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from core.load_data import parse_mix, skewed_weights
+from core.models import Company, Role, User, UserRole, TicketCategory, Ticket, TicketTurn, AuthLoginAudit, UserSearchToken
+
+TICKET_FIELDS = ['code', 'requester__username', 'category__name', 'status', 'priority', 'created_at', 'updated_at']
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoadDataCommandTest(TestCase):
+    """Tests para load_data"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        Role.objects.create(company=cls.company, key='user', name='Usuario')
+        for name in ['Soporte TI', 'Recursos Humanos', 'Logística']:
+            TicketCategory.objects.create(company=cls.company, name=name)
+    
+    def load(self, **options):
+        options = {
+            'company_id': self.company.pk, 'users': 30, 'days': 7, 'end_date': date(2025, 3, 9),
+            'tickets_per_day': 20, 'logins_per_day': 10, 'workers': 1, 'batch_size': 25,
+            'stdout': StringIO(), **options,
+        }
+        call_command('load_data', **options)
+    
+    def test_generates_all_datasets(self):
+        """Test: Usuarios con rol, tickets con turno, auditorías y fechas históricas"""
+        self.load(status_mix='open=1,closed=1', turn_ratio=1.0)
+        
+        users = User.objects.filter(username__startswith='load1.')
+        self.assertEqual(users.count(), 30)
+        self.assertEqual(UserRole.objects.filter(user__in=users).count(), 30)
+        self.assertTrue(UserSearchToken.objects.filter(user__in=users).exists())
+        
+        tickets = Ticket.objects.filter(company=self.company)
+        self.assertGreater(tickets.count(), 50)
+        self.assertEqual(set(tickets.values_list('status', flat=True)), {'open', 'closed'})
+        self.assertEqual(TicketTurn.objects.filter(ticket__company=self.company).count(), tickets.count())
+        self.assertFalse(TicketTurn.objects.filter(ticket__status='open', is_called=True).exists())
+        self.assertGreater(AuthLoginAudit.objects.count(), 0)
+        
+        created = {ticket.created_at.date() for ticket in tickets}
+        self.assertEqual(min(created), date(2025, 3, 3))
+        self.assertEqual(max(created), date(2025, 3, 9))
+        
+        # Turnos numerados por categoría y día
+        turn = TicketTurn.objects.filter(turn_number=2).select_related('ticket').first()
+        self.assertTrue(TicketTurn.objects.filter(
+            turn_number=1, ticket__category=turn.ticket.category,
+            ticket__created_at__date=turn.ticket.created_at.date(),
+        ).exists())
+    
+    def test_deterministic_with_seed(self):
+        """Test: La misma semilla genera los mismos datos"""
+        self.load(seed=7)
+        first = list(Ticket.objects.order_by('code').values_list(*TICKET_FIELDS))
+        Ticket.objects.all().delete()
+        User.objects.filter(username__startswith='load7.').delete()
+        
+        self.load(seed=7)
+        self.assertEqual(list(Ticket.objects.order_by('code').values_list(*TICKET_FIELDS)), first)
+    
+    def test_existing_seed_rejected(self):
+        """Test: No se reutiliza una semilla con datos ya generados"""
+        self.load(days=0)
+        with self.assertRaises(CommandError):
+            self.load(days=0)
+    
+    def test_distribution_knobs(self):
+        """Test: Distribuciones de estado y sesgo de categorías"""
+        self.assertEqual(parse_mix('open=20, closed=80', ['open', 'closed']), {'open': 20.0, 'closed': 80.0})
+        with self.assertRaises(ValueError):
+            parse_mix('abierto=1', ['open'])
+        self.assertEqual(skewed_weights(3, 0), [1.0, 1.0, 1.0])
+        self.assertEqual(skewed_weights(3, 1), [1.0, 0.5, 1 / 3])
+        
+        self.load(users=10, category_skew=3.0, tickets_per_day=100, logins_per_day=0)
+        counts = [
+            Ticket.objects.filter(category__name=name).count()
+            for name in ['Soporte TI', 'Recursos Humanos', 'Logística']
+        ]
+        self.assertGreater(counts[0], counts[1] + counts[2])
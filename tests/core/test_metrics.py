@@ -0,0 +1,172 @@
+"""
+Tests para las métricas de Prometheus (/metrics)
+"""
+import asyncio
+import json
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.consumers import DisplayConsumer
+from core.metrics import Counter, Histogram, MetricsCollector, REGISTRY, collector, render_metrics
+from core.models import Company, SystemSetup, Ticket, TicketCategory, TicketSubcategory, TicketTurn, User
+from core.views.tickets import repeats_earlier_turn
+
+
+def metric_value(name, **labels):
+    """Valor actual de una serie (contador o gauge) del proceso"""
+    counters, gauges = collector.collect()
+    values = {**counters, **gauges}
+    metric = REGISTRY.get(name)
+    if metric is None:
+        # Series de histogramas (_count, _sum)
+        metric = REGISTRY[name.rsplit('_', 1)[0]]
+    key = tuple(str(labels.get(label, '')) for label in metric.labelnames)
+    return values.get((name, key), 0)
+
+
+class MetricsRenderTest(TestCase):
+    """Tests para el formato de exposición"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.counter = Counter('test_render_total', 'Contador de prueba', ['kind'])
+        cls.histogram = Histogram('test_render_seconds', 'Histograma de prueba', buckets=(0.1, 1))
+
+    @classmethod
+    def tearDownClass(cls):
+        REGISTRY.pop('test_render_total')
+        REGISTRY.pop('test_render_seconds')
+        super().tearDownClass()
+
+    def test_counter_and_histogram_exposition(self):
+        """Test: Contadores con labels escapados e histogramas con buckets acumulados"""
+        self.counter.inc(kind='a"b')
+        for value in [0.05, 0.5, 5]:
+            self.histogram.observe(value)
+
+        text = render_metrics([('test_up', 'gauge', 'Arriba', 1)])
+        self.assertIn('# TYPE test_render_total counter', text)
+        self.assertIn('test_render_total{kind="a\\"b"} 1', text)
+        self.assertIn('test_render_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_render_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_render_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_render_seconds_count 3', text)
+        self.assertIn('test_render_seconds_sum 5.55', text)
+        self.assertIn('test_up 1', text)
+
+    def test_timer_as_decorator(self):
+        """Test: time() mide cada llamada de la función decorada"""
+        @self.histogram.time()
+        def work():
+            return 'ok'
+
+        before = metric_value('test_render_seconds_count')
+        self.assertEqual(work(), 'ok')
+        self.assertEqual(work(), 'ok')
+        self.assertEqual(metric_value('test_render_seconds_count'), before + 2)
+
+
+class MetricsFlushTest(SimpleTestCase):
+    """Tests para el envío de métricas a Redis"""
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0.05)
+    def test_gauges_flushed_from_event_loop(self):
+        """Test: Los gauges registrados solo desde el bucle de eventos se envían en segundo plano"""
+        metrics_collector = MetricsCollector()
+        client = mock.MagicMock()
+        pipe = client.pipeline.return_value
+
+        async def main():
+            metrics_collector.add_gauge('test_ws_connections', ('kiosk', '1'), 1)
+            self.assertFalse(pipe.execute.called)
+            await asyncio.sleep(0.3)
+
+        with mock.patch.object(metrics_collector, 'get_redis', return_value=client):
+            asyncio.run(main())
+        self.assertGreaterEqual(pipe.execute.call_count, 2)
+        pipe.hset.assert_called_with(
+            f'metrics:gauges:{metrics_collector.process_id}',
+            mapping={json.dumps(['test_ws_connections', ['kiosk', '1']], separators=(',', ':')): 1}
+        )
+
+
+class MetricsEndpointTest(TestCase):
+    """Tests para el endpoint /metrics y las métricas de tickets"""
+
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        cls.category = TicketCategory.objects.create(company=cls.company, name='Soporte')
+        cls.subcategory = TicketSubcategory.objects.create(category=cls.category, name='Impresoras')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@cerroverde.com', password='x',
+            company=cls.company, is_staff=True, can_access=True
+        )
+
+    def test_ticket_issuance_metrics(self):
+        """Test: Generar un ticket cuenta el ticket y mide la emisión y el turno"""
+        issued = metric_value('servicenow_tickets_issued_total', company=self.company.pk)
+        issuance = metric_value('servicenow_ticket_issuance_seconds_count')
+        allocation = metric_value('servicenow_turn_allocation_seconds_count')
+
+        response = self.client.post(reverse('generate-ticket-order'), json.dumps({
+            'company_id': self.company.pk, 'category_id': self.category.pk, 'subcategory_id': self.subcategory.pk,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(metric_value('servicenow_tickets_issued_total', company=self.company.pk), issued + 1)
+        self.assertEqual(metric_value('servicenow_ticket_issuance_seconds_count'), issuance + 1)
+        self.assertEqual(metric_value('servicenow_turn_allocation_seconds_count'), allocation + 1)
+
+    def test_turn_collision_counted_once(self):
+        """Test: Dos turnos con el mismo número cuentan una colisión, desde el turno posterior"""
+        turns = []
+        for _ in range(2):
+            ticket = Ticket.objects.create(
+                company=self.company, requester=self.admin, category=self.category, subcategory=self.subcategory
+            )
+            turns.append(TicketTurn.objects.create(ticket=ticket, turn_number=1))
+        today = timezone.localdate()
+        self.assertFalse(repeats_earlier_turn(turns[0], self.category, today))
+        self.assertTrue(repeats_earlier_turn(turns[1], self.category, today))
+
+    def test_metrics_exposition(self):
+        """Test: /metrics expone las métricas definidas y el estado de la base de datos"""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        for name in REGISTRY:
+            self.assertIn(f'# TYPE {name} ', text)
+        self.assertIn('servicenow_database_up 1', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_access(self):
+        """Test: Solo IPs permitidas o personal administrativo"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 200)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class WebSocketMetricsTest(TestCase):
+    """Tests para el gauge de conexiones WebSocket"""
+
+    async def test_connections_gauge(self):
+        """Test: Las conexiones abiertas se cuentan por consumer y empresa"""
+        labels = {'consumer': 'display', 'company': '7'}
+        before = metric_value('servicenow_websocket_connections', **labels)
+
+        communicator = WebsocketCommunicator(DisplayConsumer.as_asgi(), '/ws/display/7/')
+        communicator.scope['url_route'] = {'kwargs': {'company_id': '7'}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(metric_value('servicenow_websocket_connections', **labels), before + 1)
+
+        await communicator.disconnect()
+        self.assertEqual(metric_value('servicenow_websocket_connections', **labels), before)
@@ -0,0 +1,56 @@
+"""
+Tests para el hashing de contraseñas por lotes
+"""
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase, override_settings
+from core import passwords
+from core.passwords import hash_passwords, hashing_pool
+
+MD5_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+@override_settings(PASSWORD_HASHERS=[MD5_HASHER])
+class HashPasswordsTest(SimpleTestCase):
+    """Tests para core.passwords.hash_passwords"""
+    
+    def test_unique_salts_for_shared_password(self):
+        """Test: Una contraseña repetida recibe una sal distinta por usuario"""
+        hashes = hash_passwords(['changeme123'] * 5, hasher_path=MD5_HASHER, workers=1)
+        self.assertEqual(len(set(hashes)), 5)
+        self.assertTrue(all(check_password('changeme123', encoded) for encoded in hashes))
+    
+    def test_order_preserved(self):
+        """Test: Los hashes se retornan en el orden de las contraseñas"""
+        values = ['a1', 'b2', 'a1', 'c3', 'b2']
+        hashes = hash_passwords(values, hasher_path=MD5_HASHER, workers=2)
+        for value, encoded in zip(values, hashes):
+            self.assertTrue(check_password(value, encoded))
+    
+    def test_empty(self):
+        """Test: Sin contraseñas no se hace nada"""
+        self.assertEqual(hash_passwords([]), [])
+    
+    def test_process_pool(self):
+        """Test: Con suficientes contraseñas se reparten entre procesos"""
+        values = ['changeme123'] * 20 + ['otra-clave'] * 4
+        hashes = hash_passwords(values, hasher_path=MD5_HASHER, workers=2)
+        self.assertEqual(len(set(hashes)), len(values))
+        for value, encoded in zip(values, hashes):
+            self.assertTrue(check_password(value, encoded))
+    
+    def test_falls_back_without_pool(self):
+        """Test: Si el pool no está disponible se hashea en el proceso actual"""
+        with mock.patch.object(passwords, 'ProcessPoolExecutor', side_effect=OSError('sin procesos')):
+            hashes = hash_passwords(['changeme123'] * 20, hasher_path=MD5_HASHER, workers=4)
+        self.assertTrue(all(check_password('changeme123', encoded) for encoded in hashes))
+    
+    def test_shared_pool_reused(self):
+        """Test: Un pool de hashing_pool se reutiliza entre llamadas sin crear otro"""
+        with hashing_pool(workers=2) as pool:
+            with mock.patch.object(passwords, 'ProcessPoolExecutor', side_effect=AssertionError('pool nuevo')):
+                first = hash_passwords(['changeme123'] * 20, hasher_path=MD5_HASHER, pool=pool)
+                second = hash_passwords(['otra-clave'] * 20, hasher_path=MD5_HASHER, pool=pool)
+        self.assertTrue(all(check_password('changeme123', encoded) for encoded in first))
+        self.assertTrue(all(check_password('otra-clave', encoded) for encoded in second))
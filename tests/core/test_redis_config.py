@@ -0,0 +1,159 @@
+"""
+Tests para la fábrica de conexiones a Redis (pools compartidos por proceso)
+"""
+import asyncio
+import weakref
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+import redis
+from django_redis import get_redis_connection
+from core import redis_config
+from core.redis_config import (
+    AsyncRedisManager, CircuitBreaker, RedisManager, RedisUnavailable, get_async_redis_client, get_redis_client
+)
+
+
+@override_settings(
+    REDIS_PASSWORD='secreto', REDIS_POOL_MAX_CONNECTIONS=7, REDIS_POOL_TIMEOUT=3,
+    REDIS_SOCKET_TIMEOUT=4, REDIS_SOCKET_CONNECT_TIMEOUT=1, REDIS_HEALTH_CHECK_INTERVAL=15
+)
+class RedisConnectionFactoryTest(SimpleTestCase):
+    """Tests para get_redis_client y get_async_redis_client"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(redis_config._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        async_patcher = mock.patch.object(redis_config, '_async_pools', weakref.WeakKeyDictionary())
+        async_patcher.start()
+        self.addCleanup(async_patcher.stop)
+
+    def test_sync_client_falls_back_to_bounded_pool(self):
+        """Test: Sin caché django-redis los clientes del proceso comparten un pool con los límites de settings"""
+        client = get_redis_client()
+        pool = client.connection_pool
+        self.assertIs(get_redis_client().connection_pool, pool)
+        self.assertEqual(pool.max_connections, 7)
+        self.assertEqual(pool.timeout, 3)
+        kwargs = pool.connection_kwargs
+        self.assertEqual(kwargs['password'], 'secreto')
+        self.assertEqual(kwargs['socket_timeout'], 4)
+        self.assertEqual(kwargs['socket_connect_timeout'], 1)
+        self.assertEqual(kwargs['health_check_interval'], 15)
+
+    def test_sync_client_uses_cache_pool(self):
+        """Test: Con la caché en django-redis, get_redis_client y RedisManager usan el pool de la caché"""
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'core.instrumentation.InstrumentedRedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+            'OPTIONS': {'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool'},
+        }}):
+            pool = get_redis_connection('default').connection_pool
+            self.assertIs(get_redis_client().connection_pool, pool)
+            self.assertIs(RedisManager().redis_client.connection_pool, pool)
+        self.assertEqual(redis_config._pools, {})
+
+    def test_async_pool_per_event_loop(self):
+        """Test: Cada bucle de eventos tiene su propio pool asíncrono"""
+        async def pools():
+            return get_async_redis_client().connection_pool, get_async_redis_client().connection_pool
+
+        first, same = asyncio.run(pools())
+        other, _ = asyncio.run(pools())
+        self.assertIs(first, same)
+        self.assertIsNot(first, other)
+        self.assertEqual(first.max_connections, 7)
+
+
+@override_settings(REDIS_BREAKER_SECONDS=10, REDIS_BREAKER_MAX_SECONDS=25)
+class CircuitBreakerTest(SimpleTestCase):
+    """Tests para el circuit breaker de los pools asíncronos"""
+
+    def test_backoff_and_single_probe(self):
+        """Test: Tras un fallo corta las llamadas, duplica la espera y deja pasar una sola prueba"""
+        breaker = CircuitBreaker()
+        breaker.before_call()
+        with mock.patch('core.redis_config.time.monotonic', return_value=100):
+            breaker.record_failure()
+            self.assertEqual(breaker.open_until, 110)
+            with self.assertRaises(RedisUnavailable):
+                breaker.before_call()
+        with mock.patch('core.redis_config.time.monotonic', return_value=111):
+            breaker.before_call()
+            with self.assertRaises(RedisUnavailable):
+                breaker.before_call()
+            breaker.record_failure()
+            self.assertEqual(breaker.open_until, 131)
+            breaker.record_failure()
+            self.assertEqual(breaker.open_until, 136)
+        breaker.record_success()
+        breaker.before_call()
+
+    def test_manager_short_circuits_while_redis_is_down(self):
+        """Test: Con Redis caído el gestor asíncrono no intenta conectar en cada llamada"""
+        breaker = CircuitBreaker()
+        connect = mock.AsyncMock(side_effect=redis.exceptions.ConnectionError('Connection refused'))
+        manager = AsyncRedisManager()
+
+        async def heartbeats():
+            return [await manager.set_with_expiry('kiosk:presence:1', {'a': 1}, expiry=90) for _ in range(5)]
+
+        with mock.patch.object(redis_config, 'async_breaker', breaker), \
+                mock.patch('redis.asyncio.BlockingConnectionPool.get_connection', connect), \
+                self.assertLogs('core.redis_config', level='ERROR') as logs:
+            self.assertEqual(asyncio.run(heartbeats()), [False] * 5)
+        self.assertEqual(connect.await_count, 1)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(breaker.failures, 1)
+
+
+class RedisManagerTest(SimpleTestCase):
+    """Tests para las operaciones en lote de RedisManager (cliente simulado)"""
+
+    def setUp(self):
+        self.manager = RedisManager()
+        self.client = self.manager.redis_client = mock.MagicMock()
+        self.pipe = self.client.pipeline.return_value
+
+    def test_delete_pattern_scans_and_unlinks_in_batches(self):
+        """Test: delete_pattern usa SCAN y UNLINK por lotes, nunca KEYS"""
+        self.client.scan_iter.return_value = iter([f'tenant:1:{i}' for i in range(5)])
+        self.client.unlink.side_effect = lambda *keys: len(keys)
+
+        self.assertEqual(self.manager.delete_pattern('tenant:1:*', batch_size=2), 5)
+        self.client.scan_iter.assert_called_once_with(match='tenant:1:*', count=2)
+        self.assertEqual([len(call.args) for call in self.client.unlink.call_args_list], [2, 2, 1])
+        self.client.keys.assert_not_called()
+
+    def test_hashes_and_sets_decoded(self):
+        """Test: Sobre el pool de la caché (bytes) hashes y sets se retornan como texto"""
+        self.client.hgetall.return_value = {b'estado': b'activo'}
+        self.client.smembers.return_value = {b'a', b'b'}
+        self.assertEqual(self.manager.get_hash('kiosko:1'), {'estado': 'activo'})
+        self.assertEqual(self.manager.get_set_members('kioskos'), {'a', 'b'})
+
+    def test_write_and_expire_in_one_transaction(self):
+        """Test: Escritura y EXPIRE van en la misma transacción"""
+        self.pipe.execute.return_value = [3, True]
+        self.assertEqual(self.manager.increment_counter('visitas', expiry=60), 3)
+        self.client.pipeline.assert_called_once_with(transaction=True)
+        self.pipe.incr.assert_called_once_with('visitas', 1)
+        self.pipe.expire.assert_called_once_with('visitas', 60)
+        self.client.expire.assert_not_called()
+
+        self.manager.add_to_set('online', 'a', 'b')
+        self.client.sadd.assert_called_once_with('online', 'a', 'b')
+        self.assertEqual(self.client.pipeline.call_count, 1)
+
+    def test_mget_and_mset_json(self):
+        """Test: mget_json y mset_json leen y escriben varias claves en un solo viaje"""
+        self.client.mget.return_value = ['{"a": 1}', None, 'no-json']
+        self.assertEqual(self.manager.mget_json(['x', 'y', 'z']), {'x': {'a': 1}})
+        self.client.mget.assert_called_once_with(['x', 'y', 'z'])
+
+        self.assertTrue(self.manager.mset_json({'x': [1]}))
+        self.client.mset.assert_called_once_with({'x': '[1]'})
+
+        self.pipe.execute.return_value = [True, True]
+        self.assertTrue(self.manager.mset_json({'x': 1, 'y': 2}, expiry=30))
+        self.pipe.set.assert_any_call('y', '2', ex=30)
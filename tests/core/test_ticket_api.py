@@ -0,0 +1,131 @@
+"""
+Tests para el API de tickets (modo lean, sparse fieldsets y número de consultas)
+"""
+from unittest import mock
+from django.test import TestCase
+from django.urls import resolve, reverse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import (
+    Company, SystemSetup, User, Role, UserRole, Ticket,
+    TicketCategory, TicketSubcategory, TicketTemplate, TicketTemplateField
+)
+from core.views import TicketViewSet
+
+
+class TicketAPITestMixin:
+    """Datos comunes para los tests del API de tickets"""
+    
+    ticket_count = 100
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        role = Role.objects.create(company=cls.company, key='user', name='Usuario')
+        technician_role = Role.objects.create(company=cls.company, key='technician', name='Técnico')
+        cls.category = TicketCategory.objects.create(company=cls.company, name='Soporte')
+        cls.subcategory = TicketSubcategory.objects.create(category=cls.category, name='Impresoras')
+        
+        users = []
+        for i in range(10):
+            user = User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@cerroverde.com', password='x',
+                first_name=f'Nombre{i}', last_name='Apellido', company=cls.company
+            )
+            UserRole.objects.create(user=user, role=technician_role if i % 2 else role)
+            users.append(user)
+        cls.user = users[0]
+        
+        for i in range(cls.ticket_count):
+            Ticket.objects.create(
+                company=cls.company,
+                requester=users[i % 10],
+                assigned_to=users[(i + 1) % 10] if i % 3 else None,
+                category=cls.category,
+                subcategory=cls.subcategory if i % 2 else None,
+                status='open',
+            )
+    
+    def list_tickets(self, params):
+        view = TicketViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get('/api/tickets/', params)
+        force_authenticate(request, user=self.user)
+        with mock.patch.object(PageNumberPagination, 'page_size', self.ticket_count):
+            response = view(request)
+            response.render()
+        return response
+
+
+class TicketListAPITest(TicketAPITestMixin, TestCase):
+    """Tests para el listado de tickets"""
+    
+    def test_lean_mode_returns_flat_fields(self):
+        """Test: El modo lean devuelve ids planos y nombres"""
+        response = self.list_tickets({'mode': 'lean'})
+        self.assertEqual(response.status_code, 200)
+        ticket = response.data['results'][0]
+        self.assertIsInstance(ticket['requester'], int)
+        self.assertEqual(ticket['category_name'], 'Soporte')
+        self.assertIn('requester_name', ticket)
+        self.assertNotIn('form_data', ticket)
+    
+    def test_sparse_fieldset(self):
+        """Test: ?fields= limita los campos serializados"""
+        response = self.list_tickets({'fields': 'id,code,status'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'code', 'status'})
+        
+        response = self.list_tickets({'mode': 'lean', 'fields': 'code,category_name'})
+        self.assertEqual(set(response.data['results'][0]), {'code', 'category_name'})
+    
+    def test_lean_page_uses_constant_queries(self):
+        """Test: Una página de 100 tickets en modo lean usa un número constante de consultas"""
+        # COUNT de paginación + SELECT con joins
+        with self.assertNumQueries(2):
+            response = self.list_tickets({'mode': 'lean'})
+        self.assertEqual(len(response.data['results']), self.ticket_count)
+    
+    def test_sparse_fields_skip_unneeded_joins(self):
+        """Test: Campos sin relaciones no agregan joins ni consultas"""
+        with self.assertNumQueries(2):
+            response = self.list_tickets({'fields': 'id,code,category,subcategory'})
+        self.assertEqual(response.data['results'][0]['category']['name'], 'Soporte')
+    
+    def test_full_page_uses_constant_queries(self):
+        """Test: El modo completo sirve los roles desde el prefetch"""
+        # COUNT + SELECT con joins + prefetch de roles de requester y assigned_to (2 c/u)
+        with self.assertNumQueries(6):
+            response = self.list_tickets({})
+        ticket = response.data['results'][0]
+        self.assertIn(ticket['requester']['roles'][0]['key'], ['user', 'technician'])
+
+
+class KioskTemplatesAPITest(TestCase):
+    """Tests para el catálogo de plantillas del kiosko"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        template = TicketTemplate.objects.create(company=cls.company, name='Soporte')
+        TicketTemplateField.objects.create(template=template, name='motivo', label='Motivo', field_type='text', order_no=2)
+        TicketTemplateField.objects.create(template=template, name='area', label='Área', field_type='text', order_no=1)
+        for i in range(3):
+            category = TicketCategory.objects.create(company=cls.company, name=f'Categoría {i}', template=template)
+            TicketSubcategory.objects.create(category=category, name='Activa')
+            TicketSubcategory.objects.create(category=category, name='Inactiva', is_active=False)
+    
+    def test_templates_url_is_not_captured_by_router(self):
+        """Test: /api/kiosks/templates/ resuelve a la vista de plantillas"""
+        self.assertEqual(resolve(reverse('kiosk-templates')).url_name, 'kiosk-templates')
+        self.assertEqual(resolve(reverse('generate-ticket-order')).url_name, 'generate-ticket-order')
+    
+    def test_templates_use_constant_queries(self):
+        """Test: El catálogo incluye subcategorías activas y la plantilla de la categoría en consultas fijas"""
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('kiosk-templates'), {'company_id': self.company.pk})
+        self.assertEqual(response.status_code, 200)
+        categories = response.json()['categories']
+        self.assertEqual(len(categories), 3)
+        subcategories = categories[0]['subcategories']
+        self.assertEqual([sub['name'] for sub in subcategories], ['Activa'])
+        self.assertEqual([field['name'] for field in subcategories[0]['template']['fields']], ['area', 'motivo'])
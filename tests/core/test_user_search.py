@@ -0,0 +1,95 @@
+"""
+Tests para el índice de búsqueda del directorio de usuarios
+"""
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import Company, User, UserSearchToken
+from core.search import normalize_text, tokenize, search_users
+from core.views import UserViewSet
+
+
+class NormalizationTest(TestCase):
+    """Tests para la normalización de texto"""
+    
+    def test_normalize_folds_accents_and_case(self):
+        """Test: Se eliminan acentos y mayúsculas"""
+        self.assertEqual(normalize_text('José PEÑA Núñez'), 'jose pena nunez')
+    
+    def test_tokenize_splits_on_punctuation(self):
+        """Test: Los tokens se separan por caracteres no alfanuméricos"""
+        self.assertEqual(tokenize('j.perez@CerroVerde.com'), ['j', 'perez', 'cerroverde', 'com'])
+        self.assertEqual(tokenize('  '), [])
+
+
+class UserSearchIndexTest(TestCase):
+    """Tests para el índice de búsqueda por prefijo"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        cls.other_company = Company.objects.create(name='Otra Empresa')
+        cls.jose = User.objects.create_user(
+            username='jpena', email='jose.pena@cerroverde.com', password='x',
+            first_name='José', last_name='Peña', company=cls.company,
+            employee_number='E-1001', sap_id='SAP778', department='Mantenimiento',
+            location='Arequipa'
+        )
+        cls.maria = User.objects.create_user(
+            username='mlopez', email='maria.lopez@cerroverde.com', password='x',
+            first_name='María', last_name='López', company=cls.company,
+            employee_number='E-2002', sap_id='SAP990', department='Tecnología',
+            location='Lima'
+        )
+        cls.outsider = User.objects.create_user(
+            username='jperalta', email='jperalta@otra.com', password='x',
+            first_name='Jorge', last_name='Peralta', company=cls.other_company
+        )
+    
+    def test_tokens_created_on_save(self):
+        """Test: Guardar un usuario genera sus tokens"""
+        tokens = set(UserSearchToken.objects.filter(user=self.jose).values_list('token', flat=True))
+        self.assertIn('pena', tokens)
+        self.assertIn('sap778', tokens)
+        self.assertIn('mantenimiento', tokens)
+    
+    def test_tokens_updated_on_change(self):
+        """Test: Cambiar un campo indexado actualiza los tokens"""
+        self.jose.department = 'Operaciones'
+        self.jose.save()
+        self.assertEqual(search_users(User.objects.all(), 'manten').count(), 0)
+        self.assertEqual(list(search_users(User.objects.all(), 'operac')), [self.jose])
+    
+    def test_accent_insensitive_prefix_search(self):
+        """Test: La búsqueda ignora acentos y usa prefijos"""
+        self.assertEqual(list(search_users(User.objects.all(), 'Pena')), [self.jose])
+        self.assertEqual(list(search_users(User.objects.all(), 'lóp')), [self.maria])
+        self.assertEqual(list(search_users(User.objects.all(), 'sap99')), [self.maria])
+    
+    def test_all_terms_must_match(self):
+        """Test: Cada término debe coincidir con algún token"""
+        results = search_users(User.objects.all(), 'jose mant')
+        self.assertEqual(list(results), [self.jose])
+        self.assertEqual(search_users(User.objects.all(), 'jose lima').count(), 0)
+    
+    def test_search_scoped_by_company_and_fields(self):
+        """Test: La búsqueda respeta empresa y campos"""
+        self.assertEqual(search_users(User.objects.all(), 'pe').count(), 2)
+        scoped = search_users(User.objects.all(), 'pe', company=self.company)
+        self.assertEqual(list(scoped), [self.jose])
+        self.assertEqual(search_users(User.objects.all(), 'arequipa', fields=['department']).count(), 0)
+    
+    def test_user_viewset_search_params(self):
+        """Test: El API de usuarios usa el índice en search y sap_id"""
+        view = UserViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        
+        request = factory.get('/api/users/', {'search': 'maria'})
+        force_authenticate(request, user=self.jose)
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u['username'] for u in response.data['results']], ['mlopez'])
+        
+        request = factory.get('/api/users/', {'sap_id': 'SAP77'})
+        force_authenticate(request, user=self.jose)
+        response = view(request)
+        self.assertEqual([u['username'] for u in response.data['results']], ['jpena'])
@@ -0,0 +1,103 @@
+"""
+Tests para la resolución de roles con caché en sesión (request.roles)
+"""
+from django.test import TestCase, RequestFactory
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.urls import reverse
+from core.models import SystemSetup, Company, Role, User, UserRole
+from core.roles import get_request_roles, resolve_user_roles, SESSION_ROLES_KEY
+
+
+class RoleResolutionTest(TestCase):
+    """Tests para core.roles"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Cerro Verde')
+        cls.technician_role = Role.objects.create(company=cls.company, key='technician', name='Técnico')
+        cls.user_role = Role.objects.create(company=cls.company, key='user', name='Usuario')
+        cls.technician = User.objects.create_user(
+            username='tecnico', email='tecnico@cerroverde.com', password='Tecnico123!',
+            company=cls.company, can_access=True
+        )
+        UserRole.objects.create(user=cls.technician, role=cls.technician_role)
+    
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.technician
+        self.request.session = SessionStore()
+    
+    def test_primary_role(self):
+        """Test: El rol principal es el primero asignado"""
+        roles = resolve_user_roles(self.technician)
+        self.assertEqual(roles.primary, 'technician')
+        self.assertIn('technician', roles)
+    
+    def test_primary_role_without_assignments(self):
+        """Test: Sin roles, superusuarios son admin y el resto user"""
+        user = User.objects.create_user(username='sinrol', password='x', company=self.company)
+        self.assertEqual(resolve_user_roles(user).primary, 'user')
+        user.is_superuser = True
+        self.assertEqual(resolve_user_roles(user).primary, 'admin')
+    
+    def test_roles_cached_in_session(self):
+        """Test: La segunda resolución no consulta la base de datos"""
+        self.assertEqual(get_request_roles(self.request).primary, 'technician')
+        self.assertIn(SESSION_ROLES_KEY, self.request.session)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_request_roles(self.request).primary, 'technician')
+    
+    def test_role_change_invalidates_session_roles(self):
+        """Test: Cambiar las asignaciones invalida los roles cacheados"""
+        get_request_roles(self.request)
+        UserRole.objects.filter(user=self.technician).delete()
+        UserRole.objects.create(user=self.technician, role=self.user_role)
+        self.assertEqual(get_request_roles(self.request).primary, 'user')
+    
+    def test_role_update_invalidates_session_roles(self):
+        """Test: Modificar un rol invalida los roles cacheados de todos"""
+        get_request_roles(self.request)
+        self.technician_role.key = 'admin'
+        self.technician_role.save()
+        self.assertEqual(get_request_roles(self.request).primary, 'admin')
+
+
+class RoleGatedDashboardTest(TestCase):
+    """Tests para los dashboards protegidos por rol"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        SystemSetup.objects.create(is_completed=True)
+        cls.company = Company.objects.create(name='Cerro Verde')
+        technician_role = Role.objects.create(company=cls.company, key='technician', name='Técnico')
+        cls.technician = User.objects.create_user(
+            username='tecnico', email='tecnico@cerroverde.com', password='Tecnico123!',
+            company=cls.company, can_access=True
+        )
+        UserRole.objects.create(user=cls.technician, role=technician_role)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def test_login_redirects_by_cached_role(self):
+        """Test: El login resuelve los roles y redirige al dashboard del técnico"""
+        response = self.client.post(reverse('CPlogin:login'), {
+            'username': 'tecnico', 'password': 'Tecnico123!'
+        })
+        self.assertRedirects(response, reverse('CPdashtechnician:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session[SESSION_ROLES_KEY]['roles'], ['technician'])
+    
+    def test_dashboard_does_not_query_roles(self):
+        """Test: Los requests al dashboard no consultan roles en la base de datos"""
+        self.client.force_login(self.technician)
+        self.client.get(reverse('CPdashtechnician:reports'))
+        
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('CPdashtechnician:reports'))
+        self.assertEqual(response.status_code, 200)
+        role_queries = [q['sql'] for q in captured.captured_queries if 'user_roles' in q['sql']]
+        self.assertEqual(role_queries, [])